@@ -0,0 +1,76 @@
+"""
+JWT authentication without a user query per request.
+
+simplejwt's JWTAuthentication loads the user row on every request.
+`CachedJWTAuthentication` keeps a snapshot of that row in Django's cache for
+`JWT_USER_CACHE_TIMEOUT` seconds, keyed on the token's user id claim, and
+builds the user from it. Saving or deleting a user (deactivation, password
+change) drops the snapshot, so those take effect on the next request; a
+queryset `.update()` bypasses the signal and is picked up when the snapshot
+expires.
+
+The password hash is never cached: the rebuilt user has it deferred, so
+`save()` leaves it alone and reading it costs the query it always did.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def forget_user(user):
+    """Drop the cached snapshot of `user`."""
+    cache.delete(user_cache_key(getattr(user, api_settings.USER_ID_FIELD)))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Drop-in replacement for `rest_framework_simplejwt.authentication.
+    JWTAuthentication` (see module docstring); select it in
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = user_cache_key(user_id)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = self.snapshot(user_id)
+            cache.set(key, snapshot, getattr(settings, 'JWT_USER_CACHE_TIMEOUT', 60))
+        fields, password_hash = snapshot
+        user = self.user_model.from_db(DEFAULT_DB_ALIAS, list(fields), list(fields.values()))
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+    def snapshot(self, user_id):
+        """(concrete field values except the password, md5 of the password hash)."""
+        try:
+            user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        fields = {
+            field.attname: getattr(user, field.attname)
+            for field in user._meta.concrete_fields if field.name != 'password'
+        }
+        return fields, get_md5_hash_password(user.password)
@@ -0,0 +1,290 @@
+"""
+Bulk create, update and delete for ModelViewSets.
+
+`BulkWriteMixin` adds a `bulk/` route to a viewset:
+
+- POST a list of objects: inserted with one bulk_create.
+- PATCH a list of partial objects, each with its primary key: written with
+  one bulk_update.
+- DELETE a list of primary keys.
+
+A request runs in one transaction and is all-or-nothing. Items go through
+the viewset's serializer one at a time, but the rows their foreign keys
+point to are fetched beforehand with one `IN` query per relation
+(`BulkPrimaryKeyRelatedField`), so validation costs the same few queries
+for 5 items or 500. If any item is invalid nothing is written, and the 400
+response lists the errors by item index:
+
+    {"errors": [{"index": 3, "errors": {"task": ["Invalid pk \"99\" - object does not exist."]}}]}
+
+bulk_create and bulk_update skip save() and model signals; viewsets override
+`perform_bulk_create` and `perform_bulk_update` to do what those would have
+done. Deletes go through QuerySet.delete(), which still sends the signals.
+
+`BulkListSerializer` applies the same batch validation to list payloads
+posted to a viewset's ordinary create route (`many=True`), keeping DRF's
+error format there: a list with one entry per item.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.validators import UniqueValidator
+
+
+def _to_pk(model, value):
+    """`value` as a primary key of `model`, or None if it can not be one."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return model._meta.pk.to_python(value)
+    except (TypeError, ValueError, DjangoValidationError):
+        return None
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that looks the value up among the rows a bulk
+    request prefetched (`context['related_objects'][field_name]`), when there
+    are any, instead of querying for it.
+    """
+
+    def to_internal_value(self, data):
+        prefetched = self.context.get('related_objects', {}).get(self.field_name)
+        if prefetched is None:
+            return super().to_internal_value(data)
+        pk = _to_pk(self.get_queryset().model, data)
+        if pk is None:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return prefetched[pk]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+def fetch_related_rows(serializer, items, select_related=None):
+    """
+    {relation field: {pk: row}} for every pk the items refer to through the
+    serializer's BulkPrimaryKeyRelatedFields, one query per relation.
+    """
+    select_related = select_related or {}
+    related = {}
+    for name, field in serializer.fields.items():
+        if field.read_only or not isinstance(field, BulkPrimaryKeyRelatedField):
+            continue
+        queryset = field.get_queryset()
+        pks = {_to_pk(queryset.model, item.get(name)) for item in items if isinstance(item, dict)}
+        pks.discard(None)
+        if name in select_related:
+            queryset = queryset.select_related(*select_related[name])
+        related[name] = queryset.in_bulk(pks) if pks else {}
+    return related
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer validating a list of new objects in batch: related rows
+    with one IN query per relation (see `fetch_related_rows`), unique fields
+    with one IN query each plus a check for duplicates within the list.
+    `create()` inserts them with one bulk_create.
+    """
+
+    def to_internal_value(self, data):
+        if self.instance is not None or not isinstance(data, list):
+            return super().to_internal_value(data)
+        self._context['related_objects'] = fetch_related_rows(self.child, data)
+        unique_errors = self.unique_errors(data)
+        try:
+            validated = super().to_internal_value(data)
+        except ValidationError as exc:
+            if not any(unique_errors):
+                raise
+            raise ValidationError([
+                {**errors, **unique} for errors, unique in zip(exc.detail, unique_errors)
+            ])
+        if any(unique_errors):
+            raise ValidationError(unique_errors)
+        return validated
+
+    def unique_errors(self, data):
+        """
+        Errors by item for the child's unique fields, whose per-item
+        UniqueValidator (one query each) this replaces.
+        """
+        errors = [{} for _ in data]
+        for name, field in self.child.fields.items():
+            unique = [validator for validator in field.validators if isinstance(validator, UniqueValidator)]
+            if not unique:
+                continue
+            field.validators = [validator for validator in field.validators if validator not in unique]
+            # Blank values are left to the field (or filled in on save).
+            values = [item.get(name) if isinstance(item, dict) else None for item in data]
+            values = [None if value == '' else value for value in values]
+            taken = {
+                str(value) for value in unique[0].queryset.filter(
+                    **{f'{field.source}__in': [value for value in values if value is not None]}
+                ).values_list(field.source, flat=True)
+            }
+            seen = set()
+            for index, value in enumerate(values):
+                if value is None:
+                    continue
+                if str(value) in taken or str(value) in seen:
+                    errors[index][name] = [unique[0].message]
+                seen.add(str(value))
+        return errors
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return model._default_manager.bulk_create([model(**attrs) for attrs in validated_data])
+
+
+class BulkWriteMixin:
+    """
+    ViewSet mixin adding the `bulk/` route (see module docstring). Serializers
+    should set `serializer_related_field = BulkPrimaryKeyRelatedField`.
+    `bulk_related_select` maps relation fields to the select_related() paths
+    the hooks need on their prefetched rows.
+    """
+    bulk_related_select = {}
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        items = request.data
+        max_items = getattr(settings, 'BULK_MAX_ITEMS', 1000)
+        if not isinstance(items, list) or not items:
+            raise ValidationError({"non_field_errors": ["Expected a non-empty list of items."]})
+        if len(items) > max_items:
+            raise ValidationError({"non_field_errors": [f"At most {max_items} items per request."]})
+
+        handler = {'POST': self.create_many, 'PATCH': self.update_many, 'DELETE': self.destroy_many}
+        with transaction.atomic():
+            return handler[request.method](items)
+
+    def create_many(self, items):
+        validated, errors = self.validate_items(items)
+        if errors:
+            return self.errors_response(errors)
+        model = self.get_queryset().model
+        instances = [model(**data) for data in validated]
+        self.perform_bulk_create(instances)
+        return self.bulk_response([instance.pk for instance in instances], status.HTTP_201_CREATED)
+
+    def update_many(self, items):
+        instances, errors = self.lookup_items(
+            [item.get(self.get_queryset().model._meta.pk.name) if isinstance(item, dict) else None
+             for item in items],
+            lock=True,
+        )
+        validated, invalid = self.validate_items(items, instances)
+        errors = sorted(errors + invalid, key=lambda error: error['index'])
+        if errors:
+            return self.errors_response(errors)
+
+        foreign_keys = [field.attname for field in instances[0]._meta.concrete_fields if field.many_to_one]
+        fields = set()
+        for instance, data in zip(instances, validated):
+            # As the pre_save handlers in client_new.signals do.
+            for attname in foreign_keys:
+                setattr(instance, f'_previous_{attname}', getattr(instance, attname))
+            for name, value in data.items():
+                setattr(instance, name, value)
+            fields.update(data)
+        if fields:
+            self.perform_bulk_update(instances, fields)
+        return self.bulk_response([instance.pk for instance in instances], status.HTTP_200_OK)
+
+    def destroy_many(self, items):
+        instances, errors = self.lookup_items(items)
+        if errors:
+            return self.errors_response(errors)
+        self.perform_bulk_destroy(
+            self.get_queryset().model._default_manager.filter(pk__in=[instance.pk for instance in instances])
+        )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @staticmethod
+    def errors_response(errors):
+        # Not a ValidationError, which would turn the indexes into strings.
+        return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    def lookup_items(self, values, lock=False):
+        """The existing rows with the given primary keys (one query), and errors by index."""
+        queryset = self.get_queryset()
+        model = queryset.model
+        pk_name = model._meta.pk.name
+        pks = [_to_pk(model, value) for value in values]
+        if lock:
+            queryset = queryset.select_related(None).select_for_update()
+        found = queryset.in_bulk({pk for pk in pks if pk is not None})
+
+        instances, errors, seen = [], [], set()
+        for index, (value, pk) in enumerate(zip(values, pks)):
+            if value is None:
+                message = "This field is required."
+            elif pk not in found:
+                message = "Not found."
+            elif pk in seen:
+                message = "Duplicate item."
+            else:
+                seen.add(pk)
+                instances.append(found[pk])
+                continue
+            instances.append(None)
+            errors.append({"index": index, "errors": {pk_name: [message]}})
+        return instances, errors
+
+    def validate_items(self, items, instances=None):
+        """Validated data for each item, and errors by index. Items without an instance are skipped."""
+        context = {
+            **self.get_serializer_context(),
+            'related_objects': fetch_related_rows(self.get_serializer(), items, self.bulk_related_select),
+        }
+        serializer_class = self.get_serializer_class()
+        validated, errors = [], []
+        for index, item in enumerate(items):
+            instance = None
+            if instances is not None:
+                instance = instances[index]
+                if instance is None:
+                    continue
+            serializer = serializer_class(instance, data=item, partial=instance is not None, context=context)
+            if serializer.is_valid():
+                validated.append(serializer.validated_data)
+            else:
+                errors.append({"index": index, "errors": serializer.errors})
+        return validated, errors
+
+    def perform_bulk_create(self, instances):
+        self.get_queryset().model._default_manager.bulk_create(instances)
+
+    def perform_bulk_update(self, instances, fields):
+        fields = set(fields)
+        now = timezone.now()
+        for field in instances[0]._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                for instance in instances:
+                    setattr(instance, field.attname, now)
+                fields.add(field.name)
+        self.get_queryset().model._default_manager.bulk_update(instances, fields)
+
+    def perform_bulk_destroy(self, queryset):
+        queryset.delete()
+
+    def bulk_response(self, pks, status_code):
+        return written_rows_response(self, pks, status_code)
+
+
+def written_rows_response(view, pks, status_code):
+    """The written rows, read back in one query, as `view` lists them."""
+    queryset = view.get_queryset().filter(pk__in=pks)
+    if getattr(view, 'values_reader', None) is not None:
+        response = view.values_list_response(queryset, paginate=False)
+    else:
+        response = Response(view.get_serializer(queryset, many=True).data)
+    response.status_code = status_code
+    return response
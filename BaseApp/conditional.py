@@ -0,0 +1,244 @@
+"""
+Conditional GET for list and detail endpoints.
+
+Responses carry an ETag and Last-Modified derived from the model's
+modification timestamp: a detail from its row's timestamp, a list page from
+the latest timestamp on the page and the page's rows (their count and
+keys, so a row dropping out changes the tag too). Related rows the
+representation embeds count too: the view's `cache_depends_on` models (as
+for CachedResponseMixin, e.g. an RFQ's client for client_name) and the
+relations named in `?expand=` contribute their own auto_now timestamps. The
+ETag also covers the URL, query string included, and the negotiated media
+type, since those change the representation.
+
+An unconditional request computes these from the rows it fetched anyway, so
+lists stay a single keyset query with no COUNT(*). A request with
+If-None-Match (or, without it, If-Modified-Since) first reads only the
+keys and timestamps it needs: one cheap query, after which a match is
+answered with 304 Not Modified without fetching the full rows or
+serializing anything. Related timestamps are joined into those queries; an
+unconditional response reads them from the related rows it loaded, or with
+one more query when they were not loaded.
+"""
+import calendar
+import functools
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def _auto_now_field(model):
+    return next((field.name for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)), None)
+
+
+@functools.lru_cache(maxsize=None)
+def _embedded_relations(serializer_class, fields):
+    """Names of the relations whose columns `fields` (None: all) of the serializer render."""
+    field_sources = getattr(serializer_class.Meta, 'field_sources', {})
+    relations = set()
+    for name, field in serializer_class().fields.items():
+        if fields is not None and name not in fields:
+            continue
+        if name in field_sources:
+            relations.update(source.split('__')[0] for source in field_sources[name] if '__' in source)
+        elif '.' in field.source:
+            relations.add(field.source.split('.')[0])
+    return frozenset(relations)
+
+
+def _loaded_stamps(obj, paths):
+    """The `relation__timestamp` values of `obj` if its related rows are loaded, else None."""
+    stamps = []
+    for path in paths:
+        relation, stamp = path.split('__')
+        field = obj._meta.get_field(relation)
+        if not field.is_cached(obj):
+            return None
+        related = field.get_cached_value(obj)
+        if related is not None and stamp in related.get_deferred_fields():
+            return None
+        stamps.append(None if related is None else getattr(related, stamp))
+    return stamps
+
+
+def _stamps_key(stamps):
+    return ''.join(f'+{stamp.isoformat()}' if stamp else '+-' for stamp in stamps)
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet / generic view mixin adding ETag and Last-Modified to `list`
+    and `retrieve`. `modified_field` names the model's auto_now timestamp;
+    `cache_depends_on` (shared with CachedResponseMixin) lists the models
+    of related rows the representation embeds. List it before mixins that
+    override `list`.
+    """
+    modified_field = 'updated_at'
+    cache_depends_on = ()
+
+    def list(self, request, *args, **kwargs):
+        if self.is_conditional(request) and self.paginator is not None:
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(queryset.values(*self.validator_columns(queryset)))
+            validators = self.list_validators(page)
+            if validators is not None:
+                not_modified = self.not_modified(request, *validators)
+                if not_modified is not None:
+                    return not_modified
+
+        response = super().list(request, *args, **kwargs)
+        validators = self.list_validators(getattr(self.paginator, 'page', None))
+        if validators is not None:
+            response = self.add_validators(response, *validators)
+        return response
+
+    def related_modified_paths(self):
+        """
+        `relation__timestamp` lookups of the related rows the representation
+        embeds: forward relations named in `?expand=`, or to `cache_depends_on`
+        models that the rendered fields read through, whose model has an
+        auto_now timestamp.
+        """
+        model = self.get_queryset().model
+        fields, expand = getattr(self, 'sparse_fieldset', (None, ()))
+        embedded = _embedded_relations(
+            self.get_serializer_class(), None if fields is None else frozenset(fields)
+        ) if self.cache_depends_on else ()
+        paths = []
+        for field in model._meta.concrete_fields:
+            if field.is_relation and (
+                field.name in expand or (field.related_model in self.cache_depends_on and field.name in embedded)
+            ):
+                stamp = _auto_now_field(field.related_model)
+                if stamp is not None:
+                    paths.append(f'{field.name}__{stamp}')
+        return paths
+
+    def fetch_related_stamps(self, pks, paths):
+        """{pk: related timestamps} for rows whose related rows were not loaded."""
+        rows = self.get_queryset().model._default_manager.filter(pk__in=pks).values_list('pk', *paths)
+        return {pk: list(stamps) for pk, *stamps in rows}
+
+    def validator_columns(self, queryset):
+        """The key, timestamp, related timestamp and keyset-ordering columns of a page."""
+        columns = {queryset.model._meta.pk.name: None, self.modified_field: None}
+        columns.update(dict.fromkeys(self.related_modified_paths()))
+        for name in self.paginator.get_ordering(self.request, queryset, self):
+            if name.lstrip('-') != 'pk':
+                columns[name.lstrip('-')] = None
+        return columns
+
+    def list_validators(self, page):
+        if page is None:
+            return None
+        pk_name = self.get_queryset().model._meta.pk.name
+        paths = self.related_modified_paths()
+        stamps = []
+        for row in page:
+            if isinstance(row, dict):
+                if self.modified_field not in row:
+                    return None
+                pk, modified = row.get(pk_name, row.get('pk')), row[self.modified_field]
+                related = [row[path] for path in paths] if all(path in row for path in paths) else None
+            else:
+                if self.modified_field in row.get_deferred_fields():
+                    return None
+                pk, modified = row.pk, getattr(row, self.modified_field)
+                related = _loaded_stamps(row, paths)
+            stamps.append((pk, modified, related))
+        unloaded = [pk for pk, _, related in stamps if related is None]
+        if unloaded:
+            fetched = self.fetch_related_stamps(unloaded, paths)
+            stamps = [
+                (pk, modified, fetched.get(pk, [None] * len(paths)) if related is None else related)
+                for pk, modified, related in stamps
+            ]
+        last_modified = max(
+            (stamp for _, modified, related in stamps for stamp in (modified, *related) if stamp),
+            default=None,
+        )
+        return self.conditional_validators(
+            last_modified, f'n={len(stamps)}',
+            ','.join(f'{pk}@{modified.isoformat()}{_stamps_key(related)}' for pk, modified, related in stamps),
+        )
+
+    def detail_validators(self, modified, related):
+        """Validators of a detail from its row's timestamp and its related ones."""
+        if not related:
+            return self.conditional_validators(modified)
+        last_modified = max((stamp for stamp in (modified, *related) if stamp), default=None)
+        return self.conditional_validators(last_modified, _stamps_key(related))
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.is_conditional(request):
+            stamps = self.detail_last_modified()
+            if stamps is not None:
+                validators = self.detail_validators(stamps[0], stamps[1:])
+                not_modified = self.not_modified(request, *validators)
+                if not_modified is not None:
+                    return not_modified
+        self._conditional_object = None
+        response = super().retrieve(request, *args, **kwargs)
+        obj = self._conditional_object
+        # Skip the headers rather than spend a query on a deferred column.
+        if obj is not None and self.modified_field not in obj.get_deferred_fields():
+            paths = self.related_modified_paths()
+            related = _loaded_stamps(obj, paths)
+            if related is None:
+                related = self.fetch_related_stamps([obj.pk], paths).get(obj.pk, [None] * len(paths))
+            response = self.add_validators(
+                response, *self.detail_validators(getattr(obj, self.modified_field), related)
+            )
+        return response
+
+    def get_object(self):
+        obj = super().get_object()
+        self._conditional_object = obj
+        return obj
+
+    @staticmethod
+    def is_conditional(request):
+        return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+    def detail_last_modified(self):
+        """The row's timestamp followed by its related ones, or None."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            return queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).values_list(self.modified_field, *self.related_modified_paths()).first()
+        except (TypeError, ValueError, ValidationError):
+            # Malformed lookup value; retrieve() answers 404 as usual.
+            return None
+
+    def conditional_validators(self, last_modified, *extra):
+        """(ETag, Last-Modified as a Unix timestamp or None)."""
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        key = '|'.join([
+            self.get_queryset().model._meta.label,
+            self.request.get_full_path(),
+            getattr(renderer, 'media_type', ''),
+            last_modified.isoformat() if last_modified else '',
+            *extra,
+        ])
+        etag = hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+        timestamp = calendar.timegm(last_modified.utctimetuple()) if last_modified else None
+        return quote_etag(etag), timestamp
+
+    @staticmethod
+    def not_modified(request, etag, last_modified):
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None and response.status_code == 304:
+            return ConditionalGetMixin.add_validators(response, etag, last_modified)
+        return None
+
+    @staticmethod
+    def add_validators(response, etag, last_modified):
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -1,11 +1,46 @@
 # BaseApp/filters.py
+from django.db.models.functions import Lower
 from django_filters import rest_framework as filters
+from django_filters.constants import EMPTY_VALUES
 from .models import Employee, Company
 
+
+class ChoiceIExactFilter(filters.CharFilter):
+    """
+    Case-insensitive match on a `choices` column.
+
+    The value is mapped to its canonical choice in Python and filtered with a
+    plain `exact` lookup, so the query can use an ordinary index instead of
+    the `UPPER()`/`LIKE` that `iexact` compiles to.
+    """
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        choices = qs.model._meta.get_field(self.field_name).choices
+        canonical = {key.lower(): key for key, _ in choices}.get(value.lower())
+        if canonical is None:
+            return qs.none()
+        return qs.filter(**{self.field_name: canonical})
+
+
+class LowerExactFilter(filters.CharFilter):
+    """
+    Case-insensitive match on a free-text column, compiled to
+    `LOWER(column) = %s` so it is served by a functional `Lower()` index.
+    """
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        alias = f'{self.field_name}_lower'
+        return qs.alias(**{alias: Lower(self.field_name)}).filter(**{alias: value.lower()})
+
+
 class EmployeeFilter(filters.FilterSet):
     # Define a filter for `position`
-    position = filters.CharFilter(field_name='position', lookup_expr='iexact')
-    location = filters.CharFilter(field_name='location', lookup_expr='iexact')
+    position = ChoiceIExactFilter(field_name='position')
+    location = LowerExactFilter(field_name='location')
 
     class Meta:
         model = Employee
@@ -14,9 +49,9 @@ class EmployeeFilter(filters.FilterSet):
 
 class CompanyFilter(filters.FilterSet):
     # Define a filter for `position`
-    name = filters.CharFilter(field_name='name', lookup_expr='iexact')
+    name = LowerExactFilter(field_name='name')
     # position = filters.CharFilter(field_name='position', lookup_expr='iexact')
-    location = filters.CharFilter(field_name='location', lookup_expr='iexact')
+    location = LowerExactFilter(field_name='location')
 
     class Meta:
         model = Company
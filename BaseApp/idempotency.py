@@ -0,0 +1,177 @@
+"""
+Idempotency-Key support for write requests.
+
+A client that may retry a POST or PATCH (flaky networks) sends a unique
+`Idempotency-Key` header with it, and the same header on each retry.
+`BaseApp.middleware.IdempotencyMiddleware` runs the first request as usual
+and stores its response in `IdempotencyKey`. A retry gets that response
+back, with `Idempotent-Replayed: true`, without the view running again:
+no validation, no writes.
+
+- Keys belong to the caller: the token's user, the session's user, or a
+  hash of other credentials. They expire after IDEMPOTENCY_KEY_TTL seconds.
+  `purge_idempotency_keys` deletes the expired rows.
+- A key is claimed with an INSERT against a unique (scope, key)
+  constraint, so of two concurrent requests with the same key only one
+  runs. The other waits up to IDEMPOTENCY_WAIT_TIMEOUT seconds for its
+  response, then answers 409. While the request runs, a `Heartbeat`
+  thread refreshes the claim's `heartbeat_at`; a claim without a heartbeat
+  for IDEMPOTENCY_LOCK_TIMEOUT seconds (a crashed worker) is given up. A
+  request whose claim was given up all the same is answered as usual, but
+  its response is not stored over the one of the retry that took the key.
+- Reusing a key for a different request (method, path or body) is a 422.
+- 5xx, 401 and 403 responses and streaming responses are not stored, so
+  retrying those runs the request again.
+"""
+import hashlib
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from rest_framework import HTTP_HEADER_ENCODING
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+UNSTORED_STATUS_CODES = {401, 403}
+
+
+def request_scope(request):
+    """Who the request's key belongs to."""
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header:
+        authentication = JWTAuthentication()
+        try:
+            raw_token = authentication.get_raw_token(header.encode(HTTP_HEADER_ENCODING))
+            if raw_token is not None:
+                # A signature check, without the user query: keys survive token refreshes.
+                return f'user:{authentication.get_validated_token(raw_token)[api_settings.USER_ID_CLAIM]}'
+        except (InvalidToken, TokenError, KeyError):
+            pass
+        return f'auth:{hashlib.sha256(header.encode()).hexdigest()}'
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return 'anonymous'
+
+
+def request_fingerprint(request):
+    """Hash of the method, path and body; of the body's type and length for uploads too large to read here."""
+    digest = hashlib.sha256(f'{request.method} {request.get_full_path()}\n'.encode())
+    length = int(request.META.get('CONTENT_LENGTH') or 0)
+    max_length = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+    if max_length is None or length <= max_length:
+        digest.update(request.body)
+    else:
+        digest.update(f'{request.content_type} {length}'.encode())
+    return digest.hexdigest()
+
+
+def _error(status_code, detail, **headers):
+    response = JsonResponse({'detail': detail}, status=status_code)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def replay(record):
+    response = HttpResponse(bytes(record.body), status=record.status_code)
+    for name, value in record.headers.items():
+        response[name] = value
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _lock_timeout():
+    return getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60)
+
+
+def claim(scope, key, fingerprint):
+    """
+    (the claimed IdempotencyKey, None) if this request should run, or
+    (None, response) to answer it with instead.
+    """
+    wait_timeout = getattr(settings, 'IDEMPOTENCY_WAIT_TIMEOUT', 10)
+    lock_timeout = timedelta(seconds=_lock_timeout())
+    ttl = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+    deadline = time.monotonic() + wait_timeout
+    while True:
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    scope=scope, key=key, fingerprint=fingerprint, heartbeat_at=now, expires_at=now + ttl
+                ), None
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+        if record is None:
+            continue  # released since
+        # Conditional deletes: the heartbeat may have been refreshed since the read.
+        if record.expires_at <= now:
+            IdempotencyKey.objects.filter(pk=record.pk, expires_at__lte=now).delete()
+            continue
+        if record.status_code is None and record.heartbeat_at <= now - lock_timeout:
+            IdempotencyKey.objects.filter(
+                pk=record.pk, status_code__isnull=True, heartbeat_at__lte=now - lock_timeout
+            ).delete()
+            continue
+        if record.fingerprint != fingerprint:
+            return None, _error(422, f"{HEADER} was already used for a different request.")
+        if record.status_code is not None:
+            return None, replay(record)
+        if time.monotonic() >= deadline:
+            return None, _error(
+                409, f"A request with this {HEADER} is still in progress.", **{'Retry-After': '1'}
+            )
+        time.sleep(getattr(settings, 'IDEMPOTENCY_POLL_INTERVAL', 0.05))
+
+
+class Heartbeat(threading.Thread):
+    """
+    Refreshes the `heartbeat_at` of a claimed key every third of
+    IDEMPOTENCY_LOCK_TIMEOUT until stopped, so a slow request keeps its key.
+    """
+
+    def __init__(self, record, interval=None):
+        super().__init__(name=f'idempotency-heartbeat-{record.pk}', daemon=True)
+        self.pk = record.pk
+        self.interval = _lock_timeout() / 3 if interval is None else interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    IdempotencyKey.objects.filter(pk=self.pk, status_code__isnull=True).update(
+                        heartbeat_at=timezone.now()
+                    )
+                except DatabaseError:
+                    pass  # e.g. SQLite locked by the request's own write; try again next beat
+        finally:
+            connection.close()  # this thread's own connection
+
+    def stop(self):
+        self.stopped.set()
+
+
+def finish(record, response):
+    """
+    Store `response` for replays, or release the key if it should not be
+    replayed. A key given up in the meantime (see `claim`) is left alone.
+    """
+    claimed = IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True)
+    if (response.streaming or response.status_code >= 500
+            or response.status_code in UNSTORED_STATUS_CODES):
+        claimed.delete()
+        return
+    claimed.update(status_code=response.status_code, headers=dict(response.items()), body=response.content)
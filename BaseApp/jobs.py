@@ -0,0 +1,46 @@
+"""
+Claiming and recovering background jobs (ReportExport, TimesheetImport).
+
+A job row moves Pending -> Running -> Done or Failed. A runner claims a
+pending job with one filtered UPDATE, so of two runners only one gets it,
+and stamps `heartbeat_at`. A runner that dies mid-job (a restart or deploy)
+leaves the job Running for good; `requeue_stale` finds jobs whose heartbeat
+is older than a timeout and puts them back to Pending, or fails them once
+they have been tried `max_attempts` times, or when they are not
+`restartable` (a job that already committed part of its work). The worker
+commands call it before each pass, so the timeout must be longer than the
+slowest job goes without a heartbeat.
+"""
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+def claim(job):
+    """Mark pending `job` Running. Returns False if another runner already claimed it."""
+    model = type(job)
+    now = timezone.now()
+    claimed = model.objects.filter(pk=job.pk, status=model.PENDING).update(
+        status=model.RUNNING, heartbeat_at=now, attempts=F('attempts') + 1
+    )
+    if claimed:
+        job.status, job.heartbeat_at, job.attempts = model.RUNNING, now, job.attempts + 1
+    return bool(claimed)
+
+
+def requeue_stale(model, timeout, max_attempts, restartable=Q()):
+    """
+    Put `model` jobs Running without a heartbeat for `timeout` seconds back
+    to Pending, or fail them after `max_attempts` or when they do not match
+    `restartable`. Returns (requeued, failed).
+    """
+    now = timezone.now()
+    stale = model.objects.filter(status=model.RUNNING, heartbeat_at__lt=now - timedelta(seconds=timeout))
+    retry = Q(attempts__lt=max_attempts) & restartable
+    failed = stale.exclude(retry).update(
+        status=model.FAILED, finished_at=now,
+        error=f"Interrupted: no progress for {timeout} seconds.",
+    )
+    requeued = stale.filter(retry).update(status=model.PENDING)
+    return requeued, failed
@@ -0,0 +1,95 @@
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models.functions import Lower
+from django.utils.dateparse import parse_date
+
+from BaseApp import payroll
+from BaseApp.models import Employee
+
+
+class Command(BaseCommand):
+    help = (
+        "Adjust salaries in bulk (see BaseApp.payroll): --percent for the "
+        "employees of --company/--position (or --all), or --file, a CSV with "
+        "an email column and a salary or percent column. --effective-date "
+        "defaults to today; timesheets dated earlier keep the previous rate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--percent', type=Decimal)
+        parser.add_argument('--company', type=int, action='append', metavar='ID')
+        parser.add_argument('--position')
+        parser.add_argument('--all', action='store_true')
+        parser.add_argument('--file', metavar='PATH')
+        parser.add_argument('--effective-date', metavar='YYYY-MM-DD')
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        effective_date = None
+        if options['effective_date']:
+            effective_date = parse_date(options['effective_date'])
+            if effective_date is None:
+                raise CommandError("--effective-date must be YYYY-MM-DD.")
+
+        if (options['percent'] is None) == (options['file'] is None):
+            raise CommandError("Give one of --percent or --file.")
+        if options['file']:
+            items, labels = self.read_file(options['file'])
+        else:
+            items, labels = self.select(options)
+
+        try:
+            pks, errors = payroll.adjust_salaries(items, effective_date, options['batch_size'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if errors:
+            for error in errors:
+                self.stderr.write(f"{labels[error['index']]}: {error['errors']}")
+            raise CommandError(f"{len(errors)} invalid adjustments; nothing was changed.")
+        self.stdout.write(f"{len(pks)} salaries adjusted")
+
+    def select(self, options):
+        if not (options['company'] or options['position'] or options['all']):
+            raise CommandError("Give --company, --position or --all with --percent.")
+        queryset = Employee.objects.order_by('pk')
+        if options['company']:
+            queryset = queryset.filter(company_id__in=options['company'])
+        if options['position']:
+            queryset = queryset.filter(position=options['position'])
+        pks = list(queryset.values_list('pk', flat=True))
+        return [(pk, None, options['percent']) for pk in pks], [f"employee {pk}" for pk in pks]
+
+    def read_file(self, path):
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as fh:
+                reader = csv.DictReader(fh)
+                rows = [(reader.line_num, row) for row in reader]
+        except OSError as exc:
+            raise CommandError(str(exc))
+        if 'email' not in (reader.fieldnames or []):
+            raise CommandError("The file needs an email column.")
+
+        emails = {(row.get('email') or '').strip().lower() for _, row in rows}
+        pks = {
+            email.lower(): pk for email, pk in
+            Employee.objects.alias(email_lower=Lower('email')).filter(email_lower__in=emails)
+            .values_list('email', 'pk')
+        }
+        items, labels = [], []
+        for line, row in rows:
+            email = (row.get('email') or '').strip().lower()
+            try:
+                salary, percent = (
+                    Decimal(row[column].strip()) if (row.get(column) or '').strip() else None
+                    for column in ('salary', 'percent')
+                )
+            except InvalidOperation:
+                raise CommandError(f"line {line}: salary and percent must be numbers.")
+            if (salary is None) == (percent is None):
+                raise CommandError(f"line {line}: give one of salary or percent.")
+            # An unknown email is reported by adjust_salaries as not found.
+            items.append((pks.get(email), salary, percent))
+            labels.append(f"line {line} ({email})")
+        return items, labels
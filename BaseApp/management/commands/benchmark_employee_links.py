@@ -0,0 +1,71 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from BaseApp.models import Company, Employee
+from BaseApp.serializers import EmployeeSerializer, EmployeeIdSerializer
+
+
+class StockEmployeeSerializer(serializers.HyperlinkedModelSerializer):
+    """The serializer as it was before URL prefixes were cached."""
+
+    class Meta:
+        model = Employee
+        fields = '__all__'
+
+
+class Command(BaseCommand):
+    help = (
+        "Time employee list serialization with per-row reverse(), cached URL "
+        "prefixes and `?links=ids`. Seeds rows inside a transaction that is "
+        "rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50_000)
+        parser.add_argument('--repeat', type=int, default=3, help="Best of N runs.")
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/api/v1/employees/'))
+        with transaction.atomic():
+            companies = Company.objects.bulk_create([
+                Company(name=f'Company {i}', location='Dubai', about='', type='IT Solutions')
+                for i in range(100)
+            ])
+            Employee.objects.bulk_create([
+                Employee(
+                    name=f'Employee {i}', email=f'employee{i}@bench.example', contact='000',
+                    description='', location='Dubai', company=companies[i % len(companies)],
+                    position='Team Members', salary=Decimal('2070.00'), hourly_rate=Decimal('10.00'),
+                )
+                for i in range(options['rows'])
+            ], batch_size=5000)
+
+            modes = (
+                ('hyperlinked (reverse per row)', StockEmployeeSerializer, Employee.objects.all()),
+                ('hyperlinked (cached prefix)', EmployeeSerializer, Employee.objects.all()),
+                ('ids (?links=ids)', EmployeeIdSerializer, Employee.objects.select_related('company')),
+            )
+            baseline = None
+            for label, serializer_class, queryset in modes:
+                elapsed = self._best(options['repeat'], lambda: serializer_class(
+                    queryset.all(), many=True, context={'request': request}
+                ).data)
+                baseline = baseline or elapsed
+                self.stdout.write(f"{options['rows']} employees  {label:<31} {elapsed:7.3f}s  x{baseline / elapsed:.1f}")
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _best(repeat, build):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            JSONRenderer().render(build())
+            timings.append(time.perf_counter() - start)
+        return min(timings)
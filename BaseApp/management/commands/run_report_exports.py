@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from BaseApp import jobs
+from BaseApp.models import ReportExport
+from BaseApp.reports import run_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Run pending report export jobs, oldest first, after requeueing jobs "
+        "a dead worker left Running. With --poll, keep running and check for "
+        "new jobs every N seconds (for REPORT_EXPORT_RUNNER = 'worker')."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', type=float, default=None, metavar='SECONDS')
+
+    def handle(self, *args, **options):
+        while True:
+            requeued, failed = jobs.requeue_stale(
+                ReportExport,
+                getattr(settings, 'REPORT_EXPORT_TIMEOUT', 60 * 60),
+                getattr(settings, 'REPORT_EXPORT_MAX_ATTEMPTS', 3),
+            )
+            if requeued or failed:
+                self.stdout.write(f"Stale jobs: {requeued} requeued, {failed} failed")
+            for job in ReportExport.objects.filter(status=ReportExport.PENDING).order_by('created_at'):
+                if run_export(job):
+                    self.stdout.write(f"{job.pk} {job.report}.{job.format}: {job.status} ({job.row_count} rows)")
+            if options['poll'] is None:
+                return
+            time.sleep(options['poll'])
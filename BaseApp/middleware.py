@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.middleware.gzip import GZipMiddleware
+
+from . import idempotency
+from .models import IdempotencyKey
+
+
+class ThresholdGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that leaves alone responses shorter than `GZIP_MIN_LENGTH`
+    bytes, where the saving is not worth the CPU, and content types that are
+    already compressed (file downloads such as Parquet). Streaming
+    responses, whose length is unknown, are compressed as they stream.
+    """
+    compressible_types = (
+        'text/', 'application/json', 'application/x-ndjson', 'application/javascript',
+        'application/xml', 'application/msgpack',
+    )
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(self.compressible_types) and '+json' not in content_type:
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, 'GZIP_MIN_LENGTH', 1024):
+            return response
+        return super().process_response(request, response)
+
+
+class IdempotencyMiddleware:
+    """
+    Replays the stored response of a POST or PATCH repeated with the same
+    Idempotency-Key header (see BaseApp.idempotency). Placed last, so it
+    stores responses before outer middleware (gzip) transforms them.
+    """
+    methods = ('POST', 'PATCH')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = request.headers.get(idempotency.HEADER)
+        if not key or request.method not in self.methods:
+            return self.get_response(request)
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return JsonResponse({'detail': f"{idempotency.HEADER} is too long."}, status=400)
+
+        record, response = idempotency.claim(
+            idempotency.request_scope(request), key, idempotency.request_fingerprint(request)
+        )
+        if response is not None:
+            return response
+        heartbeat = idempotency.Heartbeat(record)
+        heartbeat.start()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).delete()
+            raise
+        finally:
+            heartbeat.stop()
+        idempotency.finish(record, response)
+        return response
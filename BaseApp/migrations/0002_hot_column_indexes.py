@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:12
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BaseApp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['added_date', 'company_id'], name='company_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(django.db.models.functions.text.Lower('name'), models.F('added_date'), models.F('company_id'), name='company_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(django.db.models.functions.text.Lower('location'), models.F('added_date'), models.F('company_id'), name='company_location_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['created_at', 'id'], name='employee_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['position', 'created_at', 'id'], name='employee_position_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(django.db.models.functions.text.Lower('location'), models.F('created_at'), models.F('id'), name='employee_location_lower_idx'),
+        ),
+    ]
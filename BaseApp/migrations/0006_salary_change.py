@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-18 00:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BaseApp', '0005_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalaryChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('effective_date', models.DateField()),
+                ('previous_salary', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('previous_hourly_rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('salary', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('hourly_rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='salary_changes', to='BaseApp.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'effective_date'], name='salarychange_employee_date_idx')],
+            },
+        ),
+    ]
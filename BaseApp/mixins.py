@@ -0,0 +1,71 @@
+"""
+View mixins for the API's query parameters, shared by BaseApp.views,
+BaseApp.readers and the other apps' views.
+"""
+
+
+class SparseFieldsetViewMixin:
+    """
+    Applies `?fields=a,b` and `?expand=x,y` to list and retrieve requests:
+    the serializer renders only those fields and the queryset is trimmed to
+    the columns and joins they need. The serializer class must use
+    BaseApp.serializers.SparseFieldsetMixin.
+    """
+    sparse_fieldset_actions = ('list', 'retrieve')
+
+    @property
+    def sparse_fieldset(self):
+        if not hasattr(self, '_sparse_fieldset'):
+            self._sparse_fieldset = None, ()
+            # Plain generic views have no action; treat them as list/retrieve.
+            action = getattr(self, 'action', 'list')
+            if self.request.method == 'GET' and action in self.sparse_fieldset_actions:
+                fields = self._split_param('fields')
+                expand = self._split_param('expand') or ()
+                if fields is not None or expand:
+                    self._sparse_fieldset = self.get_serializer_class().resolve_fieldset(fields, expand)
+        return self._sparse_fieldset
+
+    def _split_param(self, name):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+        return [part.strip() for part in value.split(',') if part.strip()]
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.sparse_fieldset
+        if fields is not None or expand:
+            kwargs.setdefault('fields', fields)
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields, expand = self.sparse_fieldset
+        if fields is not None or expand:
+            queryset = self.get_serializer_class().optimize_queryset(queryset, fields, expand)
+        return queryset
+
+
+class IdLinksViewMixin:
+    """
+    `?links=ids` on GET requests swaps the hyperlinked serializer for
+    `id_serializer_class`, which returns primary keys and needs no URL
+    reversing. `id_select_related` relations are joined in that mode.
+    """
+    id_serializer_class = None
+    id_select_related = ()
+
+    def ids_requested(self):
+        return self.request.method == 'GET' and self.request.query_params.get('links') == 'ids'
+
+    def get_serializer_class(self):
+        if self.ids_requested():
+            return self.id_serializer_class
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.ids_requested() and self.id_select_related:
+            queryset = queryset.select_related(*self.id_select_related)
+        return queryset
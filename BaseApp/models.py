@@ -1,4 +1,9 @@
-from django.db import models
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 # Create your models here.
 #Company Model
@@ -17,6 +22,12 @@ class Company(models.Model):
     added_date=models.DateTimeField(auto_now=True)
     active=models.BooleanField(default=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['added_date', 'company_id'], name='company_added_idx'),
+            models.Index(Lower('name'), F('added_date'), F('company_id'), name='company_name_lower_idx'),
+            models.Index(Lower('location'), F('added_date'), F('company_id'), name='company_location_lower_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -60,6 +71,8 @@ class Employee(models.Model):
         ('Accountant Members', 'Accountant Members'),
     ]
 
+    HOURS_PER_MONTH = 207  # hourly_rate = salary / HOURS_PER_MONTH
+
     name = models.CharField(max_length=255)
     email = models.EmailField(unique=True)
     contact = models.CharField(max_length=20)
@@ -73,10 +86,156 @@ class Employee(models.Model):
     status = models.BooleanField(default=True)
     created_at=models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='employee_created_idx'),
+            models.Index(fields=['position', 'created_at', 'id'], name='employee_position_idx'),
+            models.Index(Lower('location'), F('created_at'), F('id'), name='employee_location_lower_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.position} at {self.company.name}"
 
+    @classmethod
+    def hourly_rate_for(cls, salary):
+        """
+        The hourly rate for a monthly `salary`, rounded to the column's places
+        half-to-even, as the database adapter rounds it when it is written.
+        """
+        places = Decimal(1).scaleb(-cls._meta.get_field('hourly_rate').decimal_places)
+        return (Decimal(salary) / cls.HOURS_PER_MONTH).quantize(places, rounding=ROUND_HALF_EVEN)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The pay as loaded, to record a SalaryChange when save() changes it.
+        instance._loaded_pay = (
+            (instance.salary, instance.hourly_rate)
+            if 'salary' in instance.__dict__ and 'hourly_rate' in instance.__dict__ else None
+        )
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        if fields is None or 'salary' in fields:
+            self._loaded_pay = (self.salary, self.hourly_rate)
+
     def save(self, *args, **kwargs):
         # Automatically calculate hourly rate based on salary
-        self.hourly_rate = self.salary / 207
-        super().save(*args, **kwargs)
\ No newline at end of file
+        self.hourly_rate = self.hourly_rate_for(self.salary)
+        loaded = getattr(self, '_loaded_pay', None)
+        update_fields = kwargs.get('update_fields')
+        if loaded is None or loaded[0] == Decimal(self.salary) or (update_fields is not None and 'salary' not in update_fields):
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            SalaryChange.objects.create(
+                employee=self, effective_date=timezone.localdate(),
+                previous_salary=loaded[0], previous_hourly_rate=loaded[1],
+                salary=self.salary, hourly_rate=self.hourly_rate,
+            )
+        self._loaded_pay = (self.salary, self.hourly_rate)
+
+class ReportExport(models.Model):
+    """A background tabular export (see BaseApp.reports) and its output file."""
+    PENDING = 'Pending'
+    RUNNING = 'Running'
+    DONE = 'Done'
+    FAILED = 'Failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    report = models.CharField(max_length=50)
+    format = models.CharField(max_length=10, default='csv')
+    filters = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    file = models.FileField(upload_to='reports/', blank=True)
+    row_count = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # last sign of life while Running
+    attempts = models.PositiveSmallIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='reportexport_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.report} ({self.format}) - {self.status}"
+
+
+class NumberSequence(models.Model):
+    """
+    The next unreserved number of a numbering series in a year (see
+    BaseApp.sequences).
+    """
+    series = models.CharField(max_length=20)
+    year = models.PositiveSmallIntegerField()
+    next_value = models.PositiveBigIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'year'], name='numbersequence_series_year_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.series} {self.year}: {self.next_value}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    A write request made with an Idempotency-Key header and, once it has
+    finished, its response (see BaseApp.idempotency).
+    """
+    scope = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # None while in progress
+    headers = models.JSONField(default=dict, blank=True)
+    body = models.BinaryField(blank=True, default=b'')
+    created_at = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField(default=timezone.now)  # refreshed while in progress
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='idempotencykey_scope_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotencykey_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.scope}) - {self.status_code or 'in progress'}"
+
+
+class SalaryChange(models.Model):
+    """
+    A salary change and the date it took effect (see BaseApp.payroll): one
+    per bulk adjustment, or per Employee.save() that changed the salary,
+    effective that day. Timesheets dated before `effective_date` are paid
+    at `previous_hourly_rate`.
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='salary_changes')
+    effective_date = models.DateField()
+    previous_salary = models.DecimalField(max_digits=10, decimal_places=2)
+    previous_hourly_rate = models.DecimalField(max_digits=10, decimal_places=2)
+    salary = models.DecimalField(max_digits=10, decimal_places=2)
+    hourly_rate = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'effective_date'], name='salarychange_employee_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id}: {self.previous_salary} -> {self.salary} from {self.effective_date}"
@@ -0,0 +1,145 @@
+from base64 import b64decode, b64encode
+from collections import namedtuple
+from urllib import parse
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+KeysetCursor = namedtuple('KeysetCursor', ['reverse', 'value', 'key'])
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination keyed on the queryset's existing ordering plus the
+    primary key as a tiebreaker.
+
+    Each page is fetched with a `WHERE (col, pk) < (value, key)` condition and
+    a `LIMIT`, so page cost stays constant however deep the client scrolls:
+    no `COUNT(*)` and no `OFFSET`. The ordering column is taken from the
+    view's `cursor_ordering` attribute if set, else the queryset's
+    `order_by()`, else the model's `Meta.ordering`, falling back to `-pk`.
+    """
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', None)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self._model = queryset.model
+        self._pk_field = queryset.model._meta.pk
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        order_by = self.ordering
+        if reverse:
+            order_by = [self._flip(field) for field in order_by]
+        queryset = queryset.order_by(*order_by)
+
+        if self.cursor is not None:
+            queryset = queryset.filter(self._after(self.cursor, descending=order_by[0].startswith('-')))
+
+        # Fetch one extra row to find out whether there is another page.
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering is None:
+            ordering = queryset.query.order_by or queryset.model._meta.ordering or ['-pk']
+        field = ordering[0] if not isinstance(ordering, str) else ordering
+
+        pk_name = queryset.model._meta.pk.name
+        if field.lstrip('-') in ('pk', pk_name):
+            return ['-pk' if field.startswith('-') else 'pk']
+        return [field, '-pk' if field.startswith('-') else 'pk']
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[-1], reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[0], reverse=True))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            value = tokens.get('p', [None])[0]
+            key = tokens['k'][0]
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return KeysetCursor(reverse=reverse, value=value, key=key)
+
+    def encode_cursor(self, cursor):
+        tokens = {'k': cursor.key}
+        if cursor.reverse:
+            tokens['r'] = '1'
+        if cursor.value is not None:
+            tokens['p'] = cursor.value
+
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _position(self, instance, reverse):
+        value = None
+        if len(self.ordering) > 1:
+            value = self._raw_attr(instance, self.ordering[0])
+            value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        key = self._raw_attr(instance, 'pk')
+        return KeysetCursor(reverse=reverse, value=value, key=str(key))
+
+    def _raw_attr(self, instance, field):
+        field = field.lstrip('-')
+        if isinstance(instance, dict):
+            if field == 'pk':
+                return instance.get(self._pk_field.name, instance.get('pk'))
+            return instance[field]
+        return getattr(instance, field)
+
+    def _after(self, cursor, descending):
+        lookup = 'lt' if descending else 'gt'
+        try:
+            key = self._pk_field.to_python(cursor.key)
+            if len(self.ordering) == 1:
+                return Q(**{f'pk__{lookup}': key})
+            field = self.ordering[0].lstrip('-')
+            value = self._model._meta.get_field(field).to_python(cursor.value)
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        return Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'pk__{lookup}': key})
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else '-' + field
@@ -0,0 +1,204 @@
+"""
+Bulk salary adjustments.
+
+Employee.save() derives `hourly_rate` from `salary`, so raising 2,000
+salaries one save at a time costs 2,000 round trips, and bulk_update would
+skip the rule. `adjust_salaries` takes a list of adjustments, each a new
+salary or a percentage raise (negative for a cut):
+
+    [(12, Decimal('2277.00'), None), (13, None, Decimal('5'))]
+
+and, in one transaction:
+
+1. Reads and locks the employees, SALARY_ADJUSTMENT_BATCH_SIZE per query,
+   and the date of each one's latest recorded change.
+2. Computes the new salaries and hourly rates in Decimal, rounded as
+   Employee.save() rounds them (`Employee.hourly_rate_for`).
+3. Writes them with one prepared UPDATE run for all the employees
+   (executemany), and records a `SalaryChange` per employee with the rates
+   before and after.
+
+Employee.save() records a SalaryChange, effective that day, when it changes
+a salary, so single edits keep the history too.
+
+A change takes effect on its `effective_date`, today by default. Earlier
+days keep the previous rate: `rate_on` looks up the rate for a day, and CSV
+timesheet imports use it for rows left without a rate. Existing timesheets
+carry their own rate and are not touched. A change can not be dated in the
+future, nor before an employee's latest recorded change.
+
+If any adjustment is invalid nothing is written; the errors are returned by
+item index, in BaseApp.bulk's format. The UPDATE bypasses save() and
+signals, so cached Employee responses are invalidated here.
+"""
+import bisect
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import response_cache
+from .bulk import _to_pk
+from .models import Employee, SalaryChange
+
+SALARY_FIELD = Employee._meta.get_field('salary')
+SALARY_PLACES = Decimal(1).scaleb(-SALARY_FIELD.decimal_places)
+WRITTEN_FIELDS = [Employee._meta.get_field(name) for name in ('salary', 'hourly_rate', 'created_at')]
+
+
+def _batches(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _write(employees):
+    """
+    Save the WRITTEN_FIELDS of `employees`. bulk_update's CASE expressions
+    cost about ten times as much to build and run for a few thousand rows.
+    """
+    quote = connection.ops.quote_name
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote(Employee._meta.db_table),
+        ', '.join(f'{quote(field.column)} = %s' for field in WRITTEN_FIELDS),
+        quote(Employee._meta.pk.column),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            [field.get_db_prep_save(getattr(employee, field.attname), connection) for field in WRITTEN_FIELDS]
+            + [employee.pk]
+            for employee in employees
+        ])
+
+
+def new_salary(current, salary=None, percent=None):
+    """The adjusted salary, rounded to the column's places."""
+    if salary is None:
+        salary = current * (1 + Decimal(percent) / 100)
+    return Decimal(salary).quantize(SALARY_PLACES, rounding=ROUND_HALF_EVEN)
+
+
+def adjust_salaries(items, effective_date=None, batch_size=None):
+    """
+    Apply `items`, (pk, salary, percent) tuples with one of salary or
+    percent set, effective on `effective_date`. Returns (the adjusted
+    employees' pks, errors); nothing is written if there are errors.
+    """
+    effective_date = effective_date or timezone.localdate()
+    if effective_date > timezone.localdate():
+        raise ValueError("effective_date can not be in the future.")
+    batch_size = batch_size or getattr(settings, 'SALARY_ADJUSTMENT_BATCH_SIZE', 500)
+
+    with transaction.atomic():
+        pks = [_to_pk(Employee, pk) for pk, _, _ in items]
+        employees, latest = {}, {}
+        for batch in _batches({pk for pk in pks if pk is not None}, batch_size):
+            # select_for_update() is a no-op on backends without FOR UPDATE (SQLite).
+            employees.update(
+                (employee.pk, employee) for employee in
+                Employee.objects.filter(pk__in=batch).order_by('pk').select_for_update()
+                .only('pk', 'company_id', 'salary', 'hourly_rate')
+            )
+            latest.update(
+                SalaryChange.objects.filter(employee_id__in=batch).values('employee_id')
+                .annotate(latest=Max('effective_date')).values_list('employee_id', 'latest')
+            )
+
+        now = timezone.now()
+        errors, changes, seen = [], [], set()
+        for index, (pk, (_, salary, percent)) in enumerate(zip(pks, items)):
+            employee = employees.get(pk)
+            if employee is None:
+                errors.append({"index": index, "errors": {"id": ["Not found."]}})
+                continue
+            if pk in seen:
+                errors.append({"index": index, "errors": {"id": ["Duplicate item."]}})
+                continue
+            seen.add(pk)
+            if pk in latest and latest[pk] > effective_date:
+                errors.append({"index": index, "errors": {"effective_date": [
+                    f"A change effective {latest[pk].isoformat()} is already recorded."
+                ]}})
+                continue
+            value = new_salary(employee.salary, salary, percent)
+            try:
+                if value < 0:
+                    raise ValidationError("Must not be negative.")
+                SALARY_FIELD.run_validators(value)
+            except ValidationError as exc:
+                errors.append({"index": index, "errors": {"salary": exc.messages}})
+                continue
+            changes.append(SalaryChange(
+                employee_id=pk, effective_date=effective_date,
+                previous_salary=employee.salary, previous_hourly_rate=employee.hourly_rate,
+                salary=value, hourly_rate=Employee.hourly_rate_for(value),
+            ))
+            employee.salary, employee.hourly_rate = value, changes[-1].hourly_rate
+            employee.created_at = now  # auto_now, as save() would set it
+        if errors:
+            return [], errors
+
+        adjusted = [employees[change.employee_id] for change in changes]
+        _write(adjusted)
+        SalaryChange.objects.bulk_create(changes, batch_size=batch_size)
+        response_cache.invalidate(
+            Employee, [employee.pk for employee in adjusted],
+            {'company_id': {employee.company_id for employee in adjusted}},
+        )
+    return [employee.pk for employee in adjusted], []
+
+
+def rate_schedules(employee_ids):
+    """
+    {employee id: (effective dates, hourly rates before them)} of the
+    employees' recorded changes, in date order, for `rate_on`.
+    """
+    schedules = {}
+    changes = SalaryChange.objects.filter(employee_id__in=employee_ids).order_by(
+        'employee_id', 'effective_date', 'pk'
+    ).values_list('employee_id', 'effective_date', 'previous_hourly_rate')
+    for employee_id, effective_date, rate in changes:
+        dates, rates = schedules.setdefault(employee_id, ([], []))
+        dates.append(effective_date)
+        rates.append(rate)
+    return schedules
+
+
+def rate_on(schedule, current_rate, day):
+    """The hourly rate paid on `day`: the one before the first change after it, or the current one."""
+    if not schedule:
+        return current_rate
+    dates, rates = schedule
+    index = bisect.bisect_right(dates, day)
+    return rates[index] if index < len(rates) else current_rate
+
+
+class SalaryAdjustmentItemSerializer(serializers.Serializer):
+    id = serializers.JSONField()
+    salary = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'), required=False)
+    percent = serializers.DecimalField(max_digits=6, decimal_places=2, min_value=Decimal('-100'), required=False)
+
+    def validate(self, attrs):
+        if ('salary' in attrs) == ('percent' in attrs):
+            raise serializers.ValidationError("Give one of salary or percent.")
+        return attrs
+
+
+class SalaryAdjustmentSerializer(serializers.Serializer):
+    effective_date = serializers.DateField(required=False)
+    items = SalaryAdjustmentItemSerializer(many=True, allow_empty=False)
+
+    def validate_effective_date(self, value):
+        if value > timezone.localdate():
+            raise serializers.ValidationError("Can not be in the future.")
+        return value
+
+    def validate_items(self, value):
+        max_items = getattr(settings, 'SALARY_ADJUSTMENT_MAX_ITEMS', 5000)
+        if len(value) > max_items:
+            raise serializers.ValidationError(f"At most {max_items} items per request.")
+        return value
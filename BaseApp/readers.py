@@ -0,0 +1,161 @@
+"""
+values()-based read path for list endpoints.
+
+Building a model instance per row and walking every serializer field is most
+of the cost of a large list response. A `ValuesReader` fetches the same
+columns with `.values()` (related fields become joined columns) and renders
+plain dicts in exactly the shape its `serializer_class` produces, reusing the
+serializer fields' own `to_representation` so number, date and choice
+formatting cannot drift. Serializers remain the only write path.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import RelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .mixins import SparseFieldsetViewMixin
+
+
+class ValuesReader:
+    """
+    Subclasses set `serializer_class` and provide a `method_fields` entry for
+    each SerializerMethodField it declares: `name -> function`, where
+    `function(row)` builds the value from the `.values()` columns listed for
+    that field in the serializer's `Meta.field_sources`.
+    """
+    serializer_class = None
+    method_fields = {}
+
+    def __init__(self):
+        model = self.serializer_class.Meta.model
+        self.pk_name = model._meta.pk.name
+        self.ordering = model._meta.ordering
+        field_sources = getattr(self.serializer_class.Meta, 'field_sources', {})
+        # (key, column, guard columns, serializer field); column is None for
+        # method fields, whose builder takes the serializer field's place.
+        self.fields = []
+        self.columns = {}
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                self.columns[name] = tuple(field_sources[name])
+                self.fields.append((name, None, (), self.method_fields[name]))
+                continue
+
+            path = field.source.split('.')
+            if not self._resolves(model, path):
+                # The serializer can never read this attribute either and
+                # silently leaves the key out.
+                continue
+            column = '__'.join(path)
+            # Like the serializer, drop the key when a relation on the way
+            # to the value is empty.
+            guards = tuple('__'.join(path[:i]) for i in range(1, len(path)))
+            self.columns[name] = (column, *guards)
+            self.fields.append((name, column, guards, field))
+
+    @staticmethod
+    def _resolves(model, path):
+        for attr in path:
+            if model is None:
+                return False
+            try:
+                field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return False
+            model = field.related_model
+        return True
+
+    @staticmethod
+    def _converter(field, tz):
+        """
+        The field's own to_representation, short-circuited where the value
+        read from the database is already in its output form.
+        """
+        if isinstance(field, (RelatedField, serializers.IntegerField)) or type(field) is serializers.CharField:
+            return None
+        if (
+            isinstance(field, serializers.DateTimeField)
+            and getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601
+            and not hasattr(field, 'timezone')
+        ):
+            # DateTimeField.to_representation with the active timezone
+            # looked up once per render rather than once per value.
+            def convert(value):
+                if tz is not None and timezone.is_aware(value):
+                    value = value.astimezone(tz)
+                value = value.isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return convert
+        return field.to_representation
+
+    def _plan(self, fields=None):
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        return [
+            (name, column, guards, field if column is None else self._converter(field, tz))
+            for name, column, guards, field in self.fields
+            if fields is None or name in fields
+        ]
+
+    def values(self, queryset, fields=None, extra=()):
+        """`.values()` over the columns the given fields (default all) read, and `extra`."""
+        columns = {self.pk_name: None, **dict.fromkeys(extra)}
+        # Pagination reads the ordering column from each row.
+        for name in queryset.query.order_by or self.ordering:
+            if isinstance(name, str) and name.lstrip('-') != 'pk':
+                columns[name.lstrip('-')] = None
+        for name, _, _, _ in self.fields:
+            if fields is None or name in fields:
+                columns.update(dict.fromkeys(self.columns[name]))
+        return queryset.values(*columns)
+
+    def to_representation(self, row, plan=None):
+        data = {}
+        for name, column, guards, convert in plan or self._plan():
+            if column is None:
+                data[name] = convert(row)
+                continue
+            if guards and any(row[guard] is None for guard in guards):
+                continue
+            value = row[column]
+            data[name] = value if value is None or convert is None else convert(value)
+        return data
+
+    def render(self, rows, fields=None):
+        plan = self._plan(fields)
+        return [self.to_representation(row, plan) for row in rows]
+
+    def iter_render(self, rows, fields=None):
+        """Lazy render(), for streaming from `.iterator()`."""
+        plan = self._plan(fields)
+        for row in rows:
+            yield self.to_representation(row, plan)
+
+
+class ValuesListMixin(SparseFieldsetViewMixin):
+    """
+    ViewSet mixin serving read-only list requests through `values_reader`
+    instead of the serializer. Filtering, pagination and `?fields=` are
+    unchanged; `?expand=` requests fall back to the serializer, which
+    renders the nested objects.
+    """
+    values_reader = None
+
+    def list(self, request, *args, **kwargs):
+        if self.sparse_fieldset[1]:
+            return super().list(request, *args, **kwargs)
+        return self.values_list_response(self.filter_queryset(self.get_queryset()))
+
+    def values_list_response(self, queryset, paginate=True):
+        fields = self.sparse_fieldset[0]
+        # Related timestamps for ConditionalGetMixin's validators, in the same query.
+        extra = self.related_modified_paths() if paginate and hasattr(self, 'related_modified_paths') else ()
+        rows = self.values_reader.values(queryset, fields, extra)
+        page = self.paginate_queryset(rows) if paginate else None
+        if page is not None:
+            return self.get_paginated_response(self.values_reader.render(page, fields))
+        return Response(self.values_reader.render(rows, fields))
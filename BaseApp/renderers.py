@@ -0,0 +1,115 @@
+"""
+JSON renderer and parser with a pluggable encoder backend, and an optional
+MessagePack renderer and parser.
+
+With `API_JSON_BACKEND = 'auto'` (the default) and orjson installed, JSON is
+encoded and decoded by orjson; otherwise, or with `'stdlib'`, by the standard
+library exactly as DRF's own JSONRenderer/JSONParser do. Output is byte-for-
+byte the same either way: datetimes, Decimals and other non-native types go
+through DRF's JSONEncoder.default, and U+2028/U+2029 are escaped.
+
+`application/msgpack` is offered when msgpack is installed (see the
+REST_FRAMEWORK setting). A MessagePack body decodes to exactly what the JSON
+body for the same response decodes to. Most serializer output is already
+strings, numbers, booleans, null, lists and maps; values a view or method
+field hands over unserialized are converted as the JSON renderer converts
+them: DecimalField output stays a string ("12.50"), while a bare Decimal
+becomes a float, and datetime, date and time become the same ISO 8601
+strings.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional
+    msgpack = None
+
+if orjson is not None:
+    # Datetimes are passed to the DRF encoder, whose format (millisecond
+    # precision, "Z" for UTC) differs from orjson's.
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+_default = JSONEncoder().default
+
+
+def fast_json_enabled():
+    return (
+        orjson is not None
+        and getattr(settings, 'API_JSON_BACKEND', 'auto') != 'stdlib'
+        # orjson always writes compact UTF-8.
+        and not JSONRenderer.ensure_ascii
+        and JSONRenderer.compact
+    )
+
+
+def dumps(data):
+    """Compact JSON bytes, as JSONRenderer renders `data` without indentation."""
+    if fast_json_enabled():
+        try:
+            content = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits; the stdlib path handles those
+            # and raises the usual error for anything unserializable.
+            pass
+        else:
+            if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+                content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+            return content
+    return JSONRenderer().render(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer using `dumps()`; indented output stays on the stdlib path."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if not fast_json_enabled() or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            # Like the strict stdlib parser, orjson rejects NaN and Infinity.
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
@@ -0,0 +1,312 @@
+"""
+Flat tabular reports for spreadsheets and the BI loader.
+
+A report is a fixed list of `(header, column)` pairs over one model, where a
+column may follow foreign keys (`assignee__name`), so each row carries its
+assignee and job info without a second query. Rows are read with
+`.values_list(...).iterator(chunk_size=...)`: plain tuples straight off the
+database cursor, never model instances, written out one chunk at a time as
+CSV or, when pyarrow is installed, Parquet.
+
+CSV can be streamed directly over HTTP. Large exports run as `ReportExport`
+jobs, which write the file to default storage for later download. They are
+run by the `run_report_exports` worker, which also requeues jobs a dead
+worker left Running (BaseApp.jobs). A running export refreshes its
+heartbeat after each chunk it writes, so a slow one is not taken for dead.
+"""
+import csv
+import io
+import itertools
+import logging
+import tempfile
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, models, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import serializers
+
+from . import jobs
+from .models import ReportExport
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet output is optional
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+
+class ReportQuerySerializer(serializers.Serializer):
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    updated_since = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError(
+                {"date_to": "Must be on or after date_from"}
+            )
+        return data
+
+
+class Report:
+    """
+    `model` is an "app_label.Model" label, resolved lazily so BaseApp does
+    not import the apps it reports on. `date_field` is the column the
+    `date_from`/`date_to` filters apply to.
+    """
+
+    def __init__(self, model, columns, date_field):
+        self.model_label = model
+        self.headers = [header for header, _ in columns]
+        self.columns = [column for _, column in columns]
+        self.date_field = date_field
+
+    @cached_property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @cached_property
+    def model_fields(self):
+        """The concrete model field each column ends on (FKs followed to their target)."""
+        fields = []
+        for column in self.columns:
+            model, field = self.model, None
+            for name in column.split('__'):
+                field = model._meta.get_field(name)
+                model = field.related_model
+            while field.is_relation:
+                field = field.target_field
+            fields.append(field)
+        return fields
+
+    def rows(self, filters, chunk_size):
+        queryset = self.model._default_manager.all()
+        if 'date_from' in filters:
+            queryset = queryset.filter(**{f'{self.date_field}__gte': filters['date_from']})
+        if 'date_to' in filters:
+            queryset = queryset.filter(**{f'{self.date_field}__lte': filters['date_to']})
+        if 'updated_since' in filters:
+            queryset = queryset.filter(updated_at__gte=filters['updated_since'])
+        # Primary key order keeps the output stable while it is written.
+        return queryset.order_by('pk').values_list(*self.columns).iterator(chunk_size=chunk_size)
+
+    def chunks(self, filters, chunk_size=None):
+        chunk_size = chunk_size or getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+        rows = self.rows(filters, chunk_size)
+        while chunk := list(itertools.islice(rows, chunk_size)):
+            yield chunk
+
+
+ASSIGNEE_COLUMNS = [
+    ('assignee_id', 'assignee'),
+    ('assignee_name', 'assignee__name'),
+    ('assignee_email', 'assignee__email'),
+    ('assignee_position', 'assignee__position'),
+]
+
+# Task and SubContracting carry denormalized job card / RFQ / client keys.
+JOB_COLUMNS = [
+    ('job_id', 'job_card'),
+    ('job_number', 'job_card__job_number'),
+    ('job_status', 'job_card__status'),
+    ('rfq_id', 'rfq'),
+    ('quotation_number', 'rfq__quotation_number'),
+    ('client_id', 'client'),
+    ('client_name', 'client__client_name'),
+]
+
+REPORTS = {
+    'timesheets': Report('timesheet.Timesheet', [
+        ('timesheet_id', 'timesheet_id'),
+        ('date_logged', 'date_logged'),
+        ('hours_logged', 'hours_logged'),
+        ('hourly_rate', 'hourly_rate'),
+        ('total_amount', 'total_amount'),
+        ('remarks', 'remarks'),
+        ('assignee_id', 'team_member'),
+        ('assignee_name', 'team_member__name'),
+        ('assignee_email', 'team_member__email'),
+        ('assignee_position', 'team_member__position'),
+        ('job_id', 'job'),
+        ('job_number', 'job__job_number'),
+        ('job_status', 'job__status'),
+        ('rfq_id', 'job__rfq'),
+        ('quotation_number', 'job__rfq__quotation_number'),
+        ('client_id', 'job__rfq__client'),
+        ('client_name', 'job__rfq__client__client_name'),
+        ('updated_at', 'updated_at'),
+    ], date_field='date_logged'),
+    'tasks': Report('client_new.Task', [
+        ('task_id', 'task_id'),
+        ('task_brief', 'task_brief'),
+        ('status', 'status'),
+        ('weightage', 'weightage'),
+        ('completion_percentage', 'completion_percentage'),
+        ('weighted_completion', 'weighted_completion'),
+        ('due_date', 'due_date'),
+        *ASSIGNEE_COLUMNS,
+        ('payment_ball_id', 'payment_ball'),
+        ('payment_ball_status', 'payment_ball__project_status'),
+        *JOB_COLUMNS,
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ], date_field='due_date'),
+    'subcontracts': Report('client_new.SubContracting', [
+        ('subcontract_id', 'subcontract_id'),
+        ('subcontract_brief', 'subcontract_brief'),
+        ('status', 'status'),
+        ('weightage', 'weightage'),
+        ('completion_percentage', 'completion_percentage'),
+        ('due_date', 'due_date'),
+        ('task_id', 'task'),
+        ('task_status', 'task__status'),
+        *ASSIGNEE_COLUMNS,
+        *JOB_COLUMNS,
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ], date_field='due_date'),
+}
+
+
+def available_formats():
+    return ['csv', 'parquet'] if pyarrow is not None else ['csv']
+
+
+FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+
+
+def _csv_chunks(report, filters, chunk_size=None):
+    """(CSV text, row count) pairs: the header, then one per chunk of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(report.headers)
+    yield buffer.getvalue(), 0
+
+    # str() of a datetime has a space instead of ISO 8601's "T".
+    datetimes = [
+        i for i, field in enumerate(report.model_fields) if isinstance(field, models.DateTimeField)
+    ]
+    for chunk in report.chunks(filters, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        if datetimes:
+            chunk = [list(row) for row in chunk]
+            for row in chunk:
+                for i in datetimes:
+                    if row[i] is not None:
+                        row[i] = row[i].isoformat()
+        writer.writerows(chunk)
+        yield buffer.getvalue(), len(chunk)
+
+
+def csv_chunks(report, filters, chunk_size=None):
+    """CSV text, header first, then one string per chunk of rows."""
+    for text, _ in _csv_chunks(report, filters, chunk_size):
+        yield text
+
+
+def write_csv(report, filters, fh, progress=None):
+    """Write the CSV file; calls `progress(rows written)` after each chunk."""
+    rows = 0
+    for text, count in _csv_chunks(report, filters):
+        fh.write(text.encode('utf-8'))
+        rows += count
+        if progress is not None and count:
+            progress(rows)
+    return rows
+
+
+def _arrow_type(field):
+    if isinstance(field, models.DecimalField):
+        return pyarrow.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.DateTimeField):
+        return pyarrow.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pyarrow.date32()
+    if isinstance(field, models.BooleanField):
+        return pyarrow.bool_()
+    if isinstance(field, (models.IntegerField, models.AutoField)):
+        return pyarrow.int64()
+    return pyarrow.string()
+
+
+def write_parquet(report, filters, fh, progress=None):
+    """Write the Parquet file; calls `progress(rows written)` after each chunk."""
+    schema = pyarrow.schema([
+        (header, _arrow_type(field)) for header, field in zip(report.headers, report.model_fields)
+    ])
+    rows = 0
+    with pyarrow.parquet.ParquetWriter(fh, schema) as writer:
+        for chunk in report.chunks(filters):
+            # One row group per chunk.
+            columns = [pyarrow.array(values, type=column.type) for values, column in zip(zip(*chunk), schema)]
+            writer.write_table(pyarrow.Table.from_arrays(columns, schema=schema))
+            rows += len(chunk)
+            if progress is not None:
+                progress(rows)
+    return rows
+
+
+WRITERS = {'csv': write_csv, 'parquet': write_parquet}
+
+
+def run_export(job):
+    """Write `job`'s file. Returns False if another runner already claimed it."""
+    if not jobs.claim(job):
+        return False
+
+    def record(rows):
+        # The heartbeat tells run_report_exports the job is still alive.
+        job.heartbeat_at = timezone.now()
+        ReportExport.objects.filter(pk=job.pk).update(heartbeat_at=job.heartbeat_at)
+
+    try:
+        filters = ReportQuerySerializer(data=job.filters)
+        filters.is_valid(raise_exception=True)
+        report = REPORTS[job.report]
+        extension = FORMATS[job.format][1]
+        with tempfile.TemporaryFile() as fh:
+            job.row_count = WRITERS[job.format](report, filters.validated_data, fh, progress=record)
+            fh.seek(0)
+            job.file.save(f'{job.report}-{job.pk}{extension}', File(fh), save=False)
+        job.status = ReportExport.DONE
+    except Exception as exc:
+        logger.exception("Report export %s failed", job.pk)
+        job.status = ReportExport.FAILED
+        job.error = str(exc)
+    job.finished_at = timezone.now()
+    job.save()
+    return True
+
+
+def _run_in_thread(pk):
+    try:
+        run_export(ReportExport.objects.get(pk=pk))
+    finally:
+        connection.close()
+
+
+def enqueue(job):
+    """
+    Start `job` according to REPORT_EXPORT_RUNNER: "worker" (default) leaves
+    it pending for the `run_report_exports` command, "inline" runs it before
+    returning, and "thread" runs it in a background thread of the web
+    process once the creating transaction commits (for development: the
+    thread dies with the process).
+    """
+    runner = getattr(settings, 'REPORT_EXPORT_RUNNER', 'worker')
+    if runner == 'inline':
+        run_export(job)
+    elif runner == 'thread':
+        transaction.on_commit(
+            lambda: threading.Thread(target=_run_in_thread, args=(job.pk,), daemon=True).start()
+        )
@@ -0,0 +1,190 @@
+"""
+Versioned response cache for read endpoints.
+
+GET list/retrieve responses of views using `CachedResponseMixin` are stored
+in Django's cache as rendered bytes plus headers, keyed on the absolute URL
+(hyperlinked representations embed the host), the negotiated media type and
+the user. Each entry records
+the versions of the namespaces it was built from and is served only while
+all of them are unchanged, so invalidating is a counter increment, never a
+key scan:
+
+- `<model>`: any write to the model; unscoped lists depend on it.
+- `<model>:<pk>`: one row; its detail responses depend on it.
+- `<model>@<fk>:<id>`: rows under one parent; lists filtered to that parent
+  depend on it instead of `<model>`, so writes under other parents leave
+  them cached.
+- `<model>:*` and `<model>@*`: writes whose rows or parents are unknown
+  (bulk UPDATEs); details and parent-scoped lists depend on these too.
+
+Save/delete signals (`watch()`) and the bulk UPDATE paths call
+`invalidate()`. Versions are bumped at once and again when the writing
+transaction commits, so a response read from not-yet-committed data can
+not outlive the write.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+PREFIX = 'response-cache'
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+def _version_key(namespace):
+    return f'{PREFIX}:version:{namespace}'
+
+
+def _lookup(entry_key, namespaces):
+    """The cached entry under `entry_key` and the current namespace versions."""
+    version_keys = {namespace: _version_key(namespace) for namespace in namespaces}
+    found = cache.get_many([entry_key, *version_keys.values()])
+    missing = [key for key in version_keys.values() if key not in found]
+    if missing:
+        # Seed missing versions from the clock, as client_new.dashboard does,
+        # so an evicted counter never returns to a number entries were stored under.
+        seed = int(time.time() * 1000)
+        for key in missing:
+            cache.add(key, seed, None)
+        found.update(cache.get_many(missing))
+    return found.get(entry_key), {namespace: found.get(key) for namespace, key in version_keys.items()}
+
+
+def _bump(namespaces):
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            pass  # never seeded, so nothing is stored under it
+
+
+def invalidate(model, pks=None, parents=None):
+    """
+    Record a write to rows `pks` of `model` (None: unknown rows). `parents`
+    maps FK attnames to the parent ids the rows belonged to, before and
+    after; None when unknown.
+    """
+    label = model._meta.label
+    namespaces = [label]
+    if pks is None:
+        namespaces.append(f'{label}:*')
+    else:
+        namespaces.extend(f'{label}:{pk}' for pk in set(pks) - {None})
+    if parents is None:
+        namespaces.append(f'{label}@*')
+    else:
+        for fk, parent_ids in parents.items():
+            namespaces.extend(f'{label}@{fk}:{parent_id}' for parent_id in set(parent_ids) - {None})
+
+    _bump(namespaces)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(namespaces))
+
+
+def watch(model, parents=()):
+    """
+    Invalidate on every save/delete of `model`. `parents` are FK attnames
+    (e.g. 'job_card_id'); a `_previous_<attname>` attribute set by a
+    pre_save handler also invalidates the parent a row moved away from.
+    """
+    def changed(sender, instance, **kwargs):
+        invalidate(sender, [instance.pk], {
+            fk: {getattr(instance, fk), getattr(instance, f'_previous_{fk}', None)} for fk in parents
+        })
+
+    uid = f'response_cache:{model._meta.label}'
+    post_save.connect(changed, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(changed, sender=model, weak=False, dispatch_uid=uid)
+
+
+class CachedResponseMixin:
+    """
+    ViewSet mixin caching `list` and `retrieve` responses (see module
+    docstring). List it first, before mixins that override those actions.
+
+    - `cache_depends_on`: other models whose fields the representation
+      always embeds (e.g. an RFQ's client_name). Relations named in
+      `?expand=` are added automatically.
+    - `cache_parent_filters`: query parameter -> FK attname, for filters
+      that scope a list to one parent.
+
+    The browsable API is never cached.
+    """
+    cache_depends_on = ()
+    cache_parent_filters = {}
+
+    def list(self, request, *args, **kwargs):
+        model = self.get_queryset().model
+        label = model._meta.label
+        scoped = [
+            f'{label}@{fk}:{request.query_params[param]}'
+            for param, fk in self.cache_parent_filters.items() if param in request.query_params
+        ]
+        namespaces = [*scoped, f'{label}@*'] if scoped else [label]
+        return self.cached_response(request, namespaces, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        label = self.get_queryset().model._meta.label
+        pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return self.cached_response(request, [f'{label}:{pk}', f'{label}:*'], super().retrieve, *args, **kwargs)
+
+    def cache_dependencies(self):
+        models = list(self.cache_depends_on)
+        expand = getattr(self, 'sparse_fieldset', (None, ()))[1]
+        if expand:
+            expandable = getattr(self.get_serializer_class().Meta, 'expandable_fields', {})
+            models.extend(expandable[name].Meta.model for name in expand if name in expandable)
+        return [model._meta.label for model in models]
+
+    def response_cache_key(self, request):
+        user = request.user.pk if request.user.is_authenticated else 'anon'
+        key = '|'.join([request.build_absolute_uri(), request.accepted_media_type, str(user)])
+        return f'{PREFIX}:response:{hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()}'
+
+    def cached_response(self, request, namespaces, handler, *args, **kwargs):
+        self._cache_store = None
+        if request.method not in ('GET', 'HEAD') or request.accepted_renderer.format == 'api':
+            return handler(request, *args, **kwargs)
+
+        key = self.response_cache_key(request)
+        # Versions are read before the database, so a write landing in
+        # between bumps them past what this entry is stored under.
+        entry, versions = _lookup(key, [*namespaces, *self.cache_dependencies()])
+        if entry is not None and entry['versions'] == versions:
+            return self.response_from_entry(request, entry)
+        self._cache_store = (key, versions)
+        return handler(request, *args, **kwargs)
+
+    @staticmethod
+    def response_from_entry(request, entry):
+        headers = entry['headers']
+        if 'ETag' in headers or 'Last-Modified' in headers:
+            not_modified = get_conditional_response(
+                request, etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(headers.get('Last-Modified', '')),
+            )
+            if not_modified is not None and not_modified.status_code == 304:
+                for name in ('ETag', 'Last-Modified'):
+                    if name in headers:
+                        not_modified[name] = headers[name]
+                return not_modified
+        return HttpResponse(entry['content'], headers=headers)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        store = getattr(self, '_cache_store', None)
+        if store is not None and response.status_code == 200 and not response.streaming:
+            key, versions = store
+            response.render()
+            cache.set(key, {
+                'versions': versions,
+                'content': response.content,
+                'headers': {name: response[name] for name in CACHED_HEADERS if response.has_header(name)},
+            }, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+        return response
@@ -0,0 +1,97 @@
+"""
+Human-readable document numbers: INV-2026-000042, QTN-2026-00007, ...
+
+Each series restarts at 1 every year. Its formats live in the
+NUMBER_SERIES setting:
+
+    NUMBER_SERIES = {'invoice': 'INV-{year}-{number:06d}', ...}
+
+Numbers are handed out with the hi/lo scheme. The `NumberSequence` row of
+a series and year holds the next unreserved number. A process reserves a
+block of NUMBER_BLOCK_SIZE numbers from it with one UPDATE, then hands them
+out from memory, so only one allocation in a block waits on the row lock.
+A block is kept for later allocations only once the transaction that
+reserved it has committed. Rolled back or unused numbers, such as the rest
+of a block when the process exits, are skipped for good. Series are unique
+but not gap-free.
+"""
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import NumberSequence
+
+DEFAULT_SERIES = {
+    'invoice': 'INV-{year}-{number:06d}',
+    'quotation': 'QTN-{year}-{number:05d}',
+    'job': 'JOB-{year}-{number:05d}',
+}
+
+_lock = threading.Lock()
+_blocks = {}  # (series, year): [next, end) of the block reserved by this process
+
+
+def series_format(series):
+    formats = {**DEFAULT_SERIES, **getattr(settings, 'NUMBER_SERIES', {})}
+    try:
+        return formats[series]
+    except KeyError:
+        raise ValueError(f"Unknown number series: {series}")
+
+
+def reserve(series, year, size):
+    """Reserve `size` numbers of `series` in `year`; returns the first."""
+    with transaction.atomic():
+        updated = NumberSequence.objects.filter(series=series, year=year).update(
+            next_value=F('next_value') + size
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    NumberSequence.objects.create(series=series, year=year, next_value=1 + size)
+                return 1
+            except IntegrityError:
+                # Created by a concurrent first allocation.
+                NumberSequence.objects.filter(series=series, year=year).update(
+                    next_value=F('next_value') + size
+                )
+        end = NumberSequence.objects.filter(series=series, year=year).values_list('next_value', flat=True).get()
+    return end - size
+
+
+def allocate(series, count=1, year=None):
+    """`count` new numbers of `series`, formatted, in ascending order."""
+    template = series_format(series)
+    year = year or timezone.localdate().year
+    key = (series, year)
+
+    numbers = []
+    with _lock:
+        block = _blocks.get(key)
+        if block is not None:
+            take = min(count, block[1] - block[0])
+            numbers.extend(range(block[0], block[0] + take))
+            block[0] += take
+
+    missing = count - len(numbers)
+    if missing:
+        size = max(missing, getattr(settings, 'NUMBER_BLOCK_SIZE', 20))
+        start = reserve(series, year, size)
+        numbers.extend(range(start, start + missing))
+        if size > missing:
+            rest = [start + missing, start + size]
+
+            def keep():
+                with _lock:
+                    _blocks[key] = rest
+
+            transaction.on_commit(keep)
+
+    return [template.format(year=year, number=number) for number in numbers]
+
+
+def next_number(series, year=None):
+    return allocate(series, 1, year)[0]
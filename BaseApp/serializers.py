@@ -1,10 +1,203 @@
+from urllib.parse import quote
+
+from django.core.exceptions import FieldDoesNotExist
+from django.urls import NoReverseMatch, reverse
+from django.utils.http import RFC3986_SUBDELIMS
 from rest_framework import serializers
-from BaseApp.models import Company,Employee
+from rest_framework.relations import ManyRelatedField
+from BaseApp.models import Company,Employee,ReportExport
+from BaseApp.reports import REPORTS, ReportQuerySerializer, available_formats
 from django.contrib.auth.models import User
 
 
+class SparseFieldsetMixin:
+    """
+    Serializer mixin for `?fields=` / `?expand=`.
+
+    `fields` limits the rendered fields (write-only fields are unaffected);
+    `expand` renders the relations named in `Meta.expandable_fields` as
+    nested objects instead of primary keys. `optimize_queryset()` trims a
+    queryset to the columns, joins and prefetches those fields read.
+
+    Meta options:
+    - `expandable_fields`: relation name -> nested serializer class.
+    - `field_sources`: SerializerMethodField name -> ORM paths it reads.
+    - `field_aliases`: name used in the response -> serializer field name,
+      for serializers that rename keys in to_representation.
+    """
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sparse_fields = fields
+        self.expand = expand
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in self.expand:
+            fields[name] = expandable[name](read_only=True)
+        if self.sparse_fields is not None:
+            fields = {
+                name: field for name, field in fields.items()
+                if name in self.sparse_fields or name in self.expand or field.write_only
+            }
+        return fields
+
+    @classmethod
+    def resolve_fieldset(cls, fields=None, expand=()):
+        """
+        Validate requested names and map response aliases to serializer
+        field names. Raises ValidationError for unknown names.
+        """
+        expandable = getattr(cls.Meta, 'expandable_fields', {})
+        unknown = [name for name in expand if name not in expandable]
+        if unknown:
+            raise serializers.ValidationError({'expand': [f"Unknown expansion: {', '.join(unknown)}"]})
+        if fields is None:
+            return None, tuple(expand)
+
+        aliases = getattr(cls.Meta, 'field_aliases', {})
+        readable = {name for name, field in cls().fields.items() if not field.write_only}
+        resolved = {aliases.get(name, name) for name in fields}
+        unknown = sorted(resolved - readable)
+        if unknown:
+            raise serializers.ValidationError({'fields': [f"Unknown field: {', '.join(unknown)}"]})
+        return resolved, tuple(expand)
+
+    @classmethod
+    def optimize_queryset(cls, queryset, fields=None, expand=()):
+        """
+        Restrict `queryset` to what the selected fields read: only() for the
+        columns, select_related() / prefetch_related() for the relations
+        still in use. Joins and prefetches that no selected field needs are
+        dropped.
+        """
+        serializer = cls(fields=fields, expand=expand)
+        columns, relations, prefetches = set(), set(), set()
+        exact = _collect(serializer, queryset.model, '', columns, relations, prefetches)
+
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        if not exact:
+            # A method field without declared sources may read any column.
+            return queryset
+
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        columns.update(
+            name.lstrip('-') for name in ordering
+            if isinstance(name, str) and name.lstrip('-') != 'pk'
+        )
+        return queryset.only(queryset.model._meta.pk.name, *columns)
+
+
+class CachedPrefixURLMixin:
+    """
+    Hyperlinked field mixin that reverses each view name once per response
+    and builds every further URL by inserting the quoted lookup value,
+    instead of calling reverse() for every row. The prefixes are kept in the
+    serializer context, which list and nested serializers share.
+    """
+    PLACEHOLDER = 'lookup-placeholder'
+
+    def get_url(self, obj, view_name, request, format):
+        if hasattr(obj, 'pk') and obj.pk in (None, ''):
+            return None
+        prefixes = self.context.setdefault('_url_prefixes', {})
+        key = (view_name, self.lookup_url_kwarg, format)
+        if key not in prefixes:
+            try:
+                url = self.reverse(
+                    view_name, kwargs={self.lookup_url_kwarg: self.PLACEHOLDER},
+                    request=request, format=format,
+                )
+            except NoReverseMatch:
+                url = None  # the lookup pattern rejects the placeholder
+            prefixes[key] = url.split(self.PLACEHOLDER, 1) if url and url.count(self.PLACEHOLDER) == 1 else None
+        if prefixes[key] is None:
+            return super().get_url(obj, view_name, request, format)
+        prefix, suffix = prefixes[key]
+        # Quoted the way reverse() quotes URL arguments.
+        value = quote(str(getattr(obj, self.lookup_field)), safe=RFC3986_SUBDELIMS + '/~:@')
+        return prefix + value + suffix
+
+
+class CachedHyperlinkedIdentityField(CachedPrefixURLMixin, serializers.HyperlinkedIdentityField):
+    pass
+
+
+class CachedHyperlinkedRelatedField(CachedPrefixURLMixin, serializers.HyperlinkedRelatedField):
+    pass
+
+
+class CachedHyperlinkedModelSerializer(serializers.HyperlinkedModelSerializer):
+    """HyperlinkedModelSerializer producing the same URLs with one reverse() per view name."""
+    serializer_url_field = CachedHyperlinkedIdentityField
+    serializer_related_field = CachedHyperlinkedRelatedField
+
+
+def _collect(serializer, model, prefix, columns, relations, prefetches):
+    """
+    Add the ORM paths the serializer's readable fields read, relative to
+    `prefix`. Returns False if some column requirement is unknown.
+    """
+    exact = True
+    field_sources = getattr(getattr(serializer, 'Meta', None), 'field_sources', {})
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            if name not in field_sources:
+                exact = False
+                continue
+            paths = [path.split('__') for path in field_sources[name]]
+        elif field.source == '*':
+            continue  # reads the object itself, e.g. a hyperlinked `url`
+        else:
+            paths = [field.source.split('.')]
+
+        for path in paths:
+            resolved = _resolve(model, path)
+            if resolved is None:
+                continue  # the serializer cannot read it either and skips it
+            model_field = resolved[-1]
+            for depth in range(1, len(path)):
+                relations.add(prefix + '__'.join(path[:depth]))
+                columns.add(prefix + '__'.join(path[:depth]))
+
+            if isinstance(field, ManyRelatedField):
+                prefetches.add(prefix + '__'.join(path))
+            elif isinstance(field, serializers.BaseSerializer):
+                relation = prefix + '__'.join(path)
+                relations.add(relation)
+                columns.add(relation)
+                exact &= _collect(
+                    field, model_field.related_model, relation + '__',
+                    columns, relations, prefetches,
+                )
+            else:
+                columns.add(prefix + '__'.join(path))
+    return exact
 
-class UserSerializer(serializers.ModelSerializer) :
+
+def _resolve(model, path):
+    resolved = []
+    for attr in path:
+        if model is None:
+            return None
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        resolved.append(field)
+        model = field.related_model
+    return resolved
+
+
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer) :
     class Meta:
         model = User
         fields = ["id", "username", "password"]
@@ -53,17 +246,69 @@ class UserSerializer(serializers.ModelSerializer) :
 
 #         return user
 
-class UserSerializer(serializers.HyperlinkedModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.HyperlinkedModelSerializer):
     class Meta:
         model=User
         fields="__all__" 
 
-class CompanySerializer(serializers.HyperlinkedModelSerializer):
+class CompanySerializer(SparseFieldsetMixin, CachedHyperlinkedModelSerializer):
     class Meta:
         model=Company
         fields="__all__" 
     
-class EmployeeSerializer(serializers.HyperlinkedModelSerializer):
+class EmployeeSerializer(SparseFieldsetMixin, CachedHyperlinkedModelSerializer):
+    class Meta:
+        model=Employee
+        fields="__all__"
+        expandable_fields = {'company': CompanySerializer}
+
+
+# Primary-key representations, served for `?links=ids`
+class CompanyIdSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model=Company
+        fields="__all__"
+
+
+class EmployeeIdSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    company_name = serializers.CharField(source='company.name', read_only=True)
+
     class Meta:
         model=Employee
-        fields="__all__"
\ No newline at end of file
+        fields="__all__"
+        expandable_fields = {'company': CompanyIdSerializer}
+
+
+class ReportExportSerializer(serializers.ModelSerializer):
+    filters = ReportQuerySerializer(required=False)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportExport
+        fields = [
+            'id', 'report', 'format', 'filters', 'status', 'row_count',
+            'error', 'created_at', 'finished_at', 'download_url'
+        ]
+        read_only_fields = ['status', 'row_count', 'error', 'created_at', 'finished_at']
+
+    def get_download_url(self, obj):
+        if obj.status != ReportExport.DONE:
+            return None
+        url = reverse('reportexport-download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def validate_report(self, value):
+        if value not in REPORTS:
+            raise serializers.ValidationError(f"Must be one of: {', '.join(REPORTS)}")
+        return value
+
+    def validate_format(self, value):
+        if value not in available_formats():
+            raise serializers.ValidationError(f"Must be one of: {', '.join(available_formats())}")
+        return value
+
+    def create(self, validated_data):
+        # Stored in their JSON form and re-validated when the job runs.
+        validated_data['filters'] = ReportQuerySerializer(validated_data.get('filters', {})).data
+        return ReportExport.objects.create(**validated_data)
@@ -1,3 +1,17 @@
-from django.dispatch import Signal
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import authentication, response_cache
+from .models import Company, Employee
 
 my_signal = Signal()
+
+response_cache.watch(Company)
+response_cache.watch(Employee, parents=['company_id'])
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def forget_cached_user(sender, instance, **kwargs):
+    authentication.forget_user(instance)
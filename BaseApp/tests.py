@@ -1,3 +1,516 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import JsonResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import idempotency, payroll, renderers, sequences
+from .models import Company, Employee, IdempotencyKey, NumberSequence, SalaryChange
+
+
+# Per-endpoint query budgets, checked against a seeded dataset so that the
+# count stays fixed however many rows are returned.
+QUERY_BUDGETS = [
+    ('company-list', None, 1),
+    ('company-detail', Company, 1),
+    ('employee-list', None, 1),
+    ('employee-detail', Employee, 1),
+]
+
+
+def seed_staff():
+    companies = Company.objects.bulk_create([
+        Company(name=f'Company {i}', location='Dubai', about='',
+                type='IT Solutions')
+        for i in range(50)
+    ])
+    Employee.objects.bulk_create([
+        Employee(
+            name=f'Employee {i}', email=f'employee{i}@seed.example',
+            contact='000', description='', location='Dubai',
+            company=companies[i % len(companies)], position='Team Members',
+            salary=Decimal('2070.00'), hourly_rate=Decimal('10.00'),
+        )
+        for i in range(2000)
+    ])
+
+
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_staff()
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_endpoints_within_budget(self):
+        for url_name, model, budget in QUERY_BUDGETS:
+            args = [model.objects.values_list('pk', flat=True).first()] if model else []
+            with self.subTest(url_name), self.assertNumQueries(budget):
+                response = self.client.get(reverse(url_name, args=args))
+                self.assertEqual(response.status_code, 200)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Plan assertions target SQLite EXPLAIN QUERY PLAN output')
+class IndexUsageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_staff()
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def query_plan(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + queries.captured_queries[0]['sql'])
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_case_insensitive_filters_search_an_index(self):
+        cases = [
+            ('BaseApp_employee', reverse('employee-list') + '?position=team%20MEMBERS'),
+            ('BaseApp_employee', reverse('employee-list') + '?location=DUBAI'),
+            ('BaseApp_company', reverse('company-list') + '?name=company%201'),
+            ('BaseApp_company', reverse('company-list') + '?location=dubai'),
+        ]
+        for table, url in cases:
+            with self.subTest(url):
+                plan = self.query_plan(url)
+                self.assertTrue(any(line.startswith(f'SEARCH {table} USING') for line in plan), plan)
+                self.assertFalse(any('TEMP B-TREE' in line for line in plan), plan)
+
+    def test_case_insensitive_filters_match_like_iexact(self):
+        response = self.client.get(reverse('employee-list') + '?location=DUBAI&page_size=5')
+        self.assertEqual(len(response.data['results']), 5)
+        response = self.client.get(reverse('employee-list') + '?position=nobody')
+        self.assertEqual(response.data['results'], [])
+
+
+class SparseFieldsetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_staff()
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_fields_and_expand(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('employee-list'), {'fields': 'name', 'expand': 'company'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"description"', queries[0]['sql'])
+        row = response.json()['results'][0]
+        self.assertEqual(set(row), {'name', 'company'})
+        self.assertEqual(row['company']['name'], Employee.objects.get(name=row['name']).company.name)
+
+
+class LinkModeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_staff()
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_cached_urls_match_reverse(self):
+        class StockEmployeeSerializer(serializers.HyperlinkedModelSerializer):
+            class Meta:
+                model = Employee
+                fields = '__all__'
+
+        response = self.client.get(reverse('employee-list'))
+        request = response.renderer_context['request']
+        employees = Employee.objects.filter(pk__in=[row['url'].rstrip('/').rsplit('/', 1)[1]
+                                                    for row in response.json()['results']])
+        expected = StockEmployeeSerializer(employees, many=True, context={'request': request}).data
+        self.assertEqual(
+            sorted(response.json()['results'], key=lambda row: row['url']),
+            sorted(json.loads(JSONRenderer().render(expected)), key=lambda row: row['url']),
+        )
+
+    def test_id_mode(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('employee-list'), {'links': 'ids'})
+        row = response.json()['results'][0]
+        employee = Employee.objects.select_related('company').get(pk=row['id'])
+        self.assertNotIn('url', row)
+        self.assertEqual(row['company'], employee.company_id)
+        self.assertEqual(row['company_name'], employee.company.name)
+
+        response = self.client.get(reverse('company-detail', args=[employee.company_id]), {'links': 'ids'})
+        self.assertEqual(response.json()['company_id'], employee.company_id)
+
+
+class FastJSONTests(TestCase):
+
+    SAMPLE = {
+        'text': 'na\u00efve \u2013 line\u2028para\u2029',
+        'amount': Decimal('12.50'),
+        'when': datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+        'day': date(2025, 1, 2),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'big': 2 ** 70,
+        'nested': [{1: None, 'ok': True}],
+    }
+
+    def test_renders_like_the_stock_renderer(self):
+        self.assertEqual(renderers.dumps(self.SAMPLE), JSONRenderer().render(self.SAMPLE))
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(self.SAMPLE, 'application/json; indent=2'),
+            JSONRenderer().render(self.SAMPLE, 'application/json; indent=2'),
+        )
+        with override_settings(API_JSON_BACKEND='stdlib'):
+            self.assertFalse(renderers.fast_json_enabled())
+            self.assertEqual(renderers.dumps(self.SAMPLE), JSONRenderer().render(self.SAMPLE))
+
+    def test_list_responses_match_the_stock_renderer(self):
+        seed_staff()
+        cache.clear()
+        response = APIClient().get(reverse('employee-list'), {'page_size': 500})
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_parser(self):
+        parser = renderers.FastJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO('{"a": [1, "é"]}'.encode())), {'a': [1, 'é']})
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"a": NaN}'))
+
+    @skipUnless(renderers.orjson is not None, "orjson is not installed")
+    def test_uses_orjson_when_installed(self):
+        self.assertTrue(renderers.fast_json_enabled())
+
+
+class GZipTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_staff()
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_large_responses_are_compressed(self):
+        response = self.client.get(reverse('employee-list'), {'page_size': 500}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(body['results']), 500)
+
+    def test_small_responses_are_not(self):
+        with override_settings(GZIP_MIN_LENGTH=10_000):
+            response = self.client.get(reverse('employee-list'), {'page_size': 2}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_staff()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_company_and_employee_endpoints_revalidate(self):
+        client = APIClient()
+        employee = Employee.objects.order_by('pk').first()
+        for url in (reverse('employee-list'), reverse('employee-detail', args=[employee.pk]),
+                    reverse('company-detail', args=[employee.company_id])):
+            with self.subTest(url):
+                etag = client.get(url)['ETag']
+                self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_company_name_is_revalidated_with_ids(self):
+        client = APIClient()
+        employee = Employee.objects.order_by('pk').first()
+        url = reverse('employee-detail', args=[employee.pk])
+        etag = client.get(url, {'links': 'ids'})['ETag']
+        employee.company.name = 'Renamed Co'
+        employee.company.save()
+        response = client.get(url, {'links': 'ids'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['company_name'], 'Renamed Co')
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('reader', password='first-password')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.url = reverse('reportexport-list')
+
+    def test_user_row_is_read_once(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        user = response.renderer_context['request'].user
+        self.assertEqual((user.pk, user.username), (self.user.pk, 'reader'))
+
+        # The password is left out of the cache, and so out of save().
+        user.first_name = 'Renamed'
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Renamed')
+        self.assertTrue(self.user.check_password('first-password'))
+
+    def test_user_changes_drop_the_cached_row(self):
+        self.client.get(self.url)
+        self.user.set_password('second-password')
+        self.user.save()
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+        self.user.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+@override_settings(NUMBER_BLOCK_SIZE=5)
+class NumberSequenceTests(TestCase):
+
+    def setUp(self):
+        sequences._blocks.clear()
+        self.addCleanup(sequences._blocks.clear)
+
+    def test_committed_block_is_handed_out_from_memory(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(sequences.allocate('invoice', 2, year=2026), ['INV-2026-000001', 'INV-2026-000002'])
+        with self.assertNumQueries(0):
+            self.assertEqual(sequences.allocate('invoice', 3, year=2026),
+                             ['INV-2026-000003', 'INV-2026-000004', 'INV-2026-000005'])
+        # The block is used up: the next one starts after it, whatever another process reserved.
+        NumberSequence.objects.filter(series='invoice', year=2026).update(next_value=11)
+        self.assertEqual(sequences.next_number('invoice', year=2026), 'INV-2026-000011')
+
+    def test_series_restart_each_year_and_batches_take_one_block(self):
+        self.assertEqual(sequences.next_number('job', year=2025), 'JOB-2025-00001')
+        self.assertEqual(sequences.next_number('job', year=2026), 'JOB-2026-00001')
+        with self.assertNumQueries(4):  # savepoint, UPDATE, SELECT, release
+            numbers = sequences.allocate('job', 12, year=2026)
+        self.assertEqual(numbers[0], 'JOB-2026-00006')
+        self.assertEqual(len(set(numbers)), 12)
+        self.assertEqual(NumberSequence.objects.get(series='job', year=2026).next_value, 18)
+
+    def test_uncommitted_block_is_not_kept(self):
+        sequences.allocate('quotation', year=2026)
+        self.assertEqual(sequences._blocks, {})
+        with self.assertRaises(ValueError):
+            sequences.allocate('nope')
+
+
+class IdempotencyTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('company-list')
+        self.company = {'name': 'Retry Co', 'location': 'Dubai', 'about': 'Created once', 'type': 'IT Solutions'}
+
+    def test_retry_replays_the_first_response(self):
+        first = self.client.post(self.url, self.company, format='json', HTTP_IDEMPOTENCY_KEY='abc-1')
+        self.assertEqual(first.status_code, 201)
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.client.post(self.url, self.company, format='json', HTTP_IDEMPOTENCY_KEY='abc-1')
+        self.assertEqual((retry.status_code, retry.content), (201, first.content))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry['Content-Type'], first['Content-Type'])
+        self.assertEqual(Company.objects.count(), 1)
+        self.assertFalse([query for query in queries if 'baseapp_company' in query['sql'].lower()])
+
+        # Another key (or none) is another request.
+        self.client.post(self.url, self.company, format='json', HTTP_IDEMPOTENCY_KEY='abc-2')
+        self.client.post(self.url, self.company, format='json')
+        self.assertEqual(Company.objects.count(), 3)
+
+    def test_key_reused_for_another_request(self):
+        self.client.post(self.url, self.company, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        response = self.client.post(self.url, {**self.company, 'name': 'Other'}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Company.objects.count(), 1)
+
+    def test_keys_belong_to_their_user(self):
+        user = User.objects.create_user('keyed')
+        self.client.post(self.url, self.company, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        response = self.client.post(self.url, self.company, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(set(IdempotencyKey.objects.values_list('scope', flat=True)), {'anonymous', f'user:{user.pk}'})
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0)
+    def test_request_in_progress_and_expired_keys(self):
+        request = APIRequestFactory().post(self.url, self.company, format='json')
+        claimed, _ = idempotency.claim('anonymous', 'busy', idempotency.request_fingerprint(request))
+        response = self.client.post(self.url, self.company, format='json', HTTP_IDEMPOTENCY_KEY='busy')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Company.objects.exists())
+
+        IdempotencyKey.objects.filter(pk=claimed.pk).update(expires_at=claimed.created_at)
+        response = self.client.post(self.url, self.company, format='json', HTTP_IDEMPOTENCY_KEY='busy')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0, IDEMPOTENCY_LOCK_TIMEOUT=60)
+    def test_claims_are_given_up_only_without_a_heartbeat(self):
+        request = APIRequestFactory().post(self.url, self.company, format='json')
+        slow, _ = idempotency.claim('anonymous', 'slow', idempotency.request_fingerprint(request))
+        long_ago = timezone.now() - timedelta(minutes=5)
+        IdempotencyKey.objects.filter(pk=slow.pk).update(created_at=long_ago)
+        response = self.client.post(self.url, self.company, format='json', HTTP_IDEMPOTENCY_KEY='slow')
+        self.assertEqual(response.status_code, 409)
+
+        # The slow request stopped beating: a retry takes the key over and
+        # the slow request's late response does not replace the retry's.
+        IdempotencyKey.objects.filter(pk=slow.pk).update(heartbeat_at=long_ago)
+        retry = self.client.post(self.url, self.company, format='json', HTTP_IDEMPOTENCY_KEY='slow')
+        self.assertEqual(retry.status_code, 201)
+        idempotency.finish(slow, JsonResponse({'late': True}, status=201))
+        replayed = self.client.post(self.url, self.company, format='json', HTTP_IDEMPOTENCY_KEY='slow')
+        self.assertEqual((replayed['Idempotent-Replayed'], replayed.content), ('true', retry.content))
+        self.assertEqual(Company.objects.count(), 1)
+
+
+class IdempotencyHeartbeatTests(TransactionTestCase):
+
+    def test_heartbeat_refreshes_the_claim_until_stopped(self):
+        record, _ = idempotency.claim('anonymous', 'beating', 'fingerprint')
+        long_ago = timezone.now() - timedelta(minutes=5)
+        IdempotencyKey.objects.filter(pk=record.pk).update(heartbeat_at=long_ago)
+        heartbeat = idempotency.Heartbeat(record, interval=0.01)
+        heartbeat.start()
+        time.sleep(0.1)
+        heartbeat.stop()
+        heartbeat.join()
+        self.assertGreater(IdempotencyKey.objects.get(pk=record.pk).heartbeat_at, long_ago)
+
+
+class SalaryAdjustmentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Payroll Co', location='Dubai', about='', type='IT Solutions')
+        cls.employees = [
+            Employee.objects.create(
+                name=f'Employee {i}', email=f'payroll{i}@example.com', contact='000', description='',
+                location='Dubai', company=company, position='Team Members', salary=Decimal('2070.00') + i,
+            )
+            for i in range(30)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('employee-adjust-salaries')
+
+    def test_rates_round_as_save_does(self):
+        items = [(employee.pk, None, Decimal('4.75')) for employee in self.employees[:-1]]
+        items.append((self.employees[-1].pk, Decimal('3001.13'), None))
+        with self.assertNumQueries(6):  # savepoint, 2 SELECTs, UPDATE, INSERT, release
+            pks, errors = payroll.adjust_salaries(items, date(2025, 1, 1))
+        self.assertEqual((len(pks), errors), (30, []))
+
+        for employee in Employee.objects.filter(pk__in=pks):
+            saved = Employee.objects.get(pk=employee.pk)
+            saved.save()
+            saved.refresh_from_db()
+            self.assertEqual((employee.salary, employee.hourly_rate), (saved.salary, saved.hourly_rate))
+        first = Employee.objects.get(pk=self.employees[0].pk)
+        self.assertEqual(first.salary, Decimal('2168.32'))  # 2070 * 1.0475 = 2168.325, half to even
+        change = first.salary_changes.get()
+        self.assertEqual((change.effective_date, change.previous_salary, change.previous_hourly_rate),
+                         (date(2025, 1, 1), Decimal('2070.00'), Decimal('10.00')))
+
+        schedules = payroll.rate_schedules([first.pk])
+        self.assertEqual(payroll.rate_on(schedules.get(first.pk), first.hourly_rate, date(2024, 12, 31)), Decimal('10.00'))
+        self.assertEqual(payroll.rate_on(schedules.get(first.pk), first.hourly_rate, date(2025, 1, 1)), first.hourly_rate)
+
+    def test_api_is_all_or_nothing(self):
+        client = APIClient()
+        payroll.adjust_salaries([(self.employees[1].pk, None, Decimal('5'))], date(2025, 6, 1))
+        response = client.post(self.url, {'effective_date': '2025-03-01', 'items': [
+            {'id': self.employees[0].pk, 'percent': '5'},
+            {'id': self.employees[0].pk, 'salary': '2500'},
+            {'id': 999999, 'salary': '2500'},
+            {'id': self.employees[1].pk, 'percent': '5'},
+            {'id': self.employees[2].pk, 'percent': '-100.01'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('percent', response.json()['items'][4])
+
+        response = client.post(self.url, {'effective_date': '2025-03-01', 'items': [
+            {'id': self.employees[0].pk, 'percent': '5'},
+            {'id': self.employees[0].pk, 'salary': '2500'},
+            {'id': 999999, 'salary': '2500'},
+            {'id': self.employees[1].pk, 'percent': '5'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1, 2, 3])
+        self.assertIn('effective_date', response.json()['errors'][2]['errors'])
+        self.assertEqual(Employee.objects.get(pk=self.employees[0].pk).salary, Decimal('2070.00'))
+
+        response = client.post(self.url, {'items': [{'id': self.employees[0].pk, 'salary': '2277'}]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['hourly_rate'], '11.00')
+
+    def test_single_edits_are_recorded(self):
+        employee = self.employees[0]
+        url = reverse('employee-detail', args=[employee.pk])
+        self.assertEqual(APIClient().patch(url, {'description': 'Moved desks'}, format='json').status_code, 200)
+        self.assertFalse(SalaryChange.objects.exists())
+
+        self.assertEqual(APIClient().patch(url, {'salary': '2277.00'}, format='json').status_code, 200)
+        change = SalaryChange.objects.get()
+        self.assertEqual((change.previous_hourly_rate, change.hourly_rate), (Decimal('10.00'), Decimal('11.00')))
+        schedules = payroll.rate_schedules([employee.pk])
+        self.assertEqual(payroll.rate_on(schedules[employee.pk], Decimal('11.00'), date(2020, 1, 1)), Decimal('10.00'))
+
+    def test_command(self):
+        call_command('adjust_salaries', '--percent', '10', '--all', '--effective-date', '2025-01-01', stdout=io.StringIO())
+        self.assertEqual(Employee.objects.get(pk=self.employees[0].pk).hourly_rate, Decimal('11.00'))
+        with self.assertRaises(CommandError):
+            call_command('adjust_salaries', '--percent', '10', stdout=io.StringIO())
+
+        Employee.objects.filter(pk=self.employees[1].pk).update(email='Payroll.One@Example.com')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as fh:
+            fh.write('email,salary\npayroll.one@example.com,3105.00\n')
+        self.addCleanup(os.remove, fh.name)
+        call_command('adjust_salaries', '--file', fh.name, stdout=io.StringIO())
+        self.assertEqual(Employee.objects.get(pk=self.employees[1].pk).hourly_rate, Decimal('15.00'))
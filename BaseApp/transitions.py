@@ -0,0 +1,120 @@
+"""
+Batch state transitions for ModelViewSets.
+
+`TransitionMixin` adds a `transition/` route that moves a list of rows to a
+new value of one state field (a color or status workflow):
+
+    POST {"ids": [12, 13, 14], "to": "purple"}
+
+The request is all-or-nothing. Within one transaction it:
+
+1. Locks the rows, in primary key order, with SELECT ... FOR UPDATE where
+   the backend has it, and reads their current states.
+2. Checks each move against `transitions`. Rows already in the target
+   state are left alone.
+3. Moves the rest with one UPDATE.
+4. Calls `perform_transition` for the viewset's side effects, which should
+   work on all the moved rows at once.
+
+Invalid items are answered with a 400 listing the errors by index, as
+BaseApp.bulk does. The UPDATE bypasses save() and model signals, so the
+response cache is invalidated here. Viewsets invalidate anything else
+their models' signals would have refreshed in `perform_transition`.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+
+from . import response_cache
+from .bulk import BulkWriteMixin, _to_pk, written_rows_response
+
+
+class TransitionSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.JSONField(), allow_empty=False)
+    to = serializers.CharField()
+
+    def validate_ids(self, value):
+        max_items = getattr(settings, 'BULK_MAX_ITEMS', 1000)
+        if len(value) > max_items:
+            raise serializers.ValidationError(f"At most {max_items} items per request.")
+        return value
+
+    def validate_to(self, value):
+        transitions = self.context['transitions']
+        if value not in transitions:
+            raise serializers.ValidationError(f"Must be one of: {', '.join(transitions)}")
+        return value
+
+
+class TransitionMixin:
+    """
+    ViewSet mixin adding the `transition/` route (see module docstring).
+    `transitions` maps each state of `transition_field` to the states a row
+    may move to from it. `transition_parents` are FK attnames whose parents'
+    cached responses list the rows.
+    """
+    transition_field = None
+    transitions = {}
+    transition_parents = ()
+
+    @action(detail=False, methods=['post'])
+    def transition(self, request):
+        params = TransitionSerializer(data=request.data, context={'transitions': self.transitions})
+        params.is_valid(raise_exception=True)
+        target = params.validated_data['to']
+        model = self.get_queryset().model
+        pk_name = model._meta.pk.name
+
+        with transaction.atomic():
+            pks = [_to_pk(model, value) for value in params.validated_data['ids']]
+            # select_for_update() is a no-op on backends without FOR UPDATE (SQLite).
+            queryset = model._default_manager.filter(
+                pk__in={pk for pk in pks if pk is not None}
+            ).order_by('pk').select_for_update()
+            rows = {
+                row[0]: row[1:] for row in
+                queryset.values_list('pk', self.transition_field, *self.transition_parents)
+            }
+
+            errors, moved, seen = [], {}, set()
+            for index, pk in enumerate(pks):
+                if pk not in rows:
+                    errors.append({"index": index, "errors": {pk_name: ["Not found."]}})
+                    continue
+                if pk in seen:
+                    errors.append({"index": index, "errors": {pk_name: ["Duplicate item."]}})
+                    continue
+                seen.add(pk)
+                current = rows[pk][0]
+                if current == target:
+                    continue
+                if target not in self.transitions.get(current, ()):
+                    errors.append({"index": index, "errors": {
+                        self.transition_field: [f"Can not move from {current} to {target}."]
+                    }})
+                    continue
+                moved[pk] = current
+            if errors:
+                return BulkWriteMixin.errors_response(errors)
+
+            if moved:
+                now = timezone.now()
+                fields = {self.transition_field: target}
+                fields.update({
+                    field.name: now for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)
+                })
+                model._default_manager.filter(pk__in=moved).update(**fields)
+                self.perform_transition(moved, target)
+                response_cache.invalidate(model, moved, {
+                    fk: {rows[pk][position] for pk in moved}
+                    for position, fk in enumerate(self.transition_parents, 1)
+                })
+        return written_rows_response(self, list(seen), status.HTTP_200_OK)
+
+    def perform_transition(self, previous, target):
+        """
+        Side effects of moving the rows in `previous` ({pk: state before})
+        to `target`, inside the transaction holding their locks.
+        """
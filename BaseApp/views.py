@@ -1,48 +1,127 @@
 from django.shortcuts import render 
-from rest_framework import viewsets 
-from BaseApp.models import Company,Employee
-from BaseApp.serializers import CompanySerializer,EmployeeSerializer,UserSerializer
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework import mixins, status, viewsets 
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from BaseApp.models import Company,Employee,ReportExport
+from BaseApp.serializers import CompanySerializer,EmployeeSerializer,UserSerializer,CompanyIdSerializer,EmployeeIdSerializer,ReportExportSerializer
+from BaseApp import payroll, reports
+from BaseApp.bulk import BulkWriteMixin, written_rows_response
+from BaseApp.conditional import ConditionalGetMixin
+from BaseApp.mixins import IdLinksViewMixin, SparseFieldsetViewMixin
+from BaseApp.response_cache import CachedResponseMixin
 from django.contrib.auth.models import User
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend  # Add this import
 from .filters import EmployeeFilter, CompanyFilter  # Import the filter
 
+
 class CreateUserView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer 
     permission_classes = [AllowAny]
 
-class UserList(generics.ListAPIView):
-    queryset = User.objects.all()
+class UserList(SparseFieldsetViewMixin, generics.ListAPIView):
+    queryset = User.objects.prefetch_related('groups', 'user_permissions')
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
 
 
-class UserDetail(generics.RetrieveAPIView):
-    queryset = User.objects.all()
+class UserDetail(SparseFieldsetViewMixin, generics.RetrieveAPIView):
+    queryset = User.objects.prefetch_related('groups', 'user_permissions')
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
 
 # Create your views here.
-class CompanyViewSet(viewsets.ModelViewSet):
+class CompanyViewSet(CachedResponseMixin, ConditionalGetMixin, IdLinksViewMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     # permission_classes = [IsAuthenticated]
+    modified_field = 'added_date'  # auto_now
     queryset= Company.objects.order_by('-added_date').all()
     serializer_class=CompanySerializer
+    id_serializer_class=CompanyIdSerializer
 
     # Enable filter backend and specify the filterset class
     filter_backends = [DjangoFilterBackend]
     filterset_class = CompanyFilter
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(CachedResponseMixin, ConditionalGetMixin, IdLinksViewMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     # permission_classes = [IsAuthenticated]
+    modified_field = 'created_at'  # auto_now
+    cache_depends_on = [Company]  # company_name with ?links=ids
     queryset= Employee.objects.order_by('-created_at').all()
     serializer_class=EmployeeSerializer
+    id_serializer_class=EmployeeIdSerializer
+    id_select_related=['company']
 
     # Enable filter backend and specify the filterset class
     filter_backends = [DjangoFilterBackend]
     filterset_class = EmployeeFilter
 
+    @action(detail=False, methods=['post'], url_path='adjust-salaries')
+    def adjust_salaries(self, request):
+        """
+        POST `{"effective_date": "2026-01-01", "items": [{"id": 3, "salary":
+        "2277.00"}, {"id": 4, "percent": "5"}]}`: all-or-nothing bulk salary
+        change (BaseApp.payroll). Answers with the adjusted employees.
+        """
+        params = payroll.SalaryAdjustmentSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        pks, errors = payroll.adjust_salaries(
+            [(item['id'], item.get('salary'), item.get('percent')) for item in params.validated_data['items']],
+            params.validated_data.get('effective_date'),
+        )
+        if errors:
+            return BulkWriteMixin.errors_response(errors)
+        return written_rows_response(self, pks, status.HTTP_200_OK)
+
+class ReportExportViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                          mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Tabular exports (BaseApp.reports). POST `{"report", "format", "filters"}`
+    queues a background job and answers 202; poll the job until its status
+    is Done, then fetch `download/`. `GET csv/?report=...` streams a CSV
+    directly for exports small enough to wait for.
+    """
+    queryset = ReportExport.objects.all()
+    serializer_class = ReportExportSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save()
+        reports.enqueue(job)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != ReportExport.DONE:
+            return Response(
+                {"detail": f"Export is {job.status.lower()}"}, status=status.HTTP_409_CONFLICT
+            )
+        content_type, extension = reports.FORMATS[job.format]
+        return FileResponse(
+            job.file.open('rb'), as_attachment=True,
+            filename=f'{job.report}{extension}', content_type=content_type,
+        )
+
+    @action(detail=False, methods=['get'])
+    def csv(self, request):
+        report = request.query_params.get('report')
+        if report not in reports.REPORTS:
+            return Response(
+                {"report": [f"Must be one of: {', '.join(reports.REPORTS)}"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        params = reports.ReportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        response = StreamingHttpResponse(
+            reports.csv_chunks(reports.REPORTS[report], params.validated_data), content_type='text/csv'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{report}.csv"'
+        return response
+
 # Create your views here.
 # def home (index) :
 #     return HttpResponse("This is home page")
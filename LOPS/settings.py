@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -52,6 +55,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
+    'BaseApp.middleware.ThresholdGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,6 +63,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     # "django.middleware.common.CommonMiddleware",
+    'BaseApp.middleware.IdempotencyMiddleware',
 ]
 
 ROOT_URLCONF = 'LOPS.urls'
@@ -138,6 +143,7 @@ CORS_ALLOW_METHODS = [
     'DELETE',
     'OPTIONS',
 ]
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     # 'http://192.168.1.11:3000'
@@ -150,9 +156,118 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Configure the default filter backend
 REST_FRAMEWORK = {
+    # JWT first; sessions and basic auth as DRF's defaults had them
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'BaseApp.authentication.CachedJWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_PAGINATION_CLASS': 'BaseApp.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 50,
+    'DEFAULT_RENDERER_CLASSES': [
+        'BaseApp.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'BaseApp.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# application/msgpack (Accept / Content-Type) for internal API consumers,
+# when the msgpack package is installed (requirements-optional.txt)
+if find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'BaseApp.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].insert(1, 'BaseApp.renderers.MessagePackParser')
+
+# JSON encoder behind FastJSONRenderer/FastJSONParser: "auto" uses orjson
+# when it is installed, "stdlib" always uses the json module
+API_JSON_BACKEND = 'auto'
+
+# Responses smaller than this many bytes are sent uncompressed
+GZIP_MIN_LENGTH = 1024
+
+# Upper bound for the `?page_size=` query parameter on list endpoints
+API_MAX_PAGE_SIZE = 500
+
+# Most items accepted by one request to a `bulk/` endpoint
+BULK_MAX_ITEMS = 1000
+
+# Local-memory cache for development; in production point this at a shared
+# backend so every worker sees the same entries and versions, e.g.
+# {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#  'LOCATION': 'redis://127.0.0.1:6379/1'}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lops',
+    }
 }
 
+# Seconds CachedJWTAuthentication reuses a user row instead of querying it;
+# saving or deleting the user drops it sooner
+JWT_USER_CACHE_TIMEOUT = 60
+
+# Seconds a cached list/detail response is kept (BaseApp.response_cache);
+# writes invalidate it sooner
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Seconds a computed dashboard stays cached; writes invalidate it sooner
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Hierarchy tree endpoints: deepest level returned and rows per prefetch chunk
+TREE_MAX_DEPTH = 5
+TREE_CHUNK_SIZE = 100
+
+# Rows fetched and written per chunk by the NDJSON and report exports
+EXPORT_CHUNK_SIZE = 2000
+
+# How report export jobs run: "worker" (left pending for the
+# run_report_exports management command, e.g. `run_report_exports --poll 5`
+# under a process supervisor), "inline" (during the request) or "thread"
+# (background thread in the web process; development only). The worker puts
+# jobs Running for longer than REPORT_EXPORT_TIMEOUT seconds, left by a
+# worker that died, back to pending, and fails them after
+# REPORT_EXPORT_MAX_ATTEMPTS tries.
+REPORT_EXPORT_RUNNER = 'worker'
+REPORT_EXPORT_TIMEOUT = 60 * 60
+REPORT_EXPORT_MAX_ATTEMPTS = 3
+
+# Document number series (BaseApp.sequences): format per series, overriding
+# the defaults there, and how many numbers a process reserves at a time
+# NUMBER_SERIES = {'invoice': 'INV-{year}-{number:06d}'}
+NUMBER_BLOCK_SIZE = 20
+
+# Idempotency-Key handling for POST and PATCH (BaseApp.idempotency): seconds
+# a key and its stored response are kept, a concurrent retry waits for the
+# first request, and an unfinished request holds its key after its last
+# heartbeat (sent every third of that while it runs)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_WAIT_TIMEOUT = 10
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Bulk salary adjustments (BaseApp.payroll): employees read and changes logged per
+# query, and most items accepted by one request to employees/adjust-salaries/
+SALARY_ADJUSTMENT_BATCH_SIZE = 500
+SALARY_ADJUSTMENT_MAX_ITEMS = 5000
+
+# Timesheet CSV imports: rows validated and committed per chunk, and how
+# uploaded imports run (as REPORT_EXPORT_RUNNER; "worker" leaves them for
+# `import_timesheets --pending --poll 5`). Imports without a committed chunk
+# for TIMESHEET_IMPORT_TIMEOUT seconds were left by a dead worker: they are
+# started again if nothing was imported yet, and failed otherwise.
+TIMESHEET_IMPORT_CHUNK_SIZE = 5000
+TIMESHEET_IMPORT_RUNNER = 'worker'
+TIMESHEET_IMPORT_TIMEOUT = 30 * 60
+TIMESHEET_IMPORT_MAX_ATTEMPTS = 3
+
+# Report export files and timesheet imports are stored here through the
+# default storage
+MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_URL = 'media/'
+
 # REST_FRAMEWORK = {
 # # Use Django's standard "django.contrib.auth' permissions,
 # # or allow read-only access for unauthenticated users.
@@ -0,0 +1,94 @@
+"""
+Denormalized job_card/rfq/client keys on Task and SubContracting.
+
+Task.save() and SubContracting.save() resolve their own keys. When an
+ancestor is re-parented (a payment ball moved to another job card, a job card
+to another RFQ, an RFQ to another client, a task to another payment ball),
+`sync` rewrites the keys of every affected descendant with two set-based
+UPDATEs: tasks first, then subcontracts copying from their (now current) task.
+Bulk writes, which skip save(), set the keys with `set_task_keys` and
+`set_subcontract_keys` from parents they have already loaded.
+"""
+from django.db.models import F, OuterRef, Q, Subquery
+
+from .models import PaymentBall, Task, SubContracting
+
+
+def task_keys():
+    ball = PaymentBall.objects.filter(pk=OuterRef('payment_ball_id'))
+    return {
+        'job_card': Subquery(ball.values('job_card_id')),
+        'rfq': Subquery(ball.values('job_card__rfq_id')),
+        'client': Subquery(ball.values('job_card__rfq__client_id')),
+    }
+
+
+def subcontract_keys():
+    task = Task.objects.filter(pk=OuterRef('task_id')).order_by()
+    return {
+        'job_card': Subquery(task.values('job_card_id')),
+        'rfq': Subquery(task.values('rfq_id')),
+        'client': Subquery(task.values('client_id')),
+    }
+
+
+def sync(tasks=Q(), subcontracts=Q()):
+    """Rewrite ancestry keys for the tasks and subcontracts matching the filters."""
+    Task.objects.filter(tasks).update(**task_keys())
+    SubContracting.objects.filter(subcontracts).update(**subcontract_keys())
+
+
+def payment_ball_moved(payment_ball_id):
+    sync(Q(payment_ball_id=payment_ball_id), Q(task__payment_ball_id=payment_ball_id))
+
+
+def job_card_moved(job_card_id):
+    sync(Q(job_card_id=job_card_id), Q(job_card_id=job_card_id))
+
+
+def rfq_moved(rfq_id):
+    sync(Q(rfq_id=rfq_id), Q(rfq_id=rfq_id))
+
+
+def task_moved(task_id):
+    tasks_moved([task_id])
+
+
+def tasks_moved(task_ids):
+    SubContracting.objects.filter(task_id__in=task_ids).update(**subcontract_keys())
+
+
+def set_task_keys(tasks):
+    """Copy keys onto `tasks` from their payment_ball, loaded with job_card__rfq."""
+    for task in tasks:
+        job_card = task.payment_ball.job_card
+        task.job_card_id, task.rfq_id, task.client_id = job_card.pk, job_card.rfq_id, job_card.rfq.client_id
+
+
+def set_subcontract_keys(subcontracts):
+    """Copy keys onto `subcontracts` from their (loaded) task."""
+    for subcontract in subcontracts:
+        task = subcontract.task
+        subcontract.job_card_id, subcontract.rfq_id, subcontract.client_id = task.job_card_id, task.rfq_id, task.client_id
+
+
+def _stale(model, keys):
+    queryset = model.objects.annotate(**{f'expected_{name}': value for name, value in keys.items()})
+    condition = Q()
+    for name in keys:
+        condition |= Q(**{f'{name}__isnull': True}) | ~Q(**{f'{name}_id': F(f'expected_{name}')})
+    return queryset.filter(condition).count()
+
+
+def backfill(dry_run=False):
+    """
+    Rewrite the keys of every task and subcontract and return, per model, how
+    many rows were missing or stale beforehand.
+    """
+    stale = {Task: _stale(Task, task_keys())}
+    if not dry_run:
+        Task.objects.update(**task_keys())
+    stale[SubContracting] = _stale(SubContracting, subcontract_keys())
+    if not dry_run:
+        SubContracting.objects.update(**subcontract_keys())
+    return stale
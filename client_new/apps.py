@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ClientNewConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'client_new'
+
+    def ready(self):
+        from . import signals  # noqa: F401
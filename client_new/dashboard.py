@@ -0,0 +1,124 @@
+"""
+Operations dashboard aggregates.
+
+Counts and money totals per status and color are computed with one grouped
+query per model and cached under a version number. Save/delete signals on the
+counted models bump the version (see client_new.signals), so the tables are
+only aggregated again after something has actually changed.
+"""
+import time
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import RFQ, JobCard, PaymentBall, Task
+
+
+VERSION_KEY = 'client_new:dashboard:version'
+
+
+def current_version():
+    # Seed a missing version from the clock so an evicted counter can never
+    # come back with a number that older cache entries were stored under.
+    cache.add(VERSION_KEY, int(time.time() * 1000), None)
+    return cache.get(VERSION_KEY)
+
+
+def invalidate():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        current_version()
+
+
+def _day_bounds(date_from, date_to):
+    bounds = {}
+    if date_from:
+        bounds['gte'] = timezone.make_aware(datetime.combine(date_from, dt_time.min))
+    if date_to:
+        bounds['lt'] = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), dt_time.min))
+    return bounds
+
+
+def _filtered(queryset, client_path, date_path, client, bounds):
+    if client is not None:
+        queryset = queryset.filter(**{client_path: client})
+    for lookup, value in bounds.items():
+        queryset = queryset.filter(**{f'{date_path}__{lookup}': value})
+    return queryset.order_by()
+
+
+def _money(value):
+    return str((value or Decimal('0')).quantize(Decimal('0.01')))
+
+
+def _bucket(rows, key, choices, with_amount):
+    buckets = {
+        choice: {'count': 0, 'amount': Decimal('0')} for choice, _ in choices
+    }
+    for row in rows:
+        bucket = buckets.setdefault(row[key], {'count': 0, 'amount': Decimal('0')})
+        bucket['count'] += row['count']
+        bucket['amount'] += row.get('amount') or Decimal('0')
+    for bucket in buckets.values():
+        if with_amount:
+            bucket['amount'] = _money(bucket['amount'])
+        else:
+            del bucket['amount']
+    return buckets
+
+
+def _summary(rows, groups, with_amount):
+    summary = {'total': sum(row['count'] for row in rows)}
+    if with_amount:
+        summary['amount'] = _money(sum((row['amount'] or Decimal('0') for row in rows), Decimal('0')))
+    for name, key, choices in groups:
+        summary[name] = _bucket(rows, key, choices, with_amount)
+    return summary
+
+
+def build_dashboard(client=None, date_from=None, date_to=None):
+    """Aggregate the dashboard with four grouped queries, one per model."""
+    bounds = _day_bounds(date_from, date_to)
+
+    rfqs = list(_filtered(RFQ.objects, 'client_id', 'rfq_date', client, bounds).values(
+        'status'
+    ).annotate(count=Count('pk'), amount=Sum('quotation_amount')))
+
+    job_cards = list(_filtered(JobCard.objects, 'rfq__client_id', 'created_at', client, bounds).values(
+        'status', 'color_status'
+    ).annotate(count=Count('pk')))
+
+    payment_balls = list(_filtered(
+        PaymentBall.objects, 'job_card__rfq__client_id', 'job_card__created_at', client, bounds
+    ).values('project_status', 'color_status').annotate(count=Count('pk'), amount=Sum('amount')))
+
+    tasks = list(_filtered(
+        Task.objects, 'client_id', 'created_at', client, bounds
+    ).values('status').annotate(count=Count('pk')))
+
+    return {
+        'rfqs': _summary(rfqs, [('by_status', 'status', RFQ.STATUS_CHOICES)], with_amount=True),
+        'job_cards': _summary(job_cards, [
+            ('by_status', 'status', JobCard.STATUS_CHOICES),
+            ('by_color', 'color_status', JobCard.STATUS_C_CHOICES),
+        ], with_amount=False),
+        'payment_balls': _summary(payment_balls, [
+            ('by_status', 'project_status', PaymentBall.PAYMENT_STATUS_CHOICES),
+            ('by_color', 'color_status', PaymentBall.STATUS_C_CHOICES),
+        ], with_amount=True),
+        'tasks': _summary(tasks, [('by_status', 'status', Task.TASK_STATUS_CHOICES)], with_amount=False),
+    }
+
+
+def get_dashboard(client=None, date_from=None, date_to=None):
+    key = f'client_new:dashboard:{current_version()}:{client}:{date_from}:{date_to}'
+    data = cache.get(key)
+    if data is None:
+        data = build_dashboard(client, date_from, date_to)
+        cache.set(key, data, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return data
@@ -1,9 +1,10 @@
 from django_filters import rest_framework as filters
-from .models import RFQ, JobCard
+from BaseApp.filters import ChoiceIExactFilter
+from .models import RFQ, JobCard, Task, SubContracting
 
 class RFQFilter(filters.FilterSet):
     # Define a filter for `position`
-    status = filters.CharFilter(field_name='status', lookup_expr='iexact')
+    status = ChoiceIExactFilter(field_name='status')
     # location = filters.CharFilter(field_name='location', lookup_expr='iexact')
 
     class Meta:
@@ -13,9 +14,35 @@ class RFQFilter(filters.FilterSet):
 
 class JobCardFilter(filters.FilterSet):
     # Define a filter for `position`
-    status = filters.CharFilter(field_name='status', lookup_expr='iexact')
+    status = ChoiceIExactFilter(field_name='status')
     # location = filters.CharFilter(field_name='location', lookup_expr='iexact')
+    # Job cards with an unpaid payment-term milestone above this percentage
+    unpaid_milestone_over = filters.NumberFilter(method='filter_unpaid_milestone_over')
 
     class Meta:
         model = JobCard
-        fields = ['status']        
\ No newline at end of file
+        fields = ['status', 'unpaid_milestone_over']
+
+    def filter_unpaid_milestone_over(self, queryset, name, value):
+        return queryset.with_milestone(percentage_over=value, paid=False)
+
+
+class AncestryFilter(filters.FilterSet):
+    # Resolved against the denormalized keys, so each is one indexed lookup
+    client = filters.NumberFilter(field_name='client_id')
+    rfq = filters.NumberFilter(field_name='rfq_id')
+    job_card = filters.NumberFilter(field_name='job_card_id')
+
+
+class TaskFilter(AncestryFilter):
+
+    class Meta:
+        model = Task
+        fields = ['client', 'rfq', 'job_card']
+
+
+class SubContractingFilter(AncestryFilter):
+
+    class Meta:
+        model = SubContracting
+        fields = ['client', 'rfq', 'job_card']
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from client_new import ancestry
+
+
+class Command(BaseCommand):
+    help = "Fill in the denormalized job_card/rfq/client keys on tasks and subcontracts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only report rows whose keys are missing or stale.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stale = ancestry.backfill(dry_run=options['dry_run'])
+
+        for model, count in stale.items():
+            style = self.style.WARNING if count else self.style.SUCCESS
+            self.stdout.write(style(f"{model._meta.verbose_name_plural}: {count} stale"))
+        if options['dry_run']:
+            self.stdout.write("Dry run: nothing was written.")
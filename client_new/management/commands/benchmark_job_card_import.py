@@ -0,0 +1,68 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from client_new.models import JobCard, PaymentBall, RFQ
+from client_new.seeding import seed_hierarchy
+from client_new.serializers import JobCardSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Time importing job cards with two payment-term milestones each, "
+        "row by row (save, set_payment_terms, save again, one PaymentBall "
+        "save per milestone) and through the batch serializer. Seeds rows "
+        "inside a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed_hierarchy(clients=10, rfqs_per_client=1, job_cards_per_rfq=0)
+            rfqs = list(RFQ.objects.all())
+            terms = {'1': {'milestone': 'Advance', 'percentage': '40'},
+                     '2': {'milestone': 'Handover', 'percentage': '60'}}
+
+            def row_by_row():
+                for i in range(options['rows']):
+                    rfq = rfqs[i % len(rfqs)]
+                    job_card = JobCard.objects.create(
+                        rfq=rfq, job_number=f'ROW-{i}', scope_of_work='Fit-out',
+                        delivery_timelines='2025-03-31',
+                    )
+                    job_card.set_payment_terms(terms)
+                    job_card.save()
+                    for term in terms.values():
+                        percentage = Decimal(term['percentage'])
+                        PaymentBall.objects.create(
+                            job_card=job_card, project_percentage=percentage,
+                            amount=rfq.quotation_amount * percentage / 100, notes=term['milestone'],
+                        )
+
+            def batch():
+                serializer = JobCardSerializer(data=[
+                    {'rfq': rfqs[i % len(rfqs)].pk, 'job_number': f'BATCH-{i}', 'scope_of_work': 'Fit-out',
+                     'delivery_timelines': '2025-03-31', 'payment_terms': terms}
+                    for i in range(options['rows'])
+                ], many=True)
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+
+            baseline = None
+            for label, run in (('row by row', row_by_row), ('batch', batch)):
+                queries = []
+                # Counted with a wrapper: connection.queries keeps only the last 9000.
+                with connection.execute_wrapper(lambda execute, sql, *rest: queries.append(sql) or execute(sql, *rest)):
+                    start = time.perf_counter()
+                    run()
+                    elapsed = time.perf_counter() - start
+                baseline = baseline or elapsed
+                self.stdout.write(
+                    f"{options['rows']} job cards  {label:<10} {elapsed:7.3f}s  "
+                    f"{len(queries):>6} queries  x{baseline / elapsed:.1f}"
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from BaseApp.renderers import FastJSONRenderer, fast_json_enabled
+from client_new.models import JobCard, Task
+from client_new.readers import job_card_reader, task_reader
+from client_new.seeding import seed_hierarchy
+
+# Job cards in the field carry long free-text scopes.
+SCOPE_OF_WORK = "Supply, install, test and commission MEP services per the approved drawings. " * 25
+
+
+class Command(BaseCommand):
+    help = (
+        "Time JSON rendering of the job card and task lists with the stock "
+        "renderer and FastJSONRenderer, and report response size before and "
+        "after gzip. Seeds rows inside a transaction that is rolled back "
+        "afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[500, 10_000])
+        parser.add_argument('--repeat', type=int, default=5, help="Best of N runs.")
+
+    def handle(self, *args, **options):
+        if not fast_json_enabled():
+            self.stdout.write("orjson is not installed: both columns use the stdlib encoder.")
+        for rows in options['rows']:
+            with transaction.atomic():
+                seed_hierarchy(
+                    clients=max(rows // 10, 1), rfqs_per_client=2, job_cards_per_rfq=5,
+                    payment_balls_per_job_card=1, tasks_per_payment_ball=1,
+                    subcontracts_per_task=0,
+                )
+                JobCard.objects.update(scope_of_work=SCOPE_OF_WORK)
+                for label, reader, queryset in (
+                    ('job cards', job_card_reader, JobCard.objects.all()),
+                    ('tasks', task_reader, Task.objects.all()),
+                ):
+                    data = reader.render(reader.values(queryset))
+                    stock = self._best(options['repeat'], JSONRenderer(), data)
+                    fast = self._best(options['repeat'], FastJSONRenderer(), data)
+                    body = FastJSONRenderer().render(data)
+                    gzipped = compress_string(body)
+                    self.stdout.write(
+                        f"{len(data):>7} {label:<9}  json {stock:7.3f}s  fast {fast:7.3f}s  "
+                        f"x{stock / fast:.1f}  {len(body) / 1024:9.0f} KiB  "
+                        f"gzip {len(gzipped) / 1024:8.0f} KiB  x{len(body) / len(gzipped):.1f}"
+                    )
+                transaction.set_rollback(True)
+
+    @staticmethod
+    def _best(repeat, renderer, data):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            renderer.render(data)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
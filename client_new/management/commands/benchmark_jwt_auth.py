@@ -0,0 +1,55 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from BaseApp.authentication import CachedJWTAuthentication, forget_user
+from client_new.models import PaymentBall
+from client_new.seeding import seed_hierarchy
+from client_new.views import GlobalTaskViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare queries and latency per request of tasks/by_payment_ball/ "
+        "authenticated with simplejwt's JWTAuthentication and with "
+        "CachedJWTAuthentication. Seeds rows inside a transaction that is "
+        "rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed_hierarchy(clients=1, rfqs_per_client=1, payment_balls_per_job_card=1)
+            user = User.objects.create_user('benchmark-jwt-auth')
+            request = APIRequestFactory().get(
+                '/api/v1/tasks/by_payment_ball/',
+                {'payment_ball': PaymentBall.objects.values_list('pk', flat=True).get()},
+                HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}',
+            )
+            forget_user(user)
+            for label, authentication_class in (
+                ('JWTAuthentication', JWTAuthentication),
+                ('CachedJWTAuthentication', CachedJWTAuthentication),
+            ):
+                view = GlobalTaskViewSet.as_view(
+                    {'get': 'by_payment_ball'}, authentication_classes=[authentication_class]
+                )
+                view(request)  # warm up (and fill the user cache)
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for _ in range(options['requests']):
+                        view(request)
+                    elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{label:<24} {len(queries) / options['requests']:.1f} queries/request  "
+                    f"{elapsed / options['requests'] * 1000:.3f} ms/request"
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from client_new.models import JobCard, Task
+from client_new.readers import job_card_reader, task_reader
+from client_new.seeding import seed_hierarchy
+from client_new.serializers import JobCardSerializer, TaskSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Time list serialization of tasks and job cards through the serializers "
+        "and through the values() readers. Seeds rows inside a transaction that "
+        "is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+        parser.add_argument('--repeat', type=int, default=3, help="Best of N runs.")
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            with transaction.atomic():
+                # One job card and one task per payment ball: `rows` of each.
+                seed_hierarchy(
+                    clients=max(rows // 10, 1), rfqs_per_client=2, job_cards_per_rfq=5,
+                    payment_balls_per_job_card=1, tasks_per_payment_ball=1,
+                    subcontracts_per_task=0,
+                )
+                for label, queryset, serializer_class, reader in (
+                    ('tasks', Task.objects.select_related('payment_ball', 'assignee'),
+                     TaskSerializer, task_reader),
+                    ('job cards', JobCard.objects.all(), JobCardSerializer, job_card_reader),
+                ):
+                    serialized = self._best(options['repeat'], lambda: serializer_class(queryset.all(), many=True).data)
+                    fast = self._best(options['repeat'], lambda: reader.render(reader.values(queryset.all())))
+                    self.stdout.write(
+                        f"{queryset.count():>7} {label:<9}  serializer {serialized:7.3f}s  "
+                        f"values {fast:7.3f}s  x{serialized / fast:.1f}"
+                    )
+                transaction.set_rollback(True)
+
+    @staticmethod
+    def _best(repeat, build):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            JSONRenderer().render(build())
+            timings.append(time.perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from client_new import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute weighted completion rollups for tasks, payment balls and job cards, reporting drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only report rows whose stored rollup is stale.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = rollups.rebuild(dry_run=options['dry_run'])
+
+        for model, count in drift.items():
+            style = self.style.WARNING if count else self.style.SUCCESS
+            self.stdout.write(style(f"{model._meta.verbose_name_plural}: {count} drifted"))
+        if options['dry_run']:
+            self.stdout.write("Dry run: nothing was written.")
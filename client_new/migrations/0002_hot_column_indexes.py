@@ -0,0 +1,54 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BaseApp', '0002_hot_column_indexes'),
+        ('client_new', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['created_at', 'client_id'], name='client_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=models.Index(fields=['created_at', 'job_id'], name='jobcard_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=models.Index(fields=['status', 'created_at', 'job_id'], name='jobcard_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rfq',
+            index=models.Index(fields=['rfq_date', 'rfq_id'], name='rfq_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rfq',
+            index=models.Index(fields=['status', 'rfq_date', 'rfq_id'], name='rfq_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subcontracting',
+            index=models.Index(fields=['created_at', 'subcontract_id'], name='subcontract_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subcontracting',
+            index=models.Index(fields=['task', 'created_at', 'subcontract_id'], name='subcontract_task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_at', 'task_id'], name='task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['payment_ball', 'created_at', 'task_id'], name='task_ball_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'created_at', 'task_id'], name='task_status_created_idx'),
+        ),
+    ]
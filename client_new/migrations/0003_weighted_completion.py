@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client_new', '0002_hot_column_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobcard',
+            name='weighted_completion',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='paymentball',
+            name='weighted_completion',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='weighted_completion',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=5),
+        ),
+    ]
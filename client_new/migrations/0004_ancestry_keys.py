@@ -0,0 +1,69 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BaseApp', '0002_hot_column_indexes'),
+        ('client_new', '0003_weighted_completion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subcontracting',
+            name='client',
+            field=models.ForeignKey(db_constraint=False, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='client_new.client'),
+        ),
+        migrations.AddField(
+            model_name='subcontracting',
+            name='job_card',
+            field=models.ForeignKey(db_constraint=False, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='client_new.jobcard'),
+        ),
+        migrations.AddField(
+            model_name='subcontracting',
+            name='rfq',
+            field=models.ForeignKey(db_constraint=False, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='client_new.rfq'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='client',
+            field=models.ForeignKey(db_constraint=False, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='client_new.client'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='job_card',
+            field=models.ForeignKey(db_constraint=False, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='client_new.jobcard'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='rfq',
+            field=models.ForeignKey(db_constraint=False, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='client_new.rfq'),
+        ),
+        migrations.AddIndex(
+            model_name='subcontracting',
+            index=models.Index(fields=['job_card', 'created_at', 'subcontract_id'], name='subcontract_job_card_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subcontracting',
+            index=models.Index(fields=['rfq', 'created_at', 'subcontract_id'], name='subcontract_rfq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subcontracting',
+            index=models.Index(fields=['client', 'created_at', 'subcontract_id'], name='subcontract_client_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['job_card', 'created_at', 'task_id'], name='task_job_card_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['rfq', 'created_at', 'task_id'], name='task_rfq_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['client', 'created_at', 'task_id'], name='task_client_created_idx'),
+        ),
+    ]
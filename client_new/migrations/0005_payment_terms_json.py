@@ -0,0 +1,81 @@
+import json
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+MODELS = ('JobCard', 'PaymentBall')
+
+
+def _copy(apps, source, target, convert):
+    for model_name in MODELS:
+        model = apps.get_model('client_new', model_name)
+        batch = []
+        rows = model.objects.exclude(**{f'{source}__isnull': True}).only('pk', source)
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            setattr(row, target, convert(getattr(row, source)))
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                model.objects.bulk_update(batch, [target])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, [target])
+
+
+def _parse(text):
+    # get_payment_terms() treated empty and malformed text as "no terms".
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+
+def text_to_json(apps, schema_editor):
+    _copy(apps, 'payment_terms', 'payment_terms_json', _parse)
+
+
+def json_to_text(apps, schema_editor):
+    _copy(apps, 'payment_terms_json', 'payment_terms',
+          lambda terms: json.dumps(terms, cls=django.core.serializers.json.DjangoJSONEncoder))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client_new', '0004_ancestry_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobcard',
+            name='payment_terms_json',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentball',
+            name='payment_terms_json',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True),
+        ),
+        migrations.RunPython(text_to_json, json_to_text),
+        migrations.RemoveField(
+            model_name='jobcard',
+            name='payment_terms',
+        ),
+        migrations.RemoveField(
+            model_name='paymentball',
+            name='payment_terms',
+        ),
+        migrations.RenameField(
+            model_name='jobcard',
+            old_name='payment_terms_json',
+            new_name='payment_terms',
+        ),
+        migrations.RenameField(
+            model_name='paymentball',
+            old_name='payment_terms_json',
+            new_name='payment_terms',
+        ),
+    ]
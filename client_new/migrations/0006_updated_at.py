@@ -0,0 +1,40 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client_new', '0005_payment_terms_json'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobcard',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='paymentball',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='rfq',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=models.Index(fields=['updated_at', 'job_id'], name='jobcard_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentball',
+            index=models.Index(fields=['updated_at', 'payment_id'], name='paymentball_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rfq',
+            index=models.Index(fields=['updated_at', 'rfq_id'], name='rfq_updated_idx'),
+        ),
+    ]
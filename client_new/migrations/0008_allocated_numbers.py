@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 00:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client_new', '0007_client_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobcard',
+            name='job_number',
+            field=models.CharField(blank=True, max_length=20, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='rfq',
+            name='quotation_number',
+            field=models.CharField(blank=True, max_length=20, unique=True),
+        ),
+    ]
@@ -1,14 +1,160 @@
-from django.db import models
+from django.db import NotSupportedError, connections, models, transaction
+from django.db.models.expressions import RawSQL
 from django.core.validators import MinValueValidator, MaxValueValidator
-import json, uuid
-from decimal import Decimal
+from django.utils import timezone
+import json
+from decimal import ROUND_HALF_UP, Decimal
+from BaseApp import sequences
 from BaseApp.models import Company, Employee
 from django.core.serializers.json import DjangoJSONEncoder
 
 
 PERCENTAGE_VALIDATOR = [MinValueValidator(0), MaxValueValidator(100)]
 
-class Client(models.Model):
+# Moves allowed by the batch transition endpoints (BaseApp.transitions)
+COLOR_TRANSITIONS = {
+    'gray': ['blue'],
+    'blue': ['purple'],
+    'purple': ['pink'],
+    'pink': ['green'],
+    'green': [],
+}
+TASK_STATUS_TRANSITIONS = {
+    'Pending': ['InProgress', 'Completed'],
+    'InProgress': ['Completed'],
+    'Completed': [],
+}
+
+
+def plain_terms(terms):
+    """
+    Payment terms as stored in the JSON column: Decimals become strings,
+    exactly as DjangoJSONEncoder wrote them into the old text column, so
+    the API returns the same values before and after a reload.
+    """
+    return [
+        {key: str(value) if isinstance(value, Decimal) else value for key, value in term.items()}
+        for term in terms
+    ]
+
+
+class PaymentTermsQuerySet(models.QuerySet):
+    """Database-side filters over the milestones stored in payment_terms."""
+
+    # One EXISTS over the JSON array per backend: (template, percentage
+    # condition, paid condition). `{column}` is the quoted payment_terms
+    # column; with_milestone appends the conditions it needs.
+    MILESTONE_SQL = {
+        'sqlite': (
+            "EXISTS (SELECT 1 FROM json_each({column}) AS term WHERE 1=1{conditions})",
+            " AND CAST(json_extract(term.value, '$.percentage') AS REAL) > %s",
+            " AND COALESCE(json_extract(term.value, '$.paid'), 0) = %s",
+        ),
+        'postgresql': (
+            "EXISTS (SELECT 1 FROM jsonb_array_elements({column}) AS term WHERE true{conditions})",
+            " AND (term->>'percentage')::numeric > %s",
+            " AND COALESCE((term->>'paid')::boolean, false) = %s",
+        ),
+    }
+
+    def with_milestone(self, percentage_over=None, paid=None):
+        """
+        Rows with at least one milestone matching every given condition,
+        e.g. `with_milestone(percentage_over=30, paid=False)`. Milestones
+        without a `paid` flag count as unpaid.
+        """
+        connection = connections[self.db]
+        if connection.vendor not in self.MILESTONE_SQL:
+            raise NotSupportedError(f"Milestone queries are not supported on {connection.vendor}.")
+        template, percentage_sql, paid_sql = self.MILESTONE_SQL[connection.vendor]
+
+        conditions, params = '', []
+        if percentage_over is not None:
+            conditions += percentage_sql
+            params.append(percentage_over)
+        if paid is not None:
+            conditions += paid_sql
+            params.append(bool(paid))
+
+        quote = connection.ops.quote_name
+        column = f"{quote(self.model._meta.db_table)}.{quote('payment_terms')}"
+        exists = RawSQL(template.format(column=column, conditions=conditions), params,
+                        output_field=models.BooleanField())
+        return self.alias(has_milestone=exists).filter(has_milestone=True)
+
+
+def ancestor_key(model):
+    """
+    Denormalized pointer to an ancestor further up the hierarchy, so
+    cross-level filters need no joins. Set in save() and kept in sync on
+    re-parenting by client_new.ancestry; indexed via Meta.indexes.
+    """
+    return models.ForeignKey(
+        model, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+        null=True, editable=False, related_name='+',
+    )
+
+
+ANCESTOR_KEYS = ('job_card', 'rfq', 'client')
+
+
+def fields_but_ancestor_keys(instance):
+    """
+    The loaded fields of `instance` other than its ancestor keys, for a save
+    that must not write back keys client_new.ancestry may have moved.
+    """
+    deferred = instance.get_deferred_fields()
+    return [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.attname not in deferred and field.name not in ANCESTOR_KEYS
+    ]
+
+
+class LoadedValuesMixin:
+    """
+    Remembers the `tracked_fields` values a row was loaded (or last saved)
+    with, so save() and the rollup signals can tell what a save changes
+    without reading the row again.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        self.remember_loaded_values(fields)
+
+    def remember_loaded_values(self, fields=None):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for name in self.tracked_fields:
+            if (fields is None or name in fields) and name in self.__dict__:
+                loaded[name] = self.__dict__[name]
+
+    def loaded_value(self, name):
+        """The value `name` was loaded with, or None if it was not loaded."""
+        return self.__dict__.get('_loaded_values', {}).get(name)
+
+    def changed_since_load(self, *names):
+        """Whether any of `names` differs from its loaded value (or was not loaded)."""
+        loaded = self.__dict__.get('_loaded_values', {})
+        return self._state.adding or any(name not in loaded or loaded[name] != getattr(self, name) for name in names)
+
+
+class BatchedRollupDeleteMixin:
+    """Runs the rollup refreshes a delete's cascade asks for once, at the end."""
+
+    def delete(self, *args, **kwargs):
+        from . import rollups  # rollups imports the models
+
+        with rollups.batched():
+            return super().delete(*args, **kwargs)
+
+
+class Client(BatchedRollupDeleteMixin, models.Model):
     client_id = models.AutoField(primary_key=True)
     client_name = models.CharField(max_length=255)
     contact_info = models.CharField(max_length=255, blank=True, null=True)
@@ -22,33 +168,54 @@ class Client(models.Model):
     about = models.TextField(blank=True, null=True)
     status = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'client_id'], name='client_created_idx'),
+            models.Index(fields=['updated_at', 'client_id'], name='client_updated_idx'),
+        ]
 
     def __str__(self):
         return self.client_name
 
 
-class RFQ(models.Model):
+class RFQ(LoadedValuesMixin, BatchedRollupDeleteMixin, models.Model):
     STATUS_CHOICES = [
         ('Pending', 'Pending'),
         ('Ongoing', 'Ongoing'),
         ('Completed', 'Completed'),
     ]
 
+    tracked_fields = ('client_id',)  # what client_new.signals reacts to
     rfq_id = models.AutoField(primary_key=True)
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="rfqs")
     rfq_date = models.DateTimeField(auto_now_add=True)
     project_type = models.CharField(max_length=255)
     scope_of_work = models.TextField()
-    quotation_number = models.CharField(max_length=20, unique=True)
+    quotation_number = models.CharField(max_length=20, unique=True, blank=True)  # allocated when blank
     quotation_amount = models.DecimalField(max_digits=10, decimal_places=2)
     remarks = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=50, default='Pending', choices=STATUS_CHOICES)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['rfq_date', 'rfq_id'], name='rfq_date_idx'),
+            models.Index(fields=['status', 'rfq_date', 'rfq_id'], name='rfq_status_date_idx'),
+            models.Index(fields=['updated_at', 'rfq_id'], name='rfq_updated_idx'),
+        ]
 
     def __str__(self):
         return f"RFQ for {self.client.client_name} - {self.project_type}"
 
+    def save(self, *args, **kwargs):
+        if not self.quotation_number:
+            self.quotation_number = sequences.next_number('quotation')
+        super().save(*args, **kwargs)
+
 
-class JobCard(models.Model):
+class JobCard(LoadedValuesMixin, BatchedRollupDeleteMixin, models.Model):
     STATUS_CHOICES = [
         ('Pending', 'Pending'),
         ('Ongoing', 'Ongoing'),
@@ -63,35 +230,57 @@ class JobCard(models.Model):
         ('green', 'Green'),
     ]
 
+    tracked_fields = ('rfq_id',)  # what client_new.signals reacts to
     job_id = models.AutoField(primary_key=True)
     rfq = models.ForeignKey(RFQ, on_delete=models.CASCADE, related_name="job_cards")
-    job_number = models.CharField(max_length=20, unique=True)
+    job_number = models.CharField(max_length=20, unique=True, blank=True)  # allocated when blank
     scope_of_work = models.TextField()
     delivery_timelines = models.DateField()
-    payment_terms = models.TextField(blank=True, null=True) 
+    payment_terms = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
     status = models.CharField(max_length=50, default='Pending', choices=STATUS_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True) # new field
 
 
     
     color_status = models.CharField(max_length=6, choices=STATUS_C_CHOICES, default='gray')
+    weighted_completion = models.DecimalField(
+        max_digits=5, decimal_places=2, default=0, editable=False
+    )  # maintained by client_new.rollups
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PaymentTermsQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'job_id'], name='jobcard_created_idx'),
+            models.Index(fields=['status', 'created_at', 'job_id'], name='jobcard_status_created_idx'),
+            models.Index(fields=['updated_at', 'job_id'], name='jobcard_updated_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.job_number:
+            self.job_number = sequences.next_number('job')
+        super().save(*args, **kwargs)
 
     def get_payment_terms(self):
-        if not self.payment_terms:
+        return self.display_payment_terms(self.payment_terms)
+
+    @staticmethod
+    def display_payment_terms(payment_terms):
+        """Stored payment terms as the {"1": {...}, ...} mapping the API returns."""
+        if not payment_terms:
             return {}  # Return empty dict instead of list
-        
-        try:
-            terms = json.loads(self.payment_terms)
-            return {
-                str(i): {
-                    'milestone': term['milestone'],
-                    'percentage': term['percentage'],
-                    'description': term.get('description', '')
-                }
-                for i, term in enumerate(terms, 1)
+
+        display = {}
+        for i, term in enumerate(payment_terms, 1):
+            display[str(i)] = {
+                'milestone': term['milestone'],
+                'percentage': term['percentage'],
+                'description': term.get('description', '')
             }
-        except json.JSONDecodeError:
-            return {}
+            if 'paid' in term:
+                display[str(i)]['paid'] = term['paid']
+        return display
 
     def set_payment_terms(self, payment_terms):
         if payment_terms is None:
@@ -100,22 +289,42 @@ class JobCard(models.Model):
 
         if isinstance(payment_terms, dict):
             # Convert dict to list for storage
-            terms_list = [
-                {
+            terms_list = []
+            for data in payment_terms.values():
+                term = {
                     'milestone': data['milestone'],
                     'percentage': float(data['percentage']),
                     'description': data.get('description', '')
                 }
-                for data in payment_terms.values()
-            ]
-            self.payment_terms = json.dumps(terms_list, cls=DjangoJSONEncoder)
+                if 'paid' in data:
+                    term['paid'] = bool(data['paid'])
+                terms_list.append(term)
+            self.payment_terms = terms_list
         else:
-            self.payment_terms = json.dumps(payment_terms, cls=DjangoJSONEncoder)
+            self.payment_terms = plain_terms(payment_terms)
+
+    def milestone_payment_balls(self):
+        """
+        Unsaved PaymentBalls for the stored payment terms, one per milestone,
+        each billing its percentage of the RFQ's quotation_amount.
+        """
+        quotation_amount = self.rfq.quotation_amount
+        balls = []
+        for term in self.payment_terms or []:
+            percentage = Decimal(str(term['percentage']))
+            balls.append(PaymentBall(
+                job_card=self,
+                project_percentage=percentage,
+                amount=(quotation_amount * percentage / 100).quantize(Decimal('0.01'), ROUND_HALF_UP),
+                notes=term['milestone'],
+                payment_terms=plain_terms([term]),
+            ))
+        return balls
 
         
 
 
-class PaymentBall(models.Model):
+class PaymentBall(LoadedValuesMixin, BatchedRollupDeleteMixin, models.Model):
     PAYMENT_STATUS_CHOICES = [
         ('Pending', 'Pending'),
         ('InProgress', 'InProgress'),
@@ -130,6 +339,7 @@ class PaymentBall(models.Model):
         ('green', 'Green'),
     ]
 
+    tracked_fields = ('job_card_id', 'project_percentage')  # what client_new.signals reacts to
     payment_id = models.AutoField(primary_key=True)
     job_card = models.ForeignKey(JobCard, on_delete=models.CASCADE, related_name="payment_balls")
     project_percentage = models.DecimalField(
@@ -157,23 +367,49 @@ class PaymentBall(models.Model):
         decimal_places=2,
         null=False  # Make this required
     )
-    payment_terms = models.TextField(blank=True, null=True)  # Add this field
+    payment_terms = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    weighted_completion = models.DecimalField(
+        max_digits=5, decimal_places=2, default=0, editable=False
+    )  # maintained by client_new.rollups
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PaymentTermsQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'payment_id'], name='paymentball_updated_idx'),
+        ]
 
     def generate_invoice(self):
         if self.color_status == 'purple' and not self.invoice_number:
-            self.invoice_number = f"INV-{uuid.uuid4().hex[:6].upper()}"
+            self.invoice_number = sequences.next_number('invoice')
             self.save()
 
+    @classmethod
+    def issue_invoices(cls, queryset):
+        """
+        generate_invoice() for every payment ball in `queryset`, in bulk: the
+        rows are locked, numbered from one allocation and written with one
+        UPDATE, without save() or signals. Returns the invoiced rows.
+        """
+        with transaction.atomic():
+            payment_balls = list(
+                queryset.select_related(None).select_for_update()
+                .filter(models.Q(invoice_number__isnull=True) | models.Q(invoice_number=''), color_status='purple')
+                .order_by('payment_id')
+            )
+            now = timezone.now()
+            for payment_ball, number in zip(payment_balls, sequences.allocate('invoice', len(payment_balls))):
+                payment_ball.invoice_number = number
+                payment_ball.updated_at = now
+            cls.objects.bulk_update(payment_balls, ['invoice_number', 'updated_at'])
+        return payment_balls
+
     def __str__(self):
         return f"PaymentBall {self.payment_id} - {self.project_percentage}% for JobCard {self.job_card.job_number}"
 
     def get_payment_terms(self):
-        if not self.payment_terms:
-            return []
-        try:
-            return json.loads(self.payment_terms)
-        except json.JSONDecodeError:
-            return []
+        return self.payment_terms or []
 
     def set_payment_terms(self, payment_terms):
         if payment_terms is None:
@@ -181,17 +417,17 @@ class PaymentBall(models.Model):
             return
 
         if isinstance(payment_terms, str):
-            self.payment_terms = payment_terms
-        else:
-            self.payment_terms = json.dumps(payment_terms, cls=DjangoJSONEncoder)      
+            payment_terms = json.loads(payment_terms)
+        self.payment_terms = plain_terms(payment_terms)      
 
-class Task(models.Model):
+class Task(LoadedValuesMixin, BatchedRollupDeleteMixin, models.Model):
     TASK_STATUS_CHOICES = [
         ('Pending', 'Pending'),
         ('InProgress', 'InProgress'),
         ('Completed', 'Completed'),
     ]
 
+    tracked_fields = ('payment_ball_id', 'weightage', 'completion_percentage')  # what client_new.signals reacts to
     task_id = models.AutoField(primary_key=True)
     payment_ball = models.ForeignKey(PaymentBall, on_delete=models.CASCADE, related_name="tasks")
     task_brief = models.TextField()
@@ -219,23 +455,52 @@ class Task(models.Model):
         default=0.0,
         validators=PERCENTAGE_VALIDATOR
     )
+    weighted_completion = models.DecimalField(
+        max_digits=5, decimal_places=2, default=0, editable=False
+    )  # maintained by client_new.rollups
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    job_card = ancestor_key(JobCard)
+    rfq = ancestor_key(RFQ)
+    client = ancestor_key(Client)
 
     def __str__(self):
         return f"Task {self.task_id} for PaymentBall {self.payment_ball.payment_id}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        parent_saved = update_fields is None or 'payment_ball' in update_fields or 'payment_ball_id' in update_fields
+        # The keys only change with the parent; re-read them when it moved.
+        if parent_saved and self.changed_since_load('payment_ball_id'):
+            self.job_card_id, self.rfq_id, self.client_id = PaymentBall.objects.filter(
+                pk=self.payment_ball_id
+            ).values_list('job_card_id', 'job_card__rfq_id', 'job_card__rfq__client_id').get()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *ANCESTOR_KEYS}
+        elif update_fields is None:
+            kwargs['update_fields'] = fields_but_ancestor_keys(self)
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'task_id'], name='task_created_idx'),
+            models.Index(fields=['payment_ball', 'created_at', 'task_id'], name='task_ball_created_idx'),
+            models.Index(fields=['status', 'created_at', 'task_id'], name='task_status_created_idx'),
+            models.Index(fields=['job_card', 'created_at', 'task_id'], name='task_job_card_created_idx'),
+            models.Index(fields=['rfq', 'created_at', 'task_id'], name='task_rfq_created_idx'),
+            models.Index(fields=['client', 'created_at', 'task_id'], name='task_client_created_idx'),
+        ]
     
 
-class SubContracting(models.Model):
+class SubContracting(LoadedValuesMixin, models.Model):
     SUBCONTRACT_STATUS_CHOICES = [
         ('Pending', 'Pending'),
         ('InProgress', 'InProgress'),
         ('Completed', 'Completed'),
     ]
 
+    tracked_fields = ('task_id', 'weightage', 'completion_percentage')  # what client_new.signals reacts to
     subcontract_id = models.AutoField(primary_key=True)
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="subcontracts")
     subcontract_brief = models.TextField()
@@ -265,12 +530,36 @@ class SubContracting(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    job_card = ancestor_key(JobCard)
+    rfq = ancestor_key(RFQ)
+    client = ancestor_key(Client)
 
     def __str__(self):
         return f"SubContracting {self.subcontract_id} for Task {self.task.task_id}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        parent_saved = update_fields is None or 'task' in update_fields or 'task_id' in update_fields
+        # The keys only change with the parent; re-read them when it moved.
+        if parent_saved and self.changed_since_load('task_id'):
+            self.job_card_id, self.rfq_id, self.client_id = Task.objects.filter(
+                pk=self.task_id
+            ).values_list('job_card_id', 'rfq_id', 'client_id').get()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *ANCESTOR_KEYS}
+        elif update_fields is None:
+            kwargs['update_fields'] = fields_but_ancestor_keys(self)
+        super().save(*args, **kwargs)
+
     class Meta:
-        ordering = ['-created_at']            
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'subcontract_id'], name='subcontract_created_idx'),
+            models.Index(fields=['task', 'created_at', 'subcontract_id'], name='subcontract_task_created_idx'),
+            models.Index(fields=['job_card', 'created_at', 'subcontract_id'], name='subcontract_job_card_idx'),
+            models.Index(fields=['rfq', 'created_at', 'subcontract_id'], name='subcontract_rfq_idx'),
+            models.Index(fields=['client', 'created_at', 'subcontract_id'], name='subcontract_client_idx'),
+        ]
 
     
 
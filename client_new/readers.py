@@ -0,0 +1,50 @@
+from BaseApp.readers import ValuesReader
+from .models import JobCard
+from .serializers import JobCardSerializer, PaymentBallSerializer, TaskSerializer, SubContractingSerializer
+
+
+class JobCardReader(ValuesReader):
+    serializer_class = JobCardSerializer
+    method_fields = {
+        'payment_terms_display': lambda row: JobCard.display_payment_terms(row['payment_terms']),
+    }
+
+
+class PaymentBallReader(ValuesReader):
+    serializer_class = PaymentBallSerializer
+    method_fields = {
+        'payment_terms_display': lambda row: row['payment_terms'] or [],
+    }
+
+    def to_representation(self, row, plan=None):
+        # Same renaming as PaymentBallSerializer.to_representation.
+        representation = super().to_representation(row, plan)
+        if 'payment_terms_display' in representation:
+            representation['payment_terms'] = representation.pop('payment_terms_display')
+        return representation
+
+
+class TaskReader(ValuesReader):
+    serializer_class = TaskSerializer
+    method_fields = {
+        'payment_ball_details': lambda row: {
+            'project_percentage': row['payment_ball__project_percentage'],
+            'project_status': row['payment_ball__project_status'],
+        },
+    }
+
+
+class SubContractingReader(ValuesReader):
+    serializer_class = SubContractingSerializer
+    method_fields = {
+        'task_details': lambda row: {
+            'task_brief': row['task__task_brief'],
+            'task_status': row['task__status'],
+        },
+    }
+
+
+job_card_reader = JobCardReader()
+payment_ball_reader = PaymentBallReader()
+task_reader = TaskReader()
+subcontracting_reader = SubContractingReader()
@@ -0,0 +1,192 @@
+"""
+Weighted completion rollups for the JobCard -> PaymentBall -> Task ->
+SubContracting hierarchy.
+
+- Task: subcontracts' completion_percentage weighted by their weightage, or
+  the task's own completion_percentage when it has no subcontracts.
+- PaymentBall: tasks' weighted_completion weighted by task weightage.
+- JobCard: payment balls' weighted_completion weighted by project_percentage.
+
+Each refresh is a single set-based UPDATE over the given rows, computing the
+value from their direct children with a correlated subquery. Callers pass the
+ids on the path that changed, so a write only touches its own ancestors.
+Refreshed rows get a new updated_at, as a save() would give them, and their
+cached API responses are invalidated. Bulk writes wrap themselves in
+`batched()`, so the refreshes their rows' signals ask for run once.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db.models import (
+    DecimalField, ExpressionWrapper, F, FloatField, OuterRef, Subquery, Sum, Value,
+)
+from django.db.models.functions import Cast, Coalesce, Now, NullIf, Round
+
+from BaseApp import response_cache
+
+from .models import JobCard, PaymentBall, Task, SubContracting
+
+
+def _weighted_average(children, parent_field, weight, value):
+    """Subquery averaging `value` weighted by `weight` over a parent's children."""
+    # Averages are computed in floating point: SQLite stores whole decimals as
+    # integers and would otherwise fall back to integer division.
+    weight = Cast(weight, FloatField())
+    average = children.filter(**{parent_field: OuterRef('pk')}).order_by().values(
+        parent_field
+    ).annotate(
+        average=ExpressionWrapper(
+            Sum(weight * F(value)) / NullIf(Sum(weight), Value(0.0)),
+            output_field=FloatField(),
+        )
+    ).values('average')
+    return Subquery(average, output_field=FloatField())
+
+
+def _rounded(average, fallback):
+    return Round(
+        Coalesce(average, fallback, output_field=FloatField()), 2,
+        output_field=DecimalField(max_digits=5, decimal_places=2),
+    )
+
+
+def task_completion():
+    return _rounded(
+        _weighted_average(SubContracting.objects, 'task', 'weightage', 'completion_percentage'),
+        F('completion_percentage'),
+    )
+
+
+def payment_ball_completion(expected=False):
+    """
+    From the tasks' stored weighted_completion, or with `expected` from the
+    values their own refresh would give them.
+    """
+    tasks, value = Task.objects, 'weighted_completion'
+    if expected:
+        tasks, value = tasks.annotate(expected=task_completion()), 'expected'
+    return _rounded(_weighted_average(tasks, 'payment_ball', 'weightage', value), Value(0.0))
+
+
+def job_card_completion(expected=False):
+    """Like payment_ball_completion, over the job card's payment balls."""
+    payment_balls, value = PaymentBall.objects, 'weighted_completion'
+    if expected:
+        payment_balls, value = payment_balls.annotate(expected=payment_ball_completion(expected=True)), 'expected'
+    return _rounded(_weighted_average(payment_balls, 'job_card', 'project_percentage', value), Value(0.0))
+
+
+_batch = threading.local()
+
+
+def _pending(kind, ids):
+    """Record `ids` for the enclosing `batched()` block, if any."""
+    pending = getattr(_batch, 'pending', None)
+    if pending is None:
+        return False
+    pending[kind].update(set(ids) - {None})
+    return True
+
+
+@contextmanager
+def batched():
+    """
+    Collect the refreshes requested inside the block and run them once on
+    exit: tasks first, then payment balls, then job cards, so each level
+    reads already refreshed children. Nested blocks join the outer one.
+    """
+    if getattr(_batch, 'pending', None) is not None:
+        yield
+        return
+    _batch.pending = pending = {'tasks': set(), 'payment_balls': set(), 'job_cards': set()}
+    try:
+        yield
+    finally:
+        _batch.pending = None
+    refresh_tasks(pending['tasks'])
+    refresh_payment_balls(pending['payment_balls'])
+    refresh_job_cards(pending['job_cards'])
+
+
+def refresh_job_cards(job_card_ids):
+    if _pending('job_cards', job_card_ids):
+        return
+    job_card_ids = set(job_card_ids) - {None}
+    if job_card_ids:
+        JobCard.objects.filter(pk__in=job_card_ids).update(
+            weighted_completion=job_card_completion(), updated_at=Now()
+        )
+        response_cache.invalidate(JobCard, job_card_ids)
+
+
+def refresh_payment_balls(payment_ball_ids, job_card_ids=None):
+    """
+    Refresh the given payment balls and their job cards. Pass `job_card_ids`
+    when the caller already knows them to skip the parent lookup.
+    """
+    if _pending('payment_balls', payment_ball_ids):
+        _pending('job_cards', job_card_ids or ())
+        return
+    payment_ball_ids = set(payment_ball_ids) - {None}
+    if not payment_ball_ids:
+        return
+    PaymentBall.objects.filter(pk__in=payment_ball_ids).update(
+        weighted_completion=payment_ball_completion(), updated_at=Now()
+    )
+    if job_card_ids is None:
+        job_card_ids = PaymentBall.objects.filter(pk__in=payment_ball_ids).values_list(
+            'job_card_id', flat=True
+        )
+    job_card_ids = set(job_card_ids)
+    response_cache.invalidate(PaymentBall, payment_ball_ids, {'job_card_id': job_card_ids})
+    refresh_job_cards(job_card_ids)
+
+
+def refresh_tasks(task_ids):
+    """Refresh the given tasks, then their payment balls and job cards."""
+    if _pending('tasks', task_ids):
+        return
+    task_ids = set(task_ids) - {None}
+    if not task_ids:
+        return
+    Task.objects.filter(pk__in=task_ids).update(
+        weighted_completion=task_completion(), updated_at=Now()
+    )
+
+    parents = list(Task.objects.filter(pk__in=task_ids).values_list(
+        'payment_ball_id', 'payment_ball__job_card_id'
+    ))
+    refresh_payment_balls(
+        [payment_ball_id for payment_ball_id, _ in parents],
+        job_card_ids=[job_card_id for _, job_card_id in parents],
+    )
+
+
+def rebuild(dry_run=False):
+    """
+    Recompute every rollup bottom-up in three bulk UPDATEs and return, per
+    model, how many rows held a stale value beforehand. A dry run writes
+    nothing; it compares each level with the values computed from the
+    expected (not stored) rollups below it, so it reports what a real run
+    would.
+    """
+    drift = {}
+    for model, expression in (
+        (Task, task_completion),
+        (PaymentBall, payment_ball_completion),
+        (JobCard, job_card_completion),
+    ):
+        # A real run has refreshed the level below already.
+        expected = expression(expected=True) if dry_run and model is not Task else expression()
+        stale = model.objects.annotate(expected=expected).exclude(
+            weighted_completion=F('expected')
+        )
+        drift[model] = stale.count()
+        if not dry_run:
+            # Only drifted rows, so the rebuild does not touch updated_at
+            # (and with it incremental exports) for correct ones.
+            model.objects.filter(pk__in=stale.values('pk')).update(
+                weighted_completion=expression(), updated_at=Now()
+            )
+            response_cache.invalidate(model)
+    return drift
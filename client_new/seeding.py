@@ -0,0 +1,74 @@
+from datetime import date
+from decimal import Decimal
+
+from BaseApp.models import Company, Employee
+from .models import Client, RFQ, JobCard, PaymentBall, Task, SubContracting
+
+
+def seed_hierarchy(clients=10, rfqs_per_client=2, job_cards_per_rfq=1,
+                   payment_balls_per_job_card=2, tasks_per_payment_ball=5,
+                   subcontracts_per_task=1, employees=20):
+    """
+    Bulk-insert a full Client -> ... -> SubContracting tree for tests and
+    benchmarks. Uses bulk_create throughout so seeding thousands of rows
+    stays fast; model save() hooks are intentionally bypassed.
+    """
+    company = Company.objects.create(
+        name='Seed Co', location='Dubai', about='Seed company',
+        type='IT Solutions'
+    )
+    staff = Employee.objects.bulk_create([
+        Employee(
+            name=f'Employee {i}', email=f'employee{i}@seed.example',
+            contact='000', description='', location='Dubai',
+            company=company, position='Team Members',
+            salary=Decimal('2070.00'), hourly_rate=Decimal('10.00'),
+        )
+        for i in range(employees)
+    ])
+
+    client_rows = Client.objects.bulk_create([
+        Client(client_name=f'Client {i}', company_name=f'Client Co {i}')
+        for i in range(clients)
+    ])
+    rfq_rows = RFQ.objects.bulk_create([
+        RFQ(
+            client=client, project_type='Fit-out', scope_of_work='Scope',
+            quotation_number=f'Q-{client.pk}-{i}',
+            quotation_amount=Decimal('10000.00'),
+        )
+        for client in client_rows for i in range(rfqs_per_client)
+    ])
+    job_rows = JobCard.objects.bulk_create([
+        JobCard(
+            rfq=rfq, job_number=f'J-{rfq.pk}-{i}', scope_of_work='Scope',
+            delivery_timelines=date(2025, 1, 1),
+        )
+        for rfq in rfq_rows for i in range(job_cards_per_rfq)
+    ])
+    ball_rows = PaymentBall.objects.bulk_create([
+        PaymentBall(
+            job_card=job, project_percentage=Decimal('50.00'),
+            amount=Decimal('5000.00'),
+        )
+        for job in job_rows for _ in range(payment_balls_per_job_card)
+    ])
+    task_rows = Task.objects.bulk_create([
+        Task(
+            payment_ball=ball, task_brief='Task', weightage=Decimal('20.00'),
+            due_date=date(2025, 1, 1), assignee=staff[i % len(staff)],
+            job_card=ball.job_card, rfq=ball.job_card.rfq,
+            client=ball.job_card.rfq.client,
+        )
+        for ball in ball_rows for i in range(tasks_per_payment_ball)
+    ])
+    SubContracting.objects.bulk_create([
+        SubContracting(
+            task=task, subcontract_brief='Subcontract',
+            weightage=Decimal('100.00'), due_date=date(2025, 1, 1),
+            assignee=staff[i % len(staff)], job_card_id=task.job_card_id,
+            rfq_id=task.rfq_id, client_id=task.client_id,
+        )
+        for task in task_rows for i in range(subcontracts_per_task)
+    ])
+    return client_rows
@@ -1,14 +1,19 @@
+from django.db import transaction
 from rest_framework import serializers
+from BaseApp import response_cache, sequences
+from BaseApp.bulk import BulkListSerializer, BulkPrimaryKeyRelatedField
+from BaseApp.serializers import EmployeeSerializer, SparseFieldsetMixin
+from . import dashboard
 from .models import Client, RFQ, JobCard, PaymentBall, Task, SubContracting
 
 
-class ClientSerializer(serializers.ModelSerializer):
+class ClientSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Client
         fields = '__all__'
 
 
-class RFQSerializer(serializers.ModelSerializer):
+class RFQSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     client_name = serializers.CharField(source='client.client_name', read_only=True)  # Add client_name
 
     class Meta:
@@ -16,8 +21,9 @@ class RFQSerializer(serializers.ModelSerializer):
         fields = [
             'rfq_id', 'client', 'client_name', 'rfq_date', 
             'project_type', 'scope_of_work', 'quotation_number', 
-            'quotation_amount', 'remarks', 'status'
+            'quotation_amount', 'remarks', 'status', 'updated_at'
         ]
+        expandable_fields = {'client': ClientSerializer}
 
 
 
@@ -31,8 +37,41 @@ class PaymentTermSerializer(serializers.Serializer):
     milestone = serializers.CharField(max_length=100)
     percentage = serializers.DecimalField(max_digits=5, decimal_places=2)
     description = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    paid = serializers.BooleanField(required=False)
 
-class JobCardSerializer(serializers.ModelSerializer):
+class JobCardListSerializer(BulkListSerializer):
+    """
+    Batch job card creation: one INSERT for the job cards and one for the
+    PaymentBalls generated from their payment terms, in one transaction.
+    """
+
+    def create(self, validated_data):
+        job_cards = [self.child.build(attrs) for attrs in validated_data]
+        with transaction.atomic():
+            # bulk_create skips JobCard.save(), which numbers unnumbered job cards.
+            unnumbered = [job_card for job_card in job_cards if not job_card.job_number]
+            for job_card, number in zip(unnumbered, sequences.allocate('job', len(unnumbered))):
+                job_card.job_number = number
+            JobCard.objects.bulk_create(job_cards)
+            payment_balls = PaymentBall.objects.bulk_create([
+                ball for job_card in job_cards for ball in job_card.milestone_payment_balls()
+            ])
+        # bulk_create sends no signals. New payment balls have no tasks, so
+        # the job cards' rollups are already right at 0.
+        dashboard.invalidate()
+        response_cache.invalidate(
+            JobCard, [job_card.pk for job_card in job_cards],
+            {'rfq_id': {job_card.rfq_id for job_card in job_cards}},
+        )
+        response_cache.invalidate(
+            PaymentBall, [ball.pk for ball in payment_balls],
+            {'job_card_id': {ball.job_card_id for ball in payment_balls}},
+        )
+        return job_cards
+
+
+class JobCardSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
     client_name = serializers.CharField(source='client.client_name', read_only=True)  # Add client_name
 
     payment_terms = serializers.DictField(
@@ -48,11 +87,15 @@ class JobCardSerializer(serializers.ModelSerializer):
         fields = [
             'job_id', 'rfq', 'job_number', 'scope_of_work', 
             'delivery_timelines', 'payment_terms', 'payment_terms_display',
-            'status', 'created_at', 'color_status', 'client_name'
+            'status', 'created_at', 'color_status', 'client_name',
+            'weighted_completion', 'updated_at'
         ]
         extra_kwargs = {
             'created_at': {'read_only': True}
         }
+        expandable_fields = {'rfq': RFQSerializer}
+        field_sources = {'payment_terms_display': ['payment_terms']}
+        list_serializer_class = JobCardListSerializer
 
     def get_payment_terms_display(self, obj):
         return obj.get_payment_terms()
@@ -69,14 +112,20 @@ class JobCardSerializer(serializers.ModelSerializer):
                 )
         return value
 
-    def create(self, validated_data):
+    @staticmethod
+    def build(validated_data):
+        """An unsaved JobCard with its payment terms already set."""
+        validated_data = dict(validated_data)
         payment_terms = validated_data.pop('payment_terms', {})
-        instance = super().create(validated_data)
-        
+        instance = JobCard(**validated_data)
         if payment_terms:
             instance.set_payment_terms(payment_terms)
-            instance.save()
-        
+        return instance
+
+    def create(self, validated_data):
+        # One INSERT, with the payment terms in it.
+        instance = self.build(validated_data)
+        instance.save()
         return instance
 
     def update(self, instance, validated_data):
@@ -89,7 +138,7 @@ class JobCardSerializer(serializers.ModelSerializer):
         
         return instance
 
-class PaymentBallSerializer(serializers.ModelSerializer):
+class PaymentBallSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     payment_terms = serializers.ListField(
         child=PaymentTermSerializer(),
         required=False,
@@ -103,12 +152,16 @@ class PaymentBallSerializer(serializers.ModelSerializer):
             'payment_id', 'job_card', 'project_percentage', 
             'project_status', 'notes', 'color_status', 
             'invoice_number', 'amount', 'payment_terms',
-            'payment_terms_display'
+            'payment_terms_display', 'weighted_completion', 'updated_at'
         ]
         extra_kwargs = {
             'payment_id': {'read_only': True},
             'invoice_number': {'read_only': True}
         }
+        expandable_fields = {'job_card': JobCardSerializer}
+        field_sources = {'payment_terms_display': ['payment_terms']}
+        # Responses carry payment_terms_display under the payment_terms key
+        field_aliases = {'payment_terms': 'payment_terms_display'}
 
     def get_payment_terms_display(self, obj):
         return obj.get_payment_terms()
@@ -161,13 +214,15 @@ class PaymentBallSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         representation.pop('payment_terms', None)
-        representation['payment_terms'] = representation.pop('payment_terms_display', [])
+        if 'payment_terms_display' in representation:
+            representation['payment_terms'] = representation.pop('payment_terms_display')
         return representation
 
 
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
     assignee_name = serializers.CharField(source='assignee.name', read_only=True)
     payment_ball_details = serializers.SerializerMethodField()
 
@@ -177,9 +232,14 @@ class TaskSerializer(serializers.ModelSerializer):
             'task_id', 'payment_ball', 'payment_ball_details',
             'task_brief', 'weightage', 'status', 'due_date',
             'assignee', 'assignee_name', 'remarks', 
-            'completion_percentage', 'created_at', 'updated_at'
+            'completion_percentage', 'weighted_completion',
+            'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
+        expandable_fields = {'payment_ball': PaymentBallSerializer, 'assignee': EmployeeSerializer}
+        field_sources = {
+            'payment_ball_details': ['payment_ball__project_percentage', 'payment_ball__project_status'],
+        }
 
     def get_payment_ball_details(self, obj):
         return {
@@ -204,7 +264,8 @@ class TaskSerializer(serializers.ModelSerializer):
 
         return data
 
-class SubContractingSerializer(serializers.ModelSerializer):
+class SubContractingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
     assignee_name = serializers.CharField(source='assignee.name', read_only=True)
     task_details = serializers.SerializerMethodField()
 
@@ -218,6 +279,8 @@ class SubContractingSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
+        expandable_fields = {'task': TaskSerializer, 'assignee': EmployeeSerializer}
+        field_sources = {'task_details': ['task__task_brief', 'task__status']}
 
     def get_task_details(self, obj):
         return {
@@ -243,6 +306,27 @@ class SubContractingSerializer(serializers.ModelSerializer):
         return data
 
 
+class TreeQuerySerializer(serializers.Serializer):
+    depth = serializers.IntegerField(required=False, min_value=0)
+    fields = serializers.CharField(required=False)
+
+    def validate_fields(self, value):
+        return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class DashboardQuerySerializer(serializers.Serializer):
+    client = serializers.IntegerField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError(
+                {"date_to": "Must be on or after date_from"}
+            )
+        return data
+
+
 
 
         
@@ -0,0 +1,135 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from BaseApp import response_cache
+
+from . import ancestry, dashboard, rollups
+from .models import Client, RFQ, JobCard, PaymentBall, Task, SubContracting
+
+
+def _previous_parent_id(instance, parent_field):
+    """
+    Parent id stored for `instance` before it is saved: the one it was
+    loaded with, or read back for an instance that was not loaded.
+    """
+    if instance._state.adding or instance.pk is None:
+        return None
+    if parent_field in instance.__dict__.get('_loaded_values', {}):
+        return instance.loaded_value(parent_field)
+    return type(instance)._default_manager.filter(pk=instance.pk).values_list(
+        parent_field, flat=True
+    ).first()
+
+
+@receiver(pre_save, sender=SubContracting)
+def remember_subcontract_task(sender, instance, **kwargs):
+    instance._previous_task_id = _previous_parent_id(instance, 'task_id')
+
+
+@receiver(pre_save, sender=Task)
+def remember_task_payment_ball(sender, instance, **kwargs):
+    instance._previous_payment_ball_id = _previous_parent_id(instance, 'payment_ball_id')
+
+
+@receiver(pre_save, sender=PaymentBall)
+def remember_payment_ball_job_card(sender, instance, **kwargs):
+    instance._previous_job_card_id = _previous_parent_id(instance, 'job_card_id')
+
+
+@receiver(pre_save, sender=JobCard)
+def remember_job_card_rfq(sender, instance, **kwargs):
+    instance._previous_rfq_id = _previous_parent_id(instance, 'rfq_id')
+
+
+@receiver(pre_save, sender=RFQ)
+def remember_rfq_client(sender, instance, **kwargs):
+    instance._previous_client_id = _previous_parent_id(instance, 'client_id')
+
+
+def _moved(instance, attribute, parent_id):
+    previous = getattr(instance, attribute, None)
+    return previous is not None and previous != parent_id
+
+
+# Saves that leave a row's tracked_fields alone (a remarks edit) can not
+# change any rollup or ancestry key, and refresh nothing.
+
+@receiver(post_save, sender=SubContracting)
+def subcontract_saved(sender, instance, created, **kwargs):
+    if created or instance.changed_since_load(*sender.tracked_fields):
+        rollups.refresh_tasks({instance.task_id, getattr(instance, '_previous_task_id', None)})
+    instance.remember_loaded_values()
+
+
+@receiver(post_delete, sender=SubContracting)
+def subcontract_deleted(sender, instance, **kwargs):
+    rollups.refresh_tasks({instance.task_id})
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    if created or instance.changed_since_load(*sender.tracked_fields):
+        rollups.refresh_tasks({instance.pk})
+        if _moved(instance, '_previous_payment_ball_id', instance.payment_ball_id):
+            rollups.refresh_payment_balls({instance._previous_payment_ball_id})
+            ancestry.task_moved(instance.pk)
+        # The UPDATE above bypassed the instance; keep the in-memory copy current
+        # so the response for this write shows the new value.
+        instance.refresh_from_db(fields=['weighted_completion'])
+    instance.remember_loaded_values()
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    rollups.refresh_payment_balls({instance.payment_ball_id})
+
+
+@receiver(post_save, sender=PaymentBall)
+def payment_ball_saved(sender, instance, created, **kwargs):
+    # A payment ball's own rollup depends only on its tasks; saving it can
+    # only change the job card(s) it belongs to.
+    if created or instance.changed_since_load(*sender.tracked_fields):
+        rollups.refresh_job_cards({
+            instance.job_card_id, getattr(instance, '_previous_job_card_id', None)
+        })
+        if _moved(instance, '_previous_job_card_id', instance.job_card_id):
+            ancestry.payment_ball_moved(instance.pk)
+    instance.remember_loaded_values()
+
+
+@receiver(post_delete, sender=PaymentBall)
+def payment_ball_deleted(sender, instance, **kwargs):
+    rollups.refresh_job_cards({instance.job_card_id})
+
+
+@receiver(post_save, sender=JobCard)
+def job_card_saved(sender, instance, **kwargs):
+    if _moved(instance, '_previous_rfq_id', instance.rfq_id):
+        ancestry.job_card_moved(instance.pk)
+    instance.remember_loaded_values()
+
+
+@receiver(post_save, sender=RFQ)
+def rfq_saved(sender, instance, **kwargs):
+    if _moved(instance, '_previous_client_id', instance.client_id):
+        ancestry.rfq_moved(instance.pk)
+    instance.remember_loaded_values()
+
+
+@receiver(post_save, sender=RFQ)
+@receiver(post_delete, sender=RFQ)
+@receiver(post_save, sender=JobCard)
+@receiver(post_delete, sender=JobCard)
+@receiver(post_save, sender=PaymentBall)
+@receiver(post_delete, sender=PaymentBall)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_dashboard(sender, **kwargs):
+    dashboard.invalidate()
+
+
+# Response cache namespaces, for the cached viewsets
+response_cache.watch(Client)
+response_cache.watch(RFQ, parents=['client_id'])
+response_cache.watch(JobCard, parents=['rfq_id'])
+response_cache.watch(PaymentBall, parents=['job_card_id'])
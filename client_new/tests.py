@@ -1,3 +1,1304 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from BaseApp import renderers, reports, sequences
+from BaseApp.models import ReportExport
+
+from . import ancestry, rollups
+from .models import Client, RFQ, JobCard, PaymentBall, Task, SubContracting
+from .serializers import JobCardSerializer, PaymentBallSerializer, TaskSerializer, SubContractingSerializer
+from .seeding import seed_hierarchy
+from .views import RFQViewSet
+
+
+# Per-endpoint query budgets. Each entry is (url name, model used to pick a
+# detail/filter target, budget). The budget must hold regardless of how many
+# rows the endpoint returns.
+LIST_QUERY_BUDGETS = [
+    ('client-list', 1),
+    ('rfqs-list', 1),
+    ('jobcards-list', 1),
+    ('paymentballs-list', 1),
+    ('tasks-list', 1),
+    ('subcontracts-list', 1),
+]
+
+DETAIL_QUERY_BUDGETS = [
+    ('client-detail', Client, 1),
+    ('rfqs-detail', RFQ, 1),
+    ('jobcards-detail', JobCard, 1),
+    ('paymentballs-detail', PaymentBall, 1),
+    ('tasks-detail', Task, 1),
+    ('subcontracts-detail', SubContracting, 1),
+]
+
+
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=50, rfqs_per_client=4)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_list_endpoints_within_budget(self):
+        for url_name, budget in LIST_QUERY_BUDGETS:
+            with self.subTest(url_name), self.assertNumQueries(budget):
+                response = self.client.get(reverse(url_name))
+                self.assertEqual(response.status_code, 200)
+
+    def test_detail_endpoints_within_budget(self):
+        for url_name, model, budget in DETAIL_QUERY_BUDGETS:
+            pk = model.objects.values_list('pk', flat=True).first()
+            with self.subTest(url_name), self.assertNumQueries(budget):
+                response = self.client.get(reverse(url_name, args=[pk]))
+                self.assertEqual(response.status_code, 200)
+
+    def test_by_parent_actions_within_budget(self):
+        job_card_id = JobCard.objects.values_list('pk', flat=True).first()
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('paymentballs-by-job-card'), {'job_card': job_card_id}
+            )
+            self.assertEqual(response.status_code, 200)
+
+        payment_ball_id = PaymentBall.objects.values_list('pk', flat=True).first()
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('tasks-by-payment-ball'), {'payment_ball': payment_ball_id}
+            )
+            self.assertEqual(response.status_code, 200)
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=5)
+        # Force ties on the ordering column so the pk tiebreaker is exercised.
+        first = Task.objects.order_by('created_at').first()
+        Task.objects.filter(pk__lt=first.pk + 40).update(created_at=first.created_at)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def walk(self, url, link):
+        seen = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            for query in queries.captured_queries:
+                self.assertNotIn('OFFSET', query['sql'])
+                self.assertNotIn('COUNT(', query['sql'])
+            seen.extend(response.data['results'])
+            url = response.data[link]
+        return seen
+
+    def test_forward_and_backward_walks_cover_every_row_once(self):
+        expected = list(Task.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        forward = self.walk(reverse('tasks-list') + '?page_size=7', 'next')
+        self.assertEqual([row['task_id'] for row in forward], expected)
+
+        last_page = self.client.get(reverse('tasks-list') + '?page_size=7')
+        while last_page.data['next']:
+            last_page = self.client.get(last_page.data['next'])
+        backward = self.walk(last_page.data['previous'], 'previous')
+        # Pages arrive last to first, each in the forward order.
+        before_last = len(expected) - len(last_page.data['results'])
+        pages = [expected[start:start + 7] for start in range(0, before_last, 7)]
+        self.assertEqual([row['task_id'] for row in backward], [pk for page in reversed(pages) for pk in page])
+
+    def test_nested_rfqs_page_by_date(self):
+        client = Client.objects.order_by('pk').first()
+        older, newer = RFQ.objects.filter(client=client).order_by('pk')
+        RFQ.objects.filter(pk=older.pk).update(rfq_date=newer.rfq_date + timedelta(days=1))
+        view = RFQViewSet.as_view({'get': 'list'})
+        url, seen = '/?page_size=1', []
+        while url:
+            response = view(APIRequestFactory().get(url), client_pk=client.pk)
+            seen.extend(row['rfq_id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [older.pk, newer.pk])
+
+    def test_page_size_is_capped(self):
+        with self.settings(API_MAX_PAGE_SIZE=5):
+            response = self.client.get(reverse('tasks-list') + '?page_size=1000')
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(reverse('tasks-list') + '?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+
+def query_plans(test_client, url):
+    """Run `url` and return the SQLite query plan of every SELECT it issued."""
+    with CaptureQueriesContext(connection) as queries:
+        response = test_client.get(url)
+    assert response.status_code == 200, response.status_code
+    plans = []
+    with connection.cursor() as cursor:
+        for query in queries.captured_queries:
+            if query['sql'].startswith('SELECT'):
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append([row[-1] for row in cursor.fetchall()])
+    return plans
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Plan assertions target SQLite EXPLAIN QUERY PLAN output')
+class IndexUsageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=20)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_filtered_lists_search_an_index(self):
+        payment_ball = PaymentBall.objects.values_list('pk', flat=True).first()
+        job_card = JobCard.objects.values_list('pk', flat=True).first()
+        client = Client.objects.values_list('pk', flat=True).first()
+        cases = [
+            ('client_new_rfq', reverse('rfqs-list') + '?status=pending'),
+            ('client_new_jobcard', reverse('jobcards-list') + '?status=PENDING'),
+            ('client_new_paymentball', reverse('paymentballs-list') + f'?job_card={job_card}'),
+            ('client_new_task', reverse('tasks-list') + f'?payment_ball={payment_ball}'),
+            ('client_new_task', reverse('tasks-list') + f'?client={client}'),
+            ('client_new_subcontracting', reverse('subcontracts-list') + f'?job_card={job_card}'),
+        ]
+        for table, url in cases:
+            with self.subTest(url):
+                plan = query_plans(self.client, url)[0]
+                self.assertTrue(
+                    any(line.startswith(f'SEARCH {table} USING') for line in plan), plan
+                )
+
+    def test_ordered_lists_do_not_sort_or_scan_the_table(self):
+        for url_name in ('client-list', 'rfqs-list', 'jobcards-list', 'tasks-list', 'subcontracts-list'):
+            with self.subTest(url_name):
+                plan = query_plans(self.client, reverse(url_name))[0]
+                self.assertFalse(any('TEMP B-TREE' in line for line in plan), plan)
+
+
+class RollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=1, rfqs_per_client=1, payment_balls_per_job_card=2,
+                       tasks_per_payment_ball=2, subcontracts_per_task=0)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.job_card = JobCard.objects.get()
+        self.ball, self.other_ball = PaymentBall.objects.order_by('pk')
+        self.task, self.sibling = self.ball.tasks.order_by('pk')
+
+    def assertCompletion(self, obj, expected):
+        obj.refresh_from_db()
+        self.assertEqual(obj.weighted_completion, Decimal(expected))
+
+    def test_child_writes_update_the_ancestor_path(self):
+        response = self.client.patch(
+            reverse('tasks-detail', args=[self.task.pk]), {'completion_percentage': '50'}
+        )
+        self.assertEqual(response.data['weighted_completion'], '50.00')
+        self.assertCompletion(self.ball, '25.00')
+        self.assertCompletion(self.job_card, '12.50')
+
+        subcontract = SubContracting.objects.create(
+            task=self.sibling, subcontract_brief='Sub', weightage=Decimal('30'),
+            completion_percentage=Decimal('100'), due_date=date(2025, 1, 1),
+        )
+        SubContracting.objects.create(
+            task=self.sibling, subcontract_brief='Sub', weightage=Decimal('10'),
+            completion_percentage=Decimal('0'), due_date=date(2025, 1, 1),
+        )
+        self.assertCompletion(self.sibling, '75.00')
+        self.assertCompletion(self.ball, '62.50')
+        self.assertCompletion(self.job_card, '31.25')
+
+        subcontract.delete()
+        self.assertCompletion(self.sibling, '0.00')
+        self.assertCompletion(self.ball, '25.00')
+
+    def test_unrelated_edits_and_cascades_stay_cheap(self):
+        # A remarks edit changes no rollup or key: the row is read and written.
+        with self.assertNumQueries(2):
+            response = self.client.patch(reverse('tasks-detail', args=[self.task.pk]), {'remarks': 'Called the site'})
+        self.assertEqual(response.status_code, 200)
+
+        # Deleting a payment ball refreshes its job card once, not per task.
+        self.task.completion_percentage = Decimal('100')
+        self.task.save()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(reverse('paymentballs-detail', args=[self.other_ball.pk]))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            sum(q['sql'].startswith('UPDATE "client_new_jobcard"') for q in queries), 1
+        )
+        self.assertCompletion(self.job_card, '50.00')
+
+    def test_reparenting_refreshes_both_paths(self):
+        self.task.completion_percentage = Decimal('100')
+        self.task.save()
+        self.assertCompletion(self.ball, '50.00')
+
+        self.task.payment_ball = self.other_ball
+        self.task.save()
+        self.assertCompletion(self.ball, '0.00')
+        self.assertCompletion(self.other_ball, '33.33')
+
+    def test_rebuild_reports_and_repairs_drift(self):
+        Task.objects.filter(pk=self.task.pk).update(completion_percentage=Decimal('80'))
+        drift = rollups.rebuild(dry_run=True)
+        # The stale task leaves its payment ball and job card stale too.
+        self.assertEqual(drift, {Task: 1, PaymentBall: 1, JobCard: 1})
+        self.assertCompletion(self.task, '0.00')
+
+        self.assertEqual(rollups.rebuild(), drift)
+        self.assertCompletion(self.task, '80.00')
+        self.assertCompletion(self.ball, '40.00')
+        self.assertCompletion(self.job_card, '20.00')
+        self.assertEqual(set(rollups.rebuild(dry_run=True).values()), {0})
+
+
+class DashboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=3, rfqs_per_client=2)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_aggregates_are_cached_until_a_write(self):
+        with self.assertNumQueries(4):
+            data = self.client.get(reverse('dashboard')).data
+        self.assertEqual(data['rfqs']['total'], 6)
+        self.assertEqual(data['rfqs']['amount'], '60000.00')
+        self.assertEqual(data['payment_balls']['by_color']['gray'], {'count': 12, 'amount': '60000.00'})
+        self.assertEqual(data['tasks']['by_status']['Pending']['count'], 60)
+        self.assertEqual(data['tasks']['by_status']['Completed']['count'], 0)
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse('dashboard'))
+
+        task = Task.objects.first()
+        task.status = 'Completed'
+        task.save()
+        with self.assertNumQueries(4):
+            data = self.client.get(reverse('dashboard')).data
+        self.assertEqual(data['tasks']['by_status']['Completed']['count'], 1)
+
+    def test_client_and_date_filters(self):
+        client = Client.objects.order_by('pk').first()
+        data = self.client.get(reverse('dashboard'), {'client': client.pk}).data
+        self.assertEqual(data['rfqs']['total'], 2)
+        self.assertEqual(data['tasks']['total'], 20)
+
+        data = self.client.get(reverse('dashboard'), {'date_to': '2000-01-01'}).data
+        self.assertEqual(data['job_cards']['total'], 0)
+
+        response = self.client.get(reverse('dashboard'), {'date_from': '2025-02-01', 'date_to': '2025-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class AncestryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=2, rfqs_per_client=1, payment_balls_per_job_card=1,
+                       tasks_per_payment_ball=2, subcontracts_per_task=1)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.first, self.second = Client.objects.order_by('pk')
+
+    def keys(self, obj):
+        obj.refresh_from_db()
+        return obj.job_card_id, obj.rfq_id, obj.client_id
+
+    def test_filters_resolve_through_the_denormalized_keys(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tasks-list'), {'client': self.first.pk})
+        self.assertEqual(len(response.data['results']), 2)
+
+        job_card = JobCard.objects.filter(rfq__client=self.second).get()
+        response = self.client.get(reverse('subcontracts-list'), {'job_card': job_card.pk})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_new_rows_get_their_keys(self):
+        ball = PaymentBall.objects.filter(job_card__rfq__client=self.first).get()
+        response = self.client.post(reverse('tasks-list'), {
+            'payment_ball': ball.pk, 'task_brief': 'New', 'weightage': '10',
+            'due_date': '2025-01-01',
+        })
+        self.assertEqual(response.status_code, 201)
+        task = Task.objects.get(pk=response.data['task_id'])
+        self.assertEqual(self.keys(task), (ball.job_card_id, ball.job_card.rfq_id, self.first.pk))
+
+    def test_reparenting_an_ancestor_rewrites_descendants(self):
+        rfq = RFQ.objects.get(client=self.first)
+        subcontract = SubContracting.objects.filter(client=self.first).first()
+        rfq.client = self.second
+        rfq.save()
+        self.assertEqual(self.keys(subcontract)[2], self.second.pk)
+
+        other_ball = PaymentBall.objects.exclude(job_card__rfq=rfq).get()
+        task = subcontract.task
+        task.payment_ball = other_ball
+        task.save()
+        self.assertEqual(self.keys(subcontract)[0], other_ball.job_card_id)
+
+    def test_saves_that_keep_the_parent_leave_the_keys_alone(self):
+        task = Task.objects.filter(client=self.first).first()
+        rfq = RFQ.objects.get(client=self.first)
+        rfq.client = self.second
+        rfq.save()
+
+        # `task` still holds the old keys; saving it must not write them back.
+        task.remarks = 'Called the site'
+        with self.assertNumQueries(1):
+            task.save()
+        self.assertEqual(self.keys(task)[2], self.second.pk)
+
+    def test_backfill_repairs_stale_keys(self):
+        Task.objects.update(client=None)
+        stale = ancestry.backfill()
+        self.assertEqual(stale[Task], 4)
+        self.assertEqual(set(ancestry.backfill(dry_run=True).values()), {0})
+
+
+class TreeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=2, rfqs_per_client=3)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def fetch(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_client_tree_uses_one_query_per_level(self):
+        client = Client.objects.order_by('pk').first()
+        with self.assertNumQueries(6):
+            tree = self.fetch(reverse('client-tree', args=[client.pk]))
+        self.assertEqual(tree['client_id'], client.pk)
+        self.assertEqual(len(tree['rfqs']), 3)
+        ball = tree['rfqs'][0]['job_cards'][0]['payment_balls'][0]
+        self.assertEqual(ball['amount'], '5000.00')
+        self.assertEqual(len(ball['tasks']), 5)
+        self.assertEqual(len(ball['tasks'][0]['subcontracts']), 1)
+        self.assertNotIn('scope_of_work', tree['rfqs'][0])
+        self.assertNotIn('task_brief', ball['tasks'][0])
+
+    def test_briefs_are_loaded_when_named(self):
+        job_card = JobCard.objects.order_by('pk').first()
+        with CaptureQueriesContext(connection) as queries:
+            tree = self.fetch(reverse('jobcards-tree', args=[job_card.pk]), fields='task_brief,status')
+        task = tree['payment_balls'][0]['tasks'][0]
+        self.assertEqual(set(task), {'task_id', 'task_brief', 'status', 'subcontracts'})
+        self.assertNotIn('subcontract_brief', task['subcontracts'][0])
+        [subcontracts] = [q['sql'] for q in queries if 'FROM "client_new_subcontracting"' in q['sql']]
+        self.assertNotIn('subcontract_brief', subcontracts)
+
+    def test_depth_and_field_limits(self):
+        client = Client.objects.order_by('pk').first()
+        with self.assertNumQueries(3):
+            tree = self.fetch(reverse('client-tree', args=[client.pk]), depth=2, fields='status')
+        job_card = tree['rfqs'][0]['job_cards'][0]
+        self.assertEqual(set(job_card), {'job_id', 'status'})
+        self.assertEqual(set(tree['rfqs'][0]), {'rfq_id', 'status', 'job_cards'})
+
+    def test_job_card_tree(self):
+        job_card = JobCard.objects.order_by('pk').first()
+        with self.assertNumQueries(4):
+            tree = self.fetch(reverse('jobcards-tree', args=[job_card.pk]))
+        self.assertEqual(len(tree['payment_balls']), 2)
+        self.assertEqual(len(tree['payment_balls'][0]['tasks']), 5)
+
+
+class ValuesReaderParityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=3)
+        job_card = JobCard.objects.order_by('pk').first()
+        job_card.set_payment_terms({'1': {'milestone': 'Advance', 'percentage': '40.50'},
+                                    '2': {'milestone': 'Handover', 'percentage': '59.50'}})
+        job_card.save()
+        ball = PaymentBall.objects.order_by('pk').first()
+        ball.set_payment_terms([{'milestone': 'Advance', 'percentage': '100'}])
+        ball.save()
+        Task.objects.filter(pk=Task.objects.order_by('pk').first().pk).update(assignee=None)
+        SubContracting.objects.filter(pk=SubContracting.objects.order_by('pk').first().pk).update(assignee=None)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def assertSameJSON(self, fast, serializer_class, queryset):
+        expected = json.loads(JSONRenderer().render(serializer_class(queryset, many=True).data))
+        pk_name = queryset.model._meta.pk.name
+        self.assertEqual(
+            sorted(fast, key=lambda row: row[pk_name]),
+            sorted(expected, key=lambda row: row[pk_name]),
+        )
+
+    def test_list_matches_serializer(self):
+        for url_name, serializer_class, model in [
+            ('jobcards-list', JobCardSerializer, JobCard),
+            ('paymentballs-list', PaymentBallSerializer, PaymentBall),
+            ('tasks-list', TaskSerializer, Task),
+            ('subcontracts-list', SubContractingSerializer, SubContracting),
+        ]:
+            with self.subTest(url_name):
+                response = self.client.get(reverse(url_name), {'page_size': 500})
+                self.assertEqual(response.status_code, 200)
+                self.assertSameJSON(response.json()['results'], serializer_class, model.objects.all())
+
+    def test_by_parent_actions_match_serializer(self):
+        ball = PaymentBall.objects.order_by('pk').first()
+        response = self.client.get(reverse('tasks-by-payment-ball'), {'payment_ball': ball.pk})
+        self.assertSameJSON(response.json(), TaskSerializer, Task.objects.filter(payment_ball=ball))
+
+        response = self.client.get(reverse('paymentballs-by-job-card'), {'job_card': ball.job_card_id})
+        self.assertSameJSON(response.json(), PaymentBallSerializer, PaymentBall.objects.filter(job_card=ball.job_card_id))
+
+
+class PaymentTermsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=1, rfqs_per_client=3)
+        cls.job_cards = list(JobCard.objects.order_by('pk'))
+        terms = [
+            {'1': {'milestone': 'Advance', 'percentage': '40', 'paid': True},
+             '2': {'milestone': 'Handover', 'percentage': '60'}},
+            {'1': {'milestone': 'Advance', 'percentage': '40'},
+             '2': {'milestone': 'Handover', 'percentage': '60', 'paid': True}},
+            {'1': {'milestone': 'Advance', 'percentage': '20'},
+             '2': {'milestone': 'Handover', 'percentage': '80', 'paid': True}},
+        ]
+        for job_card, term in zip(cls.job_cards, terms):
+            job_card.set_payment_terms(term)
+            job_card.save()
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_unpaid_milestone_query_runs_in_the_database(self):
+        with self.assertNumQueries(1):
+            matches = list(JobCard.objects.with_milestone(percentage_over=30, paid=False).order_by('pk'))
+        self.assertEqual(matches, self.job_cards[:2])
+
+        response = self.client.get(reverse('jobcards-list'), {'unpaid_milestone_over': 50})
+        self.assertEqual([row['job_id'] for row in response.json()['results']], [self.job_cards[0].pk])
+
+    def test_api_shapes_survive_a_reload(self):
+        job_card = self.job_cards[0]
+        response = self.client.patch(
+            reverse('jobcards-detail', args=[job_card.pk]),
+            {'payment_terms': {'1': {'milestone': 'Advance', 'percentage': '25.50'},
+                               '2': {'milestone': 'Handover', 'percentage': '74.50'}}},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        expected = {'1': {'milestone': 'Advance', 'percentage': 25.5, 'description': ''},
+                    '2': {'milestone': 'Handover', 'percentage': 74.5, 'description': ''}}
+        self.assertEqual(response.json()['payment_terms_display'], expected)
+        detail = self.client.get(reverse('jobcards-detail', args=[job_card.pk])).json()
+        self.assertEqual(detail['payment_terms_display'], expected)
+
+        response = self.client.post(reverse('paymentballs-list'), {
+            'job_card': job_card.pk, 'project_percentage': '50.00', 'amount': '100.00',
+            'payment_terms': [{'milestone': 'Advance', 'percentage': '100.00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        expected = [{'milestone': 'Advance', 'percentage': '100.00'}]
+        self.assertEqual(response.json()['payment_terms'], expected)
+        detail = self.client.get(reverse('paymentballs-detail', args=[response.json()['payment_id']])).json()
+        self.assertEqual(detail['payment_terms'], expected)
+
+
+class SparseFieldsetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=5)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        return response, [query['sql'] for query in queries]
+
+    def test_unselected_fields_stay_out_of_the_sql(self):
+        response, queries = self.get(reverse('tasks-list'), fields='task_id,status')
+        self.assertEqual(set(response.json()['results'][0]), {'task_id', 'status'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('JOIN', queries[0])
+        self.assertNotIn('task_brief', queries[0])
+
+        response, queries = self.get(reverse('tasks-list'), fields='task_id,payment_ball_details')
+        self.assertEqual(set(response.json()['results'][0]), {'task_id', 'payment_ball_details'})
+        self.assertIn('JOIN "client_new_paymentball"', queries[0])
+
+        response, queries = self.get(reverse('rfqs-list'), fields='rfq_id,status')
+        self.assertNotIn('scope_of_work', queries[0])
+        self.assertNotIn('JOIN', queries[0])
+
+    def test_detail_and_aliased_fields(self):
+        ball = PaymentBall.objects.first()
+        response, queries = self.get(reverse('paymentballs-detail', args=[ball.pk]), fields='amount,payment_terms')
+        self.assertEqual(response.json(), {'amount': '5000.00', 'payment_terms': []})
+        self.assertEqual(len(queries), 1)
+
+    def test_expand_renders_nested_objects_in_one_query(self):
+        response, queries = self.get(reverse('subcontracts-list'), fields='subcontract_id', expand='task')
+        row = response.json()['results'][0]
+        self.assertEqual(set(row), {'subcontract_id', 'task'})
+        self.assertEqual(row['task']['payment_ball_details']['project_status'], 'Pending')
+        self.assertEqual(len(queries), 1)
+
+    def test_unknown_names_are_rejected(self):
+        self.assertEqual(self.client.get(reverse('tasks-list'), {'fields': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('tasks-list'), {'expand': 'nope'}).status_code, 400)
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=5)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def export(self, url_name, **params):
+        response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_lines_match_the_list_endpoint(self):
+        for name in ('rfqs', 'jobcards', 'paymentballs'):
+            with self.subTest(name):
+                listed = self.client.get(reverse(f'{name}-list'), {'page_size': 500}).json()['results']
+                with self.assertNumQueries(1):
+                    exported = self.export(f'{name}-export')
+                pk_name = next(iter(listed[0]))
+                self.assertEqual(exported, sorted(listed, key=lambda row: row[pk_name]))
+
+    def test_filters_and_updated_since(self):
+        exported = self.export('jobcards-export', status='pending')
+        self.assertEqual(len(exported), JobCard.objects.count())
+        self.assertEqual(self.export('jobcards-export', status='completed'), [])
+
+        job_card = JobCard.objects.order_by('pk').last()
+        cutoff = JobCard.objects.order_by('-updated_at').values_list('updated_at', flat=True).first()
+        job_card.status = 'Completed'
+        job_card.save()
+        exported = self.export('jobcards-export', updated_since=job_card.updated_at.isoformat())
+        self.assertEqual([row['job_id'] for row in exported], [job_card.pk])
+        self.assertLess(cutoff, job_card.updated_at)
+
+        ball = PaymentBall.objects.filter(job_card=job_card).first()
+        exported = self.export('paymentballs-export', job_card=job_card.pk)
+        self.assertIn(ball.pk, [row['payment_id'] for row in exported])
+
+    def test_rejects_bad_timestamps(self):
+        response = self.client.get(reverse('rfqs-export'), {'updated_since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ReportExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=3)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def read_csv(self, content):
+        return list(csv.DictReader(io.StringIO(content.decode())))
+
+    def test_csv_rows_carry_assignee_and_job_columns(self):
+        response = self.client.get(reverse('reportexport-csv'), {'report': 'tasks'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        # One joined query for the whole stream, whatever the row count.
+        with self.assertNumQueries(1):
+            rows = self.read_csv(b''.join(response.streaming_content))
+
+        task = Task.objects.select_related('assignee', 'job_card', 'client').order_by('pk').first()
+        self.assertEqual(len(rows), Task.objects.count())
+        self.assertEqual(rows[0]['task_id'], str(task.pk))
+        self.assertEqual(rows[0]['assignee_name'], task.assignee.name)
+        self.assertEqual(rows[0]['job_number'], task.job_card.job_number)
+        self.assertEqual(rows[0]['client_name'], task.client.client_name)
+        self.assertEqual(rows[0]['weightage'], str(task.weightage))
+        self.assertEqual(rows[0]['created_at'], task.created_at.isoformat())
+
+    def test_csv_filters_and_validation(self):
+        subcontract = SubContracting.objects.order_by('pk').first()
+        SubContracting.objects.filter(pk=subcontract.pk).update(due_date=date(2030, 1, 1))
+        response = self.client.get(reverse('reportexport-csv'), {
+            'report': 'subcontracts', 'date_from': '2029-12-31',
+        })
+        rows = self.read_csv(b''.join(response.streaming_content))
+        self.assertEqual([row['subcontract_id'] for row in rows], [str(subcontract.pk)])
+
+        self.assertEqual(self.client.get(reverse('reportexport-csv'), {'report': 'nope'}).status_code, 400)
+        response = self.client.get(reverse('reportexport-csv'), {
+            'report': 'tasks', 'date_from': '2025-02-01', 'date_to': '2025-01-01',
+        })
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(REPORT_EXPORT_RUNNER='inline')
+    def test_background_job_produces_a_downloadable_file(self):
+        response = self.client.post(reverse('reportexport-list'), {
+            'report': 'subcontracts', 'format': 'csv', 'filters': {'date_to': '2025-12-31'},
+        }, format='json')
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+        self.assertEqual(job['status'], 'Done')
+        self.assertEqual(job['row_count'], SubContracting.objects.count())
+        self.assertEqual(job['filters'], {'date_to': '2025-12-31'})
+
+        download = self.client.get(job['download_url'])
+        self.assertEqual(download.status_code, 200)
+        rows = self.read_csv(b''.join(download.streaming_content))
+        self.assertEqual(len(rows), job['row_count'])
+        self.assertIn('assignee_email', rows[0])
+
+    @override_settings(REPORT_EXPORT_RUNNER='worker')
+    def test_worker_command_runs_pending_jobs(self):
+        response = self.client.post(reverse('reportexport-list'), {'report': 'tasks'}, format='json')
+        job_id = response.json()['id']
+        self.assertEqual(response.json()['status'], 'Pending')
+        self.assertIsNone(response.json()['download_url'])
+        self.assertEqual(self.client.get(reverse('reportexport-download', args=[job_id])).status_code, 409)
+
+        call_command('run_report_exports', stdout=io.StringIO())
+        job = self.client.get(reverse('reportexport-detail', args=[job_id])).json()
+        self.assertEqual(job['status'], 'Done')
+        self.assertEqual(job['row_count'], Task.objects.count())
+
+    @override_settings(REPORT_EXPORT_TIMEOUT=60, REPORT_EXPORT_MAX_ATTEMPTS=2)
+    def test_worker_command_recovers_jobs_left_running(self):
+        long_ago = timezone.now() - timedelta(minutes=5)
+        interrupted = ReportExport.objects.create(
+            report='tasks', status=ReportExport.RUNNING, heartbeat_at=long_ago, attempts=1
+        )
+        exhausted = ReportExport.objects.create(
+            report='tasks', status=ReportExport.RUNNING, heartbeat_at=long_ago, attempts=2
+        )
+        alive = ReportExport.objects.create(report='tasks', status=ReportExport.RUNNING, heartbeat_at=timezone.now())
+
+        call_command('run_report_exports', stdout=io.StringIO())
+        interrupted.refresh_from_db()
+        exhausted.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual((interrupted.status, interrupted.attempts), (ReportExport.DONE, 2))
+        self.assertEqual(exhausted.status, ReportExport.FAILED)
+        self.assertIn('Interrupted', exhausted.error)
+        self.assertEqual(alive.status, ReportExport.RUNNING)
+
+    @override_settings(EXPORT_CHUNK_SIZE=4)
+    def test_exports_send_a_heartbeat_per_chunk(self):
+        long_ago = timezone.now() - timedelta(minutes=5)
+        job = ReportExport.objects.create(report='tasks')
+        ReportExport.objects.filter(pk=job.pk).update(heartbeat_at=long_ago)
+        with CaptureQueriesContext(connection) as queries:
+            reports.run_export(job)
+        beats = [
+            query for query in queries
+            if query['sql'].lower().startswith('update "baseapp_reportexport" set "heartbeat_at"')
+        ]
+        self.assertEqual(len(beats), -(-Task.objects.count() // 4))
+        self.assertEqual(job.status, ReportExport.DONE)
+
+    def test_parquet_only_offered_with_pyarrow(self):
+        response = self.client.post(reverse('reportexport-list'), {
+            'report': 'tasks', 'format': 'parquet',
+        }, format='json')
+        if reports.pyarrow is None:
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('format', response.json())
+        else:
+            self.assertEqual(response.status_code, 202)
+
+    @skipUnless(reports.pyarrow is not None, "pyarrow is not installed")
+    @override_settings(REPORT_EXPORT_RUNNER='inline')
+    def test_parquet_rows_match_the_csv(self):
+        response = self.client.get(reverse('reportexport-csv'), {'report': 'tasks'})
+        csv_rows = self.read_csv(b''.join(response.streaming_content))
+        job = self.client.post(reverse('reportexport-list'), {
+            'report': 'tasks', 'format': 'parquet',
+        }, format='json').json()
+        download = self.client.get(job['download_url'])
+        table = reports.pyarrow.parquet.read_table(io.BytesIO(b''.join(download.streaming_content)))
+
+        self.assertEqual(table.column_names, list(csv_rows[0]))
+        rows = table.to_pylist()
+        self.assertEqual(len(rows), len(csv_rows))
+        self.assertEqual(str(rows[0]['task_id']), csv_rows[0]['task_id'])
+        self.assertEqual(str(rows[0]['weightage']), csv_rows[0]['weightage'])
+        self.assertEqual(rows[0]['created_at'].isoformat(), csv_rows[0]['created_at'])
+
+
+@skipUnless(renderers.msgpack is not None, "msgpack is not installed")
+class MessagePackTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=2)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def get_both(self, url, params=None):
+        as_json = self.client.get(url, params)
+        as_msgpack = self.client.get(url, params, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(as_msgpack['Content-Type'], 'application/msgpack')
+        return as_json.json(), renderers.msgpack.unpackb(as_msgpack.content, raw=False)
+
+    def test_responses_decode_to_the_json_output(self):
+        task = Task.objects.order_by('pk').first()
+        for url, params in (
+            (reverse('tasks-list'), {'page_size': 500}),
+            (reverse('subcontracts-list'), {'page_size': 500}),
+            (reverse('tasks-list'), {'expand': 'payment_ball,assignee'}),
+            (reverse('tasks-detail', args=[task.pk]), None),
+            (reverse('dashboard'), None),
+        ):
+            with self.subTest(url=url, params=params):
+                as_json, as_msgpack = self.get_both(url, params)
+                self.assertEqual(as_msgpack, as_json)
+
+    def test_unserialized_values_are_encoded_like_json(self):
+        data = {
+            'amount': Decimal('12.50'),
+            'day': date(2025, 1, 2),
+            'when': datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+        }
+        decoded = renderers.msgpack.unpackb(renderers.MessagePackRenderer().render(data), raw=False)
+        self.assertEqual(decoded, {'amount': 12.5, 'day': '2025-01-02', 'when': '2025-01-02T03:04:05.678901Z'})
+        self.assertEqual(decoded, json.loads(JSONRenderer().render(data)))
+
+    def test_msgpack_request_bodies(self):
+        task = Task.objects.order_by('pk').first()
+        payload = {
+            'payment_ball': task.payment_ball_id, 'task_brief': 'Packed', 'weightage': '12.50',
+            'due_date': '2025-03-01', 'assignee': task.assignee_id,
+        }
+        response = self.client.post(
+            reverse('tasks-list'), renderers.msgpack.packb(payload),
+            content_type='application/msgpack', HTTP_ACCEPT='application/msgpack',
+        )
+        self.assertEqual(response.status_code, 201)
+        created = renderers.msgpack.unpackb(response.content, raw=False)
+        self.assertEqual((created['weightage'], created['due_date']), ('12.50', '2025-03-01'))
+        fetched = self.client.get(reverse('tasks-detail', args=[created['task_id']])).json()
+        # Saving the task refreshes roll-ups, which touches updated_at again.
+        created.pop('updated_at')
+        fetched.pop('updated_at')
+        self.assertEqual(created, fetched)
+
+        response = self.client.post(
+            reverse('tasks-list'), b'\xc1', content_type='application/msgpack',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class MessagePackUnavailableTests(TestCase):
+
+    @skipUnless(renderers.msgpack is None, "msgpack is installed")
+    def test_not_negotiated_without_msgpack(self):
+        response = APIClient().get(reverse('tasks-list'), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 406)
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=3)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_detail_revalidation(self):
+        job_card = JobCard.objects.order_by('pk').first()
+        url = reverse('jobcards-detail', args=[job_card.pk])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        cache.clear()  # revalidate against the database, not a cached response
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        job_card.status = 'Completed'
+        job_card.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['status'], 'Completed')
+
+    def test_list_revalidation(self):
+        url = reverse('tasks-list')
+        etag = self.client.get(url, {'page_size': 5})['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'page_size': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('task_brief', queries[0]['sql'])
+
+        # Another representation of the same rows has its own tag.
+        self.assertNotEqual(self.client.get(url, {'page_size': 5, 'fields': 'task_id,updated_at'})['ETag'], etag)
+        self.assertNotEqual(self.client.get(url, {'page_size': 6})['ETag'], etag)
+
+        first = Task.objects.order_by('-created_at', '-pk').first()
+        first.task_brief = 'Changed'
+        first.save()
+        response = self.client.get(url, {'page_size': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        Task.objects.filter(pk=first.pk).delete()
+        self.assertEqual(self.client.get(url, {'page_size': 5}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def assertChanged(self, url, params, etag):
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], self.client.get(url, params)['ETag'])
+        return response
+
+    def test_embedded_related_rows_are_revalidated(self):
+        rfq = RFQ.objects.order_by('pk').first()
+        detail, listing = reverse('rfqs-detail', args=[rfq.pk]), reverse('rfqs-list')
+        etags = [self.client.get(detail)['ETag'], self.client.get(listing, {'client': rfq.client_id})['ETag']]
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(detail, HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(response.status_code, 304)
+
+        # client_name comes from the client row; the RFQ row is untouched.
+        rfq.client.client_name = 'Renamed'
+        rfq.client.save()
+        self.assertEqual(self.assertChanged(detail, {}, etags[0]).json()['client_name'], 'Renamed')
+        self.assertChanged(listing, {'client': rfq.client_id}, etags[1])
+
+        job_card = JobCard.objects.filter(rfq=rfq).first()
+        url = reverse('jobcards-detail', args=[job_card.pk])
+        etag = self.client.get(url, {'expand': 'rfq'})['ETag']
+        rfq.status = 'Closed'
+        rfq.save()
+        self.assertChanged(url, {'expand': 'rfq'}, etag)
+
+    def test_clients_have_a_modification_timestamp(self):
+        client = Client.objects.order_by('pk').first()
+        before = client.updated_at
+        client.client_name = 'Renamed'
+        client.save()
+        self.assertGreater(client.updated_at, before)
+        response = self.client.get(reverse('client-list'))
+        self.assertIn('updated_at', response.json()['results'][0])
+        self.assertTrue(response.has_header('ETag'))
+
+
+class ResponseCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=3)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_repeat_reads_skip_the_database(self):
+        for url in (reverse('client-list'), reverse('rfqs-list'),
+                    reverse('jobcards-detail', args=[JobCard.objects.values_list('pk', flat=True).first()])):
+            with self.subTest(url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(second['ETag'], first['ETag'])
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_writes_invalidate_dependent_responses(self):
+        rfq = RFQ.objects.select_related('client').order_by('pk').first()
+        url = reverse('rfqs-detail', args=[rfq.pk])
+        self.client.get(url)
+
+        rfq.client.client_name = 'Renamed client'
+        rfq.client.save()
+        self.assertEqual(self.client.get(url).json()['client_name'], 'Renamed client')
+
+        # Rollup UPDATEs bypass signals but still invalidate the job card.
+        subcontract = SubContracting.objects.select_related('task__payment_ball').order_by('pk').first()
+        url = reverse('jobcards-detail', args=[subcontract.task.payment_ball.job_card_id])
+        before = self.client.get(url).json()['weighted_completion']
+        subcontract.completion_percentage = 0 if subcontract.completion_percentage else 100
+        subcontract.save()
+        self.assertNotEqual(self.client.get(url).json()['weighted_completion'], before)
+
+    def test_writes_under_another_parent_keep_scoped_lists(self):
+        ball = PaymentBall.objects.order_by('pk').first()
+        other = PaymentBall.objects.exclude(job_card=ball.job_card_id).order_by('pk').first()
+        url = reverse('paymentballs-list')
+        self.client.get(url, {'job_card': ball.job_card_id})
+        self.client.get(url, {'job_card': other.job_card_id})
+
+        other.project_status = 'Completed'
+        other.save()
+        with self.assertNumQueries(0):
+            self.client.get(url, {'job_card': ball.job_card_id})
+        rows = self.client.get(url, {'job_card': other.job_card_id}).json()['results']
+        self.assertEqual(
+            next(row for row in rows if row['payment_id'] == other.pk)['project_status'], 'Completed'
+        )
+
+    def test_responses_are_cached_per_user(self):
+        url = reverse('client-list')
+        self.client.get(url)
+        self.client.force_authenticate(User.objects.create_user('reader'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertGreater(len(queries), 0)
+
+
+class BulkWriteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=1, rfqs_per_client=1, payment_balls_per_job_card=2,
+                       tasks_per_payment_ball=2, subcontracts_per_task=0)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.ball, self.other_ball = PaymentBall.objects.order_by('pk')
+        self.url = reverse('tasks-bulk')
+
+    def task_items(self, count, **fields):
+        assignee = Task.objects.values_list('assignee', flat=True).first()
+        return [
+            {'payment_ball': self.ball.pk, 'task_brief': f'Bulk {i}', 'weightage': '10',
+             'due_date': '2025-01-01', 'assignee': assignee, 'completion_percentage': '50', **fields}
+            for i in range(count)
+        ]
+
+    def assertConsistent(self):
+        self.assertEqual(set(rollups.rebuild(dry_run=True).values()), {0})
+        self.assertEqual(set(ancestry.backfill(dry_run=True).values()), {0})
+
+    def test_create_costs_the_same_queries_for_any_batch_size(self):
+        counts = []
+        for size in (5, 50):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, self.task_items(size), format='json')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.json()), size)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(Task.objects.filter(task_brief__startswith='Bulk').count(), 55)
+        self.assertConsistent()
+
+        task_ids = Task.objects.filter(task_brief__startswith='Bulk').values_list('pk', flat=True)[:3]
+        response = self.client.post(reverse('subcontracts-bulk'), [
+            {'task': task_id, 'subcontract_brief': 'Sub', 'weightage': '50',
+             'due_date': '2025-01-01', 'completion_percentage': '100'}
+            for task_id in task_ids
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertConsistent()
+
+    def test_errors_point_to_the_failing_items(self):
+        items = self.task_items(3)
+        items[1]['payment_ball'] = 999999
+        items[2]['weightage'] = '150'
+        before = Task.objects.count()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.status_code, 400)
+        # One IN query for the payment balls, one for the assignees.
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('SELECT')]), 2)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1, 2])
+        self.assertIn('payment_ball', response.json()['errors'][0]['errors'])
+        self.assertEqual(Task.objects.count(), before)
+
+        response = self.client.patch(self.url, [{'task_id': 999999}, {'task_brief': 'No key'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()['errors'],
+            [{'index': 0, 'errors': {'task_id': ['Not found.']}},
+             {'index': 1, 'errors': {'task_id': ['This field is required.']}}],
+        )
+
+    def test_update_and_delete(self):
+        moved, changed = self.ball.tasks.order_by('pk')
+        before = moved.updated_at
+        response = self.client.patch(self.url, [
+            {'task_id': moved.pk, 'payment_ball': self.other_ball.pk},
+            {'task_id': changed.pk, 'completion_percentage': '100'},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        moved.refresh_from_db()
+        self.assertEqual(moved.payment_ball_id, self.other_ball.pk)
+        self.assertGreater(moved.updated_at, before)
+        self.ball.refresh_from_db()
+        self.assertEqual(self.ball.weighted_completion, Decimal('100.00'))
+        self.assertConsistent()
+
+        response = self.client.delete(self.url, [moved.pk, changed.pk], format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Task.objects.filter(pk__in=[moved.pk, changed.pk]).exists())
+        self.assertConsistent()
+
+
+class JobCardBatchCreateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=1, rfqs_per_client=2, payment_balls_per_job_card=0)
+        cls.rfqs = list(RFQ.objects.order_by('pk'))
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.url = reverse('jobcards-list')
+
+    def job_cards(self, count, prefix):
+        return [
+            {'rfq': self.rfqs[i % 2].pk, 'job_number': f'{prefix}-{i}', 'scope_of_work': 'Fit-out',
+             'delivery_timelines': '2025-03-31',
+             'payment_terms': {'1': {'milestone': 'Advance', 'percentage': '33.33'},
+                               '2': {'milestone': 'Handover', 'percentage': '66.67'}}}
+            for i in range(count)
+        ]
+
+    def test_batch_is_one_insert_per_table(self):
+        counts = []
+        for size, prefix in ((3, 'SMALL'), (30, 'LARGE')):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, self.job_cards(size, prefix), format='json')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.json()), size)
+            counts.append(len(queries))
+            self.assertEqual(len([query for query in queries if query['sql'].startswith('INSERT')]), 2)
+            self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+        self.assertEqual(counts[0], counts[1])
+
+        job_card = JobCard.objects.get(job_number='LARGE-0')
+        self.assertEqual(job_card.get_payment_terms()['2']['milestone'], 'Handover')
+        balls = list(job_card.payment_balls.order_by('pk').values_list('notes', 'project_percentage', 'amount'))
+        # seed_hierarchy quotes 10000.00 per RFQ
+        self.assertEqual(balls, [('Advance', Decimal('33.33'), Decimal('3333.00')),
+                                 ('Handover', Decimal('66.67'), Decimal('6667.00'))])
+
+    def test_errors_are_reported_per_item(self):
+        existing = JobCard.objects.values_list('job_number', flat=True).first()
+        items = self.job_cards(4, 'NEW')
+        items[1]['job_number'] = existing
+        items[2]['job_number'] = 'NEW-0'
+        items[3]['rfq'] = 999999
+        before = (JobCard.objects.count(), PaymentBall.objects.count())
+
+        response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertIn('job_number', errors[1])
+        self.assertIn('job_number', errors[2])
+        self.assertIn('rfq', errors[3])
+        self.assertEqual((JobCard.objects.count(), PaymentBall.objects.count()), before)
+
+    def test_single_create_writes_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, self.job_cards(1, 'ONE')[0], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith(('INSERT', 'UPDATE'))]), 1)
+        self.assertEqual(response.json()['payment_terms_display']['1']['milestone'], 'Advance')
+
+    def test_blank_job_numbers_are_allocated(self):
+        items = self.job_cards(3, 'NUMBERED')
+        items[0]['job_number'] = items[2]['job_number'] = ''
+        response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.status_code, 201)
+        numbers = [item['job_number'] for item in response.json()]
+        self.assertEqual(numbers[1], 'NUMBERED-1')
+        self.assertRegex(numbers[0], r'^JOB-\d{4}-\d{5}$')
+        self.assertEqual(len(set(numbers)), 3)
+
+
+class InvoiceNumberTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=1, rfqs_per_client=2, payment_balls_per_job_card=3, tasks_per_payment_ball=0)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        sequences._blocks.clear()
+        self.addCleanup(sequences._blocks.clear)
+
+    def test_batch_invoices_purple_payment_balls_once(self):
+        balls = list(PaymentBall.objects.order_by('pk'))
+        PaymentBall.objects.filter(pk__in=[ball.pk for ball in balls[:4]]).update(color_status='purple')
+        PaymentBall.objects.filter(pk=balls[0].pk).update(invoice_number='INV-OLD')
+        url = reverse('paymentballs-invoice')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        invoiced = response.json()['invoiced']
+        self.assertEqual([item['payment_id'] for item in invoiced], [ball.pk for ball in balls[1:4]])
+        self.assertEqual(len({item['invoice_number'] for item in invoiced}), 3)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 2)
+        self.assertEqual(PaymentBall.objects.get(pk=balls[0].pk).invoice_number, 'INV-OLD')
+        self.assertFalse(PaymentBall.objects.filter(pk__in=[ball.pk for ball in balls[4:]], invoice_number__isnull=False))
+
+        self.assertEqual(self.client.post(url).json(), {'invoiced': []})
+
+    def test_numbers_are_allocated_on_save(self):
+        rfq = RFQ.objects.create(
+            client=Client.objects.get(), project_type='Fit-out', scope_of_work='Scope', quotation_amount=Decimal('100'),
+        )
+        job_card = JobCard.objects.create(rfq=rfq, scope_of_work='Scope', delivery_timelines=date(2025, 3, 31))
+        self.assertRegex(rfq.quotation_number, r'^QTN-\d{4}-00001$')
+        self.assertRegex(job_card.job_number, r'^JOB-\d{4}-00001$')
+
+        ball = job_card.payment_balls.create(project_percentage=100, amount=100, color_status='purple')
+        ball.generate_invoice()
+        first = ball.invoice_number
+        ball.generate_invoice()
+        self.assertEqual(PaymentBall.objects.get(pk=ball.pk).invoice_number, first)
+
+
+class TransitionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=1, rfqs_per_client=2, payment_balls_per_job_card=3, tasks_per_payment_ball=1)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        sequences._blocks.clear()
+        self.addCleanup(sequences._blocks.clear)
+
+    def test_payment_balls_move_in_one_update_and_are_invoiced_in_bulk(self):
+        balls = list(PaymentBall.objects.order_by('pk'))
+        PaymentBall.objects.filter(pk__in=[ball.pk for ball in balls[:4]]).update(color_status='blue')
+        PaymentBall.objects.filter(pk=balls[3].pk).update(color_status='purple', invoice_number='INV-KEPT')
+        listing = self.client.get(reverse('paymentballs-list'), {'job_card': balls[0].job_card_id}).json()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('paymentballs-transition'), {
+                'ids': [ball.pk for ball in balls[:4]], 'to': 'purple',
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 4)
+        # The color change, the sequence reservation and the invoice numbers.
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 3)
+
+        rows = dict(PaymentBall.objects.filter(pk__in=[ball.pk for ball in balls[:4]]).values_list('pk', 'invoice_number'))
+        self.assertEqual(rows[balls[3].pk], 'INV-KEPT')
+        self.assertEqual(len({rows[ball.pk] for ball in balls[:3]}), 3)
+        self.assertTrue(all(rows[ball.pk].startswith('INV-') for ball in balls[:3]))
+        self.assertNotEqual(
+            self.client.get(reverse('paymentballs-list'), {'job_card': balls[0].job_card_id}).json(), listing
+        )
+
+    def test_invalid_moves_reject_the_whole_batch(self):
+        job_cards = list(JobCard.objects.order_by('pk'))
+        JobCard.objects.filter(pk=job_cards[1].pk).update(color_status='blue')
+        response = self.client.post(reverse('jobcards-transition'), {
+            'ids': [job_cards[0].pk, job_cards[1].pk, 999999, job_cards[0].pk], 'to': 'blue',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [2, 3])
+
+        response = self.client.post(reverse('jobcards-transition'), {
+            'ids': [job_cards[0].pk, job_cards[1].pk], 'to': 'purple',
+        }, format='json')
+        self.assertEqual(response.json(), {'errors': [
+            {'index': 0, 'errors': {'color_status': ['Can not move from gray to purple.']}},
+        ]})
+        self.assertEqual(JobCard.objects.get(pk=job_cards[1].pk).color_status, 'blue')
+
+        response = self.client.post(reverse('jobcards-transition'), {'ids': [job_cards[0].pk], 'to': 'red'}, format='json')
+        self.assertIn('to', response.json())
+
+    def test_task_status(self):
+        tasks = list(Task.objects.order_by('pk')[:2])
+        response = self.client.post(reverse('tasks-transition'), {
+            'ids': [task.pk for task in tasks], 'to': 'InProgress',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(Task.objects.filter(pk__in=[task.pk for task in tasks]).values_list('status', flat=True)),
+                         {'InProgress'})
+        response = self.client.post(reverse('tasks-transition'), {'ids': [tasks[0].pk], 'to': 'Pending'}, format='json')
+        self.assertEqual(response.status_code, 400)
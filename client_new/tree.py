@@ -0,0 +1,127 @@
+"""
+Streamed Client -> RFQ -> JobCard -> PaymentBall -> Task -> SubContracting
+trees.
+
+The root's direct children are read with `.iterator(chunk_size=...)` and
+every level below them is prefetched per chunk, so a tree costs one query
+per level per chunk and only one chunk of subtrees is held in memory while
+the JSON is written out. Each level is limited to a compact set of columns:
+large text fields such as scope_of_work are never loaded, and the task and
+subcontract briefs (ON_REQUEST) only when named in `?fields=`. `?fields=`
+otherwise narrows the set further and `?depth=` cuts the tree off below a
+level.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import Client, RFQ, JobCard, PaymentBall, Task, SubContracting
+
+
+# (children attribute on the parent, model, parent fk, compact fields)
+LEVELS = [
+    ('rfqs', RFQ, 'client_id', (
+        'rfq_id', 'project_type', 'quotation_number', 'quotation_amount',
+        'status', 'rfq_date',
+    )),
+    ('job_cards', JobCard, 'rfq_id', (
+        'job_id', 'job_number', 'delivery_timelines', 'status', 'color_status',
+        'weighted_completion', 'created_at',
+    )),
+    ('payment_balls', PaymentBall, 'job_card_id', (
+        'payment_id', 'project_percentage', 'project_status', 'color_status',
+        'invoice_number', 'amount', 'weighted_completion',
+    )),
+    ('tasks', Task, 'payment_ball_id', (
+        'task_id', 'task_brief', 'weightage', 'status', 'due_date', 'assignee_id',
+        'completion_percentage', 'weighted_completion',
+    )),
+    ('subcontracts', SubContracting, 'task_id', (
+        'subcontract_id', 'subcontract_brief', 'weightage', 'status', 'due_date',
+        'assignee_id', 'completion_percentage',
+    )),
+]
+
+# Text fields left out of LEVELS' compact sets unless `?fields=` names them.
+ON_REQUEST = {'task_brief', 'subcontract_brief'}
+
+ROOT_FIELDS = {
+    Client: ('client_id', 'client_name', 'company_name', 'service', 'status', 'created_at'),
+    JobCard: LEVELS[1][3],
+}
+
+
+def _encode(value):
+    # Same representations the regular serializers produce.
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        value = timezone.localtime(value) if timezone.is_aware(value) else value
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class TreeStreamer:
+    """
+    Streams one root object and `depth` levels of descendants as JSON.
+    `root` is a Client or JobCard instance.
+    """
+
+    def __init__(self, root, depth=None, fields=None):
+        start = 0 if isinstance(root, Client) else 2
+        max_depth = getattr(settings, 'TREE_MAX_DEPTH', len(LEVELS))
+        depth = max_depth if depth is None else min(depth, max_depth)
+        self.root = root
+        self.levels = LEVELS[start:start + depth]
+        self.root_fields = self._limit(ROOT_FIELDS[type(root)], fields)
+        self.fields = [self._limit(level[3], fields) for level in self.levels]
+        self.chunk_size = getattr(settings, 'TREE_CHUNK_SIZE', 100)
+
+    @staticmethod
+    def _limit(allowed, requested):
+        # The primary key is always kept so clients can address each node.
+        if not requested:
+            return tuple(name for name in allowed if name not in ON_REQUEST)
+        return tuple(name for name in allowed if name == allowed[0] or name in requested)
+
+    def _queryset(self, index):
+        name, model, parent_fk, _ = self.levels[index]
+        return model.objects.only(*self.fields[index], parent_fk).order_by('pk')
+
+    def _prefetches(self):
+        lookups, path = [], ''
+        for index in range(1, len(self.levels)):
+            path = f'{path}__{self.levels[index][0]}' if path else self.levels[index][0]
+            lookups.append(Prefetch(path, queryset=self._queryset(index)))
+        return lookups
+
+    def _node(self, obj, index):
+        node = {name: getattr(obj, name) for name in self.fields[index]}
+        if index + 1 < len(self.levels):
+            children = getattr(obj, self.levels[index + 1][0]).all()
+            node[self.levels[index + 1][0]] = [self._node(child, index + 1) for child in children]
+        return node
+
+    def __iter__(self):
+        head = {name: getattr(self.root, name) for name in self.root_fields}
+        if not self.levels:
+            yield json.dumps(head, default=_encode)
+            return
+
+        children_name, _, parent_fk, _ = self.levels[0]
+        yield json.dumps(head, default=_encode)[:-1] + f', "{children_name}": ['
+        children = self._queryset(0).filter(**{parent_fk: self.root.pk}).prefetch_related(
+            *self._prefetches()
+        )
+        separator = ''
+        for child in children.iterator(chunk_size=self.chunk_size):
+            yield separator + json.dumps(self._node(child, 0), default=_encode)
+            separator = ', '
+        yield ']}'
@@ -4,7 +4,8 @@ from .views import (
     ClientViewSet,
     PaymentBallViewSet, GlobalRFQViewSet, 
     GlobalJobCardViewSet,  
-    GlobalTaskViewSet, GlobalSubContractingViewSet
+    GlobalTaskViewSet, GlobalSubContractingViewSet,
+    DashboardView,
 )
 
 # Global router for independent access
@@ -42,6 +43,7 @@ global_router.register(r'subcontracts', GlobalSubContractingViewSet, basename='s
 
 # URL patterns
 urlpatterns = [
+    path('client_new/dashboard/', DashboardView.as_view(), name='dashboard'),
     path('client_new/', include(global_router.urls)),  # Independent global access
     # path('client_new/', include(router.urls)),
     # path('client_new/', include(clients_router.urls)),
@@ -1,35 +1,69 @@
 
 from rest_framework import viewsets
-from .models import Client, RFQ, JobCard, PaymentBall, Task, SubContracting
-from .serializers import ClientSerializer, RFQSerializer, JobCardSerializer, PaymentBallSerializer, TaskSerializer, SubContractingSerializer
+from rest_framework.views import APIView
+from .models import Client, RFQ, JobCard, PaymentBall, Task, SubContracting, COLOR_TRANSITIONS, TASK_STATUS_TRANSITIONS
+from .serializers import ClientSerializer, RFQSerializer, JobCardSerializer, PaymentBallSerializer, TaskSerializer, SubContractingSerializer, DashboardQuerySerializer, TreeQuerySerializer
+from . import ancestry, dashboard, rollups
+from .dashboard import get_dashboard
+from .tree import TreeStreamer
+from .readers import job_card_reader, payment_ball_reader, task_reader, subcontracting_reader
+from BaseApp.bulk import BulkWriteMixin
+from BaseApp.readers import ValuesListMixin
+from BaseApp.mixins import SparseFieldsetViewMixin
+from BaseApp.exports import NDJSONExportMixin
+from BaseApp.conditional import ConditionalGetMixin
+from BaseApp import response_cache
+from BaseApp.response_cache import CachedResponseMixin
+from BaseApp.transitions import TransitionMixin
+from django.http import StreamingHttpResponse
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.exceptions import NotFound
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 from django_filters.rest_framework import DjangoFilterBackend  # Add this import
-from .filters import RFQFilter, JobCardFilter  # Import the filter
+from .filters import RFQFilter, JobCardFilter, TaskFilter, SubContractingFilter  # Import the filter
 
 
-class ClientViewSet(viewsets.ModelViewSet):
+def stream_tree(request, root):
+    params = TreeQuerySerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    return StreamingHttpResponse(
+        TreeStreamer(root, **params.validated_data), content_type='application/json'
+    )
+
+
+class ClientViewSet(CachedResponseMixin, ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Client.objects.order_by('-created_at').all()
     serializer_class = ClientSerializer
 
-class RFQViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def tree(self, request, pk=None):
+        """
+        Stream the client's RFQ -> JobCard -> PaymentBall -> Task ->
+        SubContracting hierarchy. Optional `depth` and `fields` parameters
+        limit how much of it is returned; task and subcontract briefs are
+        only included when named in `fields`.
+        """
+        return stream_tree(request, self.get_object())
+
+class RFQViewSet(ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = RFQ.objects.order_by('-rfq_date').all()
     serializer_class = RFQSerializer
+    cache_depends_on = [Client]  # client_name
 
     filter_backends = [DjangoFilterBackend]
     filterset_class = RFQFilter
 
     def get_queryset(self):
         client_id = self.kwargs['client_pk']
-        return RFQ.objects.filter(client__client_id=client_id)
+        return RFQ.objects.select_related('client').filter(client__client_id=client_id).order_by('-rfq_date')
     
     
-class GlobalRFQViewSet(viewsets.ModelViewSet):
-    queryset = RFQ.objects.all()
+class GlobalRFQViewSet(CachedResponseMixin, ConditionalGetMixin, NDJSONExportMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    queryset = RFQ.objects.select_related('client').order_by('-rfq_date')
     serializer_class = RFQSerializer
+    cache_depends_on = [Client]  # client_name
 
     filter_backends = [DjangoFilterBackend]
     filterset_class = RFQFilter
@@ -39,9 +73,13 @@ from rest_framework import viewsets
 from .models import JobCard, PaymentBall
 from .serializers import JobCardSerializer, PaymentBallSerializer
 
-class GlobalJobCardViewSet(viewsets.ModelViewSet):
-    queryset = JobCard.objects.order_by('-created_at').all().prefetch_related('payment_balls') 
+class GlobalJobCardViewSet(TransitionMixin, CachedResponseMixin, ConditionalGetMixin, NDJSONExportMixin, ValuesListMixin, viewsets.ModelViewSet):
+    queryset = JobCard.objects.order_by('-created_at').all()
     serializer_class = JobCardSerializer
+    values_reader = job_card_reader
+    transition_field = 'color_status'
+    transitions = COLOR_TRANSITIONS
+    transition_parents = ['rfq_id']
 
     def get_serializer(self, *args, **kwargs):
         """
@@ -53,12 +91,25 @@ class GlobalJobCardViewSet(viewsets.ModelViewSet):
     
     filter_backends = [DjangoFilterBackend]
     filterset_class = JobCardFilter
+
+    @action(detail=True, methods=['get'])
+    def tree(self, request, pk=None):
+        """Stream the job card's PaymentBall -> Task -> SubContracting hierarchy."""
+        return stream_tree(request, self.get_object())
+
+    def perform_transition(self, previous, target):
+        dashboard.invalidate()
     
     
 
-class PaymentBallViewSet(viewsets.ModelViewSet):
+class PaymentBallViewSet(TransitionMixin, CachedResponseMixin, ConditionalGetMixin, NDJSONExportMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = PaymentBall.objects.all().select_related('job_card')
     serializer_class = PaymentBallSerializer
+    values_reader = payment_ball_reader
+    cache_parent_filters = {'job_card': 'job_card_id'}
+    transition_field = 'color_status'
+    transitions = COLOR_TRANSITIONS
+    transition_parents = ['job_card_id']
 
     def get_queryset(self):
         queryset = PaymentBall.objects.all().select_related('job_card')
@@ -80,23 +131,45 @@ class PaymentBallViewSet(viewsets.ModelViewSet):
             )
         
         payment_balls = self.get_queryset().filter(job_card_id=job_card_id)
-        serializer = self.get_serializer(payment_balls, many=True)
-        return Response(serializer.data)
-
+        return self.values_list_response(payment_balls, paginate=False)
 
-
-class TaskViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def invoice(self, request):
+        """
+        Invoice every purple payment ball that has no invoice number yet (of
+        one job card with `?job_card=`), in a single transaction: the
+        numbers come from one allocation and are written with one UPDATE.
+        """
+        payment_balls = PaymentBall.issue_invoices(self.get_queryset())
+        # bulk_update sends no signals.
+        response_cache.invalidate(
+            PaymentBall, [payment_ball.pk for payment_ball in payment_balls],
+            {'job_card_id': {payment_ball.job_card_id for payment_ball in payment_balls}},
+        )
+        return Response({'invoiced': [
+            {'payment_id': payment_ball.pk, 'job_card': payment_ball.job_card_id,
+             'invoice_number': payment_ball.invoice_number}
+            for payment_ball in payment_balls
+        ]})
+
+    def perform_transition(self, previous, target):
+        if target == 'purple':
+            PaymentBall.issue_invoices(PaymentBall.objects.filter(pk__in=previous))
+        dashboard.invalidate()
+
+
+class TaskViewSet(ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Task.objects.select_related('payment_ball', 'assignee').all()
     serializer_class = TaskSerializer
+    values_reader = task_reader
+    cache_depends_on = [PaymentBall]  # payment_ball_details
 
     def get_queryset(self):
-        queryset = Task.objects.all().select_related('payment_ball')
+        queryset = Task.objects.all().select_related('payment_ball', 'assignee')
         payment_ball = self.request.query_params.get('payment_ball', None)
-        # print(job_card_id)
         
         if payment_ball:
             queryset = queryset.filter(payment_ball=payment_ball)
-            print(queryset)
         return queryset
     
     @action(detail=False, methods=['get'])
@@ -108,14 +181,15 @@ class TaskViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        payment_balls = self.get_queryset().filter(payment_ball=payment_ball)
-        serializer = self.get_serializer(payment_balls, many=True)
-        return Response(serializer.data)
+        tasks = self.get_queryset().filter(payment_ball=payment_ball)
+        return self.values_list_response(tasks, paginate=False)
 
 
-class SubContractingViewSet(viewsets.ModelViewSet):
+class SubContractingViewSet(ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = SubContracting.objects.select_related('task', 'assignee').all()
     serializer_class = SubContractingSerializer
+    values_reader = subcontracting_reader
+    cache_depends_on = [Task]  # task_details
 
     def get_queryset(self):
         task_id = self.kwargs.get('task_pk')
@@ -123,20 +197,24 @@ class SubContractingViewSet(viewsets.ModelViewSet):
             return self.queryset.filter(task_id=task_id)
         return self.queryset
 
-class GlobalTaskViewSet(viewsets.ModelViewSet):
+class GlobalTaskViewSet(BulkWriteMixin, TransitionMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Task.objects.select_related('payment_ball', 'assignee').all()
     serializer_class = TaskSerializer
-    print(queryset)
-    print(serializer_class)
+    values_reader = task_reader
+    cache_depends_on = [PaymentBall]  # payment_ball_details
+    bulk_related_select = {'payment_ball': ['job_card__rfq']}
+    transition_field = 'status'
+    transitions = TASK_STATUS_TRANSITIONS
+
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = TaskFilter
 
     def get_queryset(self):
-        queryset = Task.objects.all().select_related('payment_ball')
+        queryset = Task.objects.all().select_related('payment_ball', 'assignee')
         payment_ball = self.request.query_params.get('payment_ball', None)
-        # print(job_card_id)
         
         if payment_ball:
             queryset = queryset.filter(payment_ball=payment_ball)
-            print(queryset)
         return queryset
     
     @action(detail=False, methods=['get'])
@@ -148,14 +226,47 @@ class GlobalTaskViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        payment_balls = self.get_queryset().filter(payment_ball=payment_ball)
-        serializer = self.get_serializer(payment_balls, many=True)
-        return Response(serializer.data)
-
-
-class GlobalSubContractingViewSet(viewsets.ModelViewSet):
+        tasks = self.get_queryset().filter(payment_ball=payment_ball)
+        return self.values_list_response(tasks, paginate=False)
+
+    # Bulk writes skip Task.save() and the signals: set the ancestry keys and
+    # refresh the rollups here, once per request.
+    def perform_bulk_create(self, tasks):
+        ancestry.set_task_keys(tasks)
+        super().perform_bulk_create(tasks)
+        rollups.refresh_tasks(task.pk for task in tasks)
+        dashboard.invalidate()
+
+    def perform_bulk_update(self, tasks, fields):
+        moved = [task for task in tasks if task.payment_ball_id != task._previous_payment_ball_id]
+        if moved:
+            ancestry.set_task_keys(moved)
+            fields = {*fields, 'job_card', 'rfq', 'client'}
+        super().perform_bulk_update(tasks, fields)
+        with rollups.batched():
+            if moved:
+                ancestry.tasks_moved([task.pk for task in moved])
+                rollups.refresh_payment_balls(task._previous_payment_ball_id for task in moved)
+            rollups.refresh_tasks(task.pk for task in tasks)
+        dashboard.invalidate()
+
+    def perform_bulk_destroy(self, queryset):
+        with rollups.batched():
+            super().perform_bulk_destroy(queryset)
+
+    def perform_transition(self, previous, target):
+        # Status is not part of the rollups; only the dashboard counts it.
+        dashboard.invalidate()
+
+
+class GlobalSubContractingViewSet(BulkWriteMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = SubContracting.objects.select_related('task', 'assignee').all()
     serializer_class = SubContractingSerializer
+    values_reader = subcontracting_reader
+    cache_depends_on = [Task]  # task_details
+
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = SubContractingFilter
 
     def get_queryset(self):
         task_id = self.kwargs.get('task_pk')
@@ -163,6 +274,40 @@ class GlobalSubContractingViewSet(viewsets.ModelViewSet):
             return self.queryset.filter(task_id=task_id)
         return self.queryset   
 
+    def perform_bulk_create(self, subcontracts):
+        ancestry.set_subcontract_keys(subcontracts)
+        super().perform_bulk_create(subcontracts)
+        rollups.refresh_tasks(subcontract.task_id for subcontract in subcontracts)
+
+    def perform_bulk_update(self, subcontracts, fields):
+        moved = [subcontract for subcontract in subcontracts
+                 if subcontract.task_id != subcontract._previous_task_id]
+        if moved:
+            ancestry.set_subcontract_keys(moved)
+            fields = {*fields, 'job_card', 'rfq', 'client'}
+        super().perform_bulk_update(subcontracts, fields)
+        rollups.refresh_tasks(
+            {subcontract.task_id for subcontract in subcontracts}
+            | {subcontract._previous_task_id for subcontract in moved}
+        )
+
+    def perform_bulk_destroy(self, queryset):
+        with rollups.batched():
+            super().perform_bulk_destroy(queryset)
+
+
+class DashboardView(APIView):
+    """
+    Counts and money totals per status and color for RFQs, job cards,
+    payment balls and tasks. Accepts optional `client`, `date_from` and
+    `date_to` (YYYY-MM-DD) query parameters.
+    """
+
+    def get(self, request):
+        params = DashboardQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(get_dashboard(**params.validated_data))
+
 
 
 
@@ -0,0 +1,246 @@
+"""
+CSV timesheet ingestion.
+
+The file needs a header row. Columns, in any order (others are ignored):
+
+- date_logged: YYYY-MM-DD (required)
+- hours_logged (required)
+- hourly_rate: may be left blank when team_member_email is given, to use
+  the member's hourly rate on date_logged (see BaseApp.payroll)
+- remarks
+- job_number: an existing job card
+- team_member_email: an existing employee
+
+Rows are read one at a time off the file and handled in chunks of
+`TIMESHEET_IMPORT_CHUNK_SIZE`: the chunk's job numbers, emails and the
+members' salary changes are looked up with one IN query each, rows are
+checked against the Timesheet fields, and the valid ones are inserted
+with one bulk_create. bulk_create skips Timesheet.save(), so total_amount
+is computed here the way save() computes it. Invalid rows do not stop
+the import: they are written to a reject report, with their line number
+and the reason, to be fixed and uploaded again.
+
+Each chunk is committed on its own, so a long import holds the database's
+write lock for one chunk at a time, and an error part way through the
+file (such as an undecodable byte) keeps the chunks before it. The
+`progress` callback sees the running counts inside each chunk's
+transaction; `TimesheetImport` jobs record them on their row, so a failed
+job says how far it got.
+
+Uploads run as `TimesheetImport` jobs, run by `import_timesheets
+--pending`, which also deals with jobs a dead worker left Running
+(BaseApp.jobs). Those are started again only if none of their chunks were
+committed, and failed otherwise. The `import_timesheets` command also
+imports a file from disk.
+"""
+import csv
+import io
+import itertools
+import logging
+import tempfile
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from BaseApp import jobs, payroll
+from BaseApp.models import Employee
+from client_new.models import JobCard
+
+from .models import Timesheet, TimesheetImport
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ['date_logged', 'hours_logged']
+FIELDS = {name: Timesheet._meta.get_field(name) for name in ['hours_logged', 'hourly_rate', 'total_amount']}
+TOTAL_PLACES = Decimal(1).scaleb(-FIELDS['total_amount'].decimal_places)
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = self.imported = self.rejected = 0
+
+
+def _decimal(name, value):
+    field = FIELDS[name]
+    try:
+        value = field.to_python(value.strip())
+        field.run_validators(value)
+    except ValidationError as exc:
+        raise ValueError(f"{name}: {' '.join(exc.messages)}")
+    return value
+
+
+def build_timesheet(row, jobs, members, schedules=None):
+    """A Timesheet for one CSV row; ValueError naming what is wrong with it."""
+    errors = []
+    date_logged = hours_logged = hourly_rate = None
+
+    try:
+        date_logged = parse_date((row.get('date_logged') or '').strip())
+    except ValueError:
+        pass
+    if date_logged is None:
+        errors.append("date_logged: Enter a date as YYYY-MM-DD.")
+
+    try:
+        hours_logged = _decimal('hours_logged', row.get('hours_logged') or '')
+        if hours_logged is None or not 0 < hours_logged <= 24:
+            raise ValueError("hours_logged: Must be more than 0 and at most 24.")
+    except ValueError as exc:
+        errors.append(str(exc))
+
+    job_id = team_member = None
+    job_number = (row.get('job_number') or '').strip()
+    if job_number:
+        job_id = jobs.get(job_number)
+        if job_id is None:
+            errors.append(f"job_number: No job card {job_number}.")
+    email = (row.get('team_member_email') or '').strip().lower()
+    if email:
+        team_member = members.get(email)
+        if team_member is None:
+            errors.append(f"team_member_email: No employee {email}.")
+
+    rate = (row.get('hourly_rate') or '').strip()
+    if rate:
+        try:
+            hourly_rate = _decimal('hourly_rate', rate)
+            if hourly_rate < 0:
+                raise ValueError("hourly_rate: Must not be negative.")
+        except ValueError as exc:
+            errors.append(str(exc))
+    elif team_member is not None:
+        hourly_rate = team_member[1]
+        if date_logged is not None and schedules:
+            hourly_rate = payroll.rate_on(schedules.get(team_member[0]), hourly_rate, date_logged)
+    elif not email:
+        errors.append("hourly_rate: Required without team_member_email.")
+
+    if errors:
+        raise ValueError(' '.join(errors))
+
+    timesheet = Timesheet(
+        job_id=job_id, team_member_id=team_member[0] if team_member else None,
+        hours_logged=hours_logged, hourly_rate=hourly_rate, date_logged=date_logged,
+        remarks=(row.get('remarks') or '').strip() or None,
+        # As Timesheet.save() computes it, rounded to the column's places as
+        # the database adapter rounds it on write.
+        total_amount=(hours_logged * hourly_rate).quantize(TOTAL_PLACES),
+    )
+    try:
+        FIELDS['total_amount'].run_validators(timesheet.total_amount)
+    except ValidationError as exc:
+        raise ValueError(f"total_amount: {' '.join(exc.messages)}")
+    return timesheet
+
+
+def ingest(fh, rejects, chunk_size=None, progress=None):
+    """
+    Import the CSV in binary file `fh`, writing rejected rows as CSV text to
+    `rejects`. Returns an ImportResult; raises ValueError for a file that
+    can not be imported at all. `progress(result)` is called as each chunk
+    is about to commit.
+    """
+    chunk_size = chunk_size or getattr(settings, 'TIMESHEET_IMPORT_CHUNK_SIZE', 5000)
+    reader = csv.DictReader(io.TextIOWrapper(fh, encoding='utf-8-sig', newline=''))
+    columns = reader.fieldnames or []
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    writer = csv.writer(rejects)
+    writer.writerow(['line', *columns, 'error'])
+
+    result = ImportResult()
+    # line_num is read after each row, so it is that row's last line.
+    rows = ((reader.line_num, row) for row in reader)
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        with transaction.atomic():
+            job_numbers = {(row.get('job_number') or '').strip() for _, row in chunk} - {''}
+            emails = {(row.get('team_member_email') or '').strip().lower() for _, row in chunk} - {''}
+            jobs = dict(JobCard.objects.filter(job_number__in=job_numbers).values_list('job_number', 'pk'))
+            members = {
+                email.lower(): (pk, rate) for email, pk, rate in
+                Employee.objects.alias(email_lower=Lower('email')).filter(email_lower__in=emails)
+                .values_list('email', 'pk', 'hourly_rate')
+            }
+            schedules = payroll.rate_schedules([pk for pk, _ in members.values()])
+
+            timesheets = []
+            for line, row in chunk:
+                try:
+                    timesheets.append(build_timesheet(row, jobs, members, schedules))
+                except ValueError as exc:
+                    writer.writerow([line, *(row.get(column) for column in columns), str(exc)])
+            Timesheet.objects.bulk_create(timesheets, batch_size=chunk_size)
+            result.rows += len(chunk)
+            result.imported += len(timesheets)
+            result.rejected += len(chunk) - len(timesheets)
+            if progress is not None:
+                progress(result)
+    return result
+
+
+def run_import(job):
+    """Import `job`'s file. Returns False if another runner already claimed it."""
+    if not jobs.claim(job):
+        return False
+    job.row_count = job.imported_count = job.rejected_count = 0
+
+    def record(result):
+        job.row_count, job.imported_count, job.rejected_count = result.rows, result.imported, result.rejected
+        job.heartbeat_at = timezone.now()
+        TimesheetImport.objects.filter(pk=job.pk).update(
+            row_count=job.row_count, imported_count=job.imported_count, rejected_count=job.rejected_count,
+            heartbeat_at=job.heartbeat_at,
+        )
+
+    try:
+        with job.file.open('rb') as fh, tempfile.TemporaryFile('w+', newline='', encoding='utf-8') as rejects:
+            try:
+                ingest(fh, rejects, progress=record)
+            finally:
+                # Kept on failure too: the rejected rows of the committed chunks.
+                if job.rejected_count:
+                    rejects.seek(0)
+                    job.rejects.save(f'rejects-{job.pk}.csv', File(rejects), save=False)
+        job.status = TimesheetImport.DONE
+    except Exception as exc:
+        logger.exception("Timesheet import %s failed", job.pk)
+        job.status = TimesheetImport.FAILED
+        job.error = str(exc)
+        if job.row_count:
+            job.error = f"Stopped after {job.row_count} rows ({job.imported_count} imported): {exc}"
+    job.finished_at = timezone.now()
+    job.save()
+    return True
+
+
+def _run_in_thread(pk):
+    try:
+        run_import(TimesheetImport.objects.get(pk=pk))
+    finally:
+        connection.close()
+
+
+def enqueue(job):
+    """
+    Start `job` according to TIMESHEET_IMPORT_RUNNER: "worker" (default)
+    leaves it pending for `import_timesheets --pending`, "inline" runs it
+    before returning, and "thread" runs it in a background thread of the
+    web process once the creating transaction commits (for development: the
+    thread dies with the process).
+    """
+    runner = getattr(settings, 'TIMESHEET_IMPORT_RUNNER', 'worker')
+    if runner == 'inline':
+        run_import(job)
+    elif runner == 'thread':
+        transaction.on_commit(
+            lambda: threading.Thread(target=_run_in_thread, args=(job.pk,), daemon=True).start()
+        )
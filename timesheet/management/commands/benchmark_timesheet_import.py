@@ -0,0 +1,73 @@
+import csv
+import io
+import itertools
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from BaseApp.models import Employee
+from client_new.models import JobCard
+from client_new.seeding import seed_hierarchy
+from timesheet.ingest import ingest
+from timesheet.serializers import TimesheetSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Time importing a generated timesheet CSV (one row in 100 invalid) "
+        "row by row through TimesheetSerializer and through "
+        "timesheet.ingest. Seeds rows inside a transaction that is rolled "
+        "back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--row-by-row', type=int, default=5000,
+                            help="Rows imported row by row (it is slow); its time is scaled up.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed_hierarchy(clients=10, rfqs_per_client=2, employees=50)
+            jobs = list(JobCard.objects.values_list('job_number', 'pk'))
+            members = list(Employee.objects.values_list('email', 'pk'))
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(['date_logged', 'hours_logged', 'hourly_rate', 'job_number', 'team_member_email', 'remarks'])
+            for i in range(options['rows']):
+                writer.writerow([
+                    f'2025-{i % 12 + 1:02}-{i % 28 + 1:02}', 'x' if i % 100 == 99 else f'{i % 8 + 1}.25', '',
+                    jobs[i % len(jobs)][0], members[i % len(members)][0], f'Row {i}',
+                ])
+            data = buffer.getvalue().encode('utf-8')
+
+            def row_by_row():
+                job_ids, member_ids = dict(jobs), dict(members)
+                rows = csv.DictReader(io.StringIO(data.decode('utf-8')))
+                for row in itertools.islice(rows, options['row_by_row']):
+                    serializer = TimesheetSerializer(data={
+                        'date_logged': row['date_logged'], 'hours_logged': row['hours_logged'],
+                        'hourly_rate': '10.00', 'job': job_ids[row['job_number']],
+                        'team_member': member_ids[row['team_member_email']], 'remarks': row['remarks'],
+                    })
+                    if serializer.is_valid():
+                        serializer.save()
+
+            baseline = None
+            for label, run, rows in (
+                ('row by row', row_by_row, options['row_by_row']),
+                ('ingest', lambda: ingest(io.BytesIO(data), io.StringIO()), options['rows']),
+            ):
+                queries = []
+                # Counted with a wrapper: connection.queries keeps only the last 9000.
+                with connection.execute_wrapper(lambda execute, sql, *rest: queries.append(sql) or execute(sql, *rest)):
+                    start = time.perf_counter()
+                    run()
+                    elapsed = time.perf_counter() - start
+                per_row = elapsed / rows
+                baseline = baseline or per_row
+                self.stdout.write(
+                    f"{rows:>7} rows  {label:<10} {elapsed:7.3f}s  {per_row * 1e6:7.1f} us/row  "
+                    f"{len(queries):>6} queries  x{baseline / per_row:.1f}"
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,73 @@
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from BaseApp import jobs
+from timesheet.ingest import ImportResult, ingest, run_import
+from timesheet.models import TimesheetImport
+
+
+class Command(BaseCommand):
+    help = (
+        "Import timesheets from a CSV file (see timesheet.ingest), writing "
+        "rejected rows to --rejects (default: stderr). With --pending, run "
+        "the pending uploaded imports instead, oldest first, after dealing "
+        "with imports a dead worker left Running; add --poll to keep "
+        "checking for new ones every N seconds (for "
+        "TIMESHEET_IMPORT_RUNNER = 'worker')."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?')
+        parser.add_argument('--rejects', metavar='PATH')
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--pending', action='store_true')
+        parser.add_argument('--poll', type=float, default=None, metavar='SECONDS')
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            return self.run_pending(options['poll'])
+        if not options['path']:
+            raise CommandError("Give a CSV path, or --pending.")
+
+        committed = ImportResult()
+
+        def record(result):
+            committed.rows, committed.imported, committed.rejected = result.rows, result.imported, result.rejected
+
+        try:
+            with open(options['path'], 'rb') as fh:
+                if options['rejects']:
+                    with open(options['rejects'], 'w', newline='', encoding='utf-8') as rejects:
+                        result = ingest(fh, rejects, options['chunk_size'], record)
+                else:
+                    result = ingest(fh, sys.stderr, options['chunk_size'], record)
+        except (OSError, ValueError) as exc:
+            if committed.rows:
+                raise CommandError(f"Stopped after {committed.rows} rows ({committed.imported} imported): {exc}")
+            raise CommandError(str(exc))
+        self.stdout.write(f"{result.rows} rows: {result.imported} imported, {result.rejected} rejected")
+
+    def run_pending(self, poll):
+        while True:
+            requeued, failed = jobs.requeue_stale(
+                TimesheetImport,
+                getattr(settings, 'TIMESHEET_IMPORT_TIMEOUT', 30 * 60),
+                getattr(settings, 'TIMESHEET_IMPORT_MAX_ATTEMPTS', 3),
+                # Committed chunks would be imported twice.
+                restartable=Q(row_count__isnull=True) | Q(row_count=0),
+            )
+            if requeued or failed:
+                self.stdout.write(f"Stale imports: {requeued} requeued, {failed} failed")
+            for job in TimesheetImport.objects.filter(status=TimesheetImport.PENDING).order_by('created_at'):
+                if run_import(job):
+                    self.stdout.write(
+                        f"{job.pk} {job.file.name}: {job.status} "
+                        f"({job.imported_count} imported, {job.rejected_count} rejected)"
+                    )
+            if poll is None:
+                return
+            time.sleep(poll)
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timesheet',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='timesheet',
+            index=models.Index(fields=['updated_at', 'timesheet_id'], name='timesheet_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BaseApp', '0003_report_export'),
+        ('client_new', '0006_updated_at'),
+        ('timesheet', '0002_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timesheet',
+            name='job',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='timesheets', to='client_new.jobcard'),
+        ),
+        migrations.AddField(
+            model_name='timesheet',
+            name='team_member',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='timesheets', to='BaseApp.employee'),
+        ),
+    ]
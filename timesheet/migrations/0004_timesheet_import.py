@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet', '0003_job_team_member'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimesheetImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='imports/')),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Running', 'Running'), ('Done', 'Done'), ('Failed', 'Failed')], default='Pending', max_length=10)),
+                ('row_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('imported_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('rejected_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('rejects', models.FileField(blank=True, upload_to='imports/rejects/')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='timesheetimport_status_idx')],
+            },
+        ),
+    ]
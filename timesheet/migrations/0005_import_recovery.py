@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 00:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet', '0004_timesheet_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timesheetimport',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='timesheetimport',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -3,15 +3,60 @@ from django.utils import timezone
 
 class Timesheet(models.Model):
     timesheet_id = models.AutoField(primary_key=True)
-    # job = models.ForeignKey('JobCard', on_delete=models.CASCADE)  # Assume already have a JobCard model
-    # team_member = models.ForeignKey('TeamMember', on_delete=models.CASCADE)  # Assume already have a TeamMember model
+    job = models.ForeignKey(
+        'client_new.JobCard', on_delete=models.SET_NULL, null=True, blank=True, related_name='timesheets'
+    )
+    team_member = models.ForeignKey(
+        'BaseApp.Employee', on_delete=models.SET_NULL, null=True, blank=True, related_name='timesheets'
+    )
     hours_logged = models.DecimalField(max_digits=5, decimal_places=2)
     hourly_rate = models.DecimalField(max_digits=10, decimal_places=2)
     date_logged = models.DateField(default=timezone.now)
     remarks = models.TextField(null=True, blank=True)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
     # url
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'timesheet_id'], name='timesheet_updated_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         self.total_amount = self.hours_logged * self.hourly_rate
         super(Timesheet, self).save(*args, **kwargs)
+
+
+class TimesheetImport(models.Model):
+    """An uploaded timesheet CSV (see timesheet.ingest) and its reject report."""
+    PENDING = 'Pending'
+    RUNNING = 'Running'
+    DONE = 'Done'
+    FAILED = 'Failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    file = models.FileField(upload_to='imports/')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    row_count = models.PositiveIntegerField(null=True, blank=True)
+    imported_count = models.PositiveIntegerField(null=True, blank=True)
+    rejected_count = models.PositiveIntegerField(null=True, blank=True)
+    rejects = models.FileField(upload_to='imports/rejects/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # last committed chunk while Running
+    attempts = models.PositiveSmallIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='timesheetimport_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.file.name} - {self.status}"
@@ -1,7 +1,35 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Timesheet
+from .models import Timesheet, TimesheetImport
 
 class TimesheetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Timesheet
-        fields = ['timesheet_id', 'hours_logged', 'hourly_rate', 'date_logged', 'remarks', 'total_amount']
+        fields = ['timesheet_id', 'job', 'team_member', 'hours_logged', 'hourly_rate', 'date_logged', 'remarks', 'total_amount', 'updated_at']
+
+
+class TimesheetImportSerializer(serializers.ModelSerializer):
+    file = serializers.FileField(write_only=True)
+    rejects_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TimesheetImport
+        fields = [
+            'id', 'file', 'status', 'row_count', 'imported_count', 'rejected_count',
+            'error', 'created_at', 'finished_at', 'rejects_url'
+        ]
+        read_only_fields = [
+            'status', 'row_count', 'imported_count', 'rejected_count', 'error', 'created_at', 'finished_at'
+        ]
+
+    def get_rejects_url(self, obj):
+        if not obj.rejects:
+            return None
+        url = reverse('timesheet-import-rejects', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def validate_file(self, value):
+        if not value.name.lower().endswith('.csv'):
+            raise serializers.ValidationError("Upload a .csv file.")
+        return value
@@ -1,3 +1,206 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from BaseApp import payroll
+from BaseApp.models import Employee
+from client_new.models import JobCard
+from client_new.seeding import seed_hierarchy
+from .ingest import ingest
+from .models import Timesheet, TimesheetImport
+
+
+class ExportTests(TestCase):
+
+    def test_streams_ndjson_with_updated_since(self):
+        sheets = [
+            Timesheet.objects.create(hours_logged=Decimal('2.50'), hourly_rate=Decimal('10.00'))
+            for _ in range(3)
+        ]
+        Timesheet.objects.filter(pk=sheets[0].pk).update(updated_at=sheets[0].updated_at - timedelta(days=2))
+
+        client = APIClient()
+        response = client.get(reverse('timesheet-export'), {
+            'updated_since': (sheets[0].updated_at - timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['timesheet_id'] for row in rows], [sheet.pk for sheet in sheets[1:]])
+        self.assertEqual(rows[0]['total_amount'], '25.00')
+
+
+class ReportTests(TestCase):
+
+    def test_csv_report_joins_team_member_and_job(self):
+        seed_hierarchy(clients=1, rfqs_per_client=1, employees=1)
+        job = JobCard.objects.select_related('rfq__client').get()
+        member = Employee.objects.get()
+        Timesheet.objects.create(
+            job=job, team_member=member, hours_logged=Decimal('8.00'), hourly_rate=member.hourly_rate,
+        )
+        Timesheet.objects.create(hours_logged=Decimal('1.00'), hourly_rate=Decimal('5.00'))
+
+        response = APIClient().get(reverse('reportexport-csv'), {'report': 'timesheets'})
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0]['assignee_email'], member.email)
+        self.assertEqual(rows[0]['job_number'], job.job_number)
+        self.assertEqual(rows[0]['client_name'], job.rfq.client.client_name)
+        self.assertEqual(rows[0]['total_amount'], '80.00')
+        # Unlinked timesheets keep their row with empty join columns.
+        self.assertEqual((rows[1]['job_number'], rows[1]['assignee_name']), ('', ''))
+
+
+class ConditionalGetTests(TestCase):
+
+    def test_list_revalidates(self):
+        Timesheet.objects.create(hours_logged=Decimal('1.00'), hourly_rate=Decimal('5.00'))
+        client = APIClient()
+        etag = client.get(reverse('timesheet-list-create'))['ETag']
+        self.assertEqual(client.get(reverse('timesheet-list-create'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class ImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hierarchy(clients=1, rfqs_per_client=1, employees=2)
+        cls.job = JobCard.objects.get()
+        cls.member = Employee.objects.order_by('pk').first()
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def csv_file(self):
+        rows = [
+            ['date_logged', 'hours_logged', 'hourly_rate', 'job_number', 'team_member_email', 'remarks'],
+            ['2025-01-06', '7.5', '', self.job.job_number, self.member.email.upper(), 'Site visit'],
+            ['2025-01-07', '2', '12.50', '', '', ''],
+            ['2025-01-08', 'eight', '10', 'NO-SUCH-JOB', '', ''],
+            ['07/01/2025', '1', '', '', 'nobody@example.com', ''],
+            ['2025-01-09', '25', '10', '', '', ''],
+        ]
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return SimpleUploadedFile('hours.csv', buffer.getvalue().encode('utf-8-sig'), content_type='text/csv')
+
+    @override_settings(TIMESHEET_IMPORT_RUNNER='inline', TIMESHEET_IMPORT_CHUNK_SIZE=2)
+    def test_upload_imports_good_rows_and_reports_the_rest(self):
+        client = APIClient()
+        response = client.post(reverse('timesheet-import-list'), {'file': self.csv_file()}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+        self.assertEqual(job['status'], 'Done')
+        self.assertEqual((job['row_count'], job['imported_count'], job['rejected_count']), (5, 2, 3))
+
+        first, second = Timesheet.objects.order_by('date_logged')
+        self.assertEqual((first.job, first.team_member), (self.job, self.member))
+        self.assertEqual(first.hourly_rate, self.member.hourly_rate)
+        self.assertEqual(first.total_amount, (Decimal('7.5') * self.member.hourly_rate).quantize(Decimal('0.01')))
+        self.assertEqual(first.remarks, 'Site visit')
+        self.assertEqual((second.date_logged, second.total_amount), (date(2025, 1, 7), Decimal('25.00')))
+
+        download = client.get(job['rejects_url'])
+        self.assertEqual(download.status_code, 200)
+        rejects = list(csv.DictReader(io.StringIO(b''.join(download.streaming_content).decode())))
+        self.assertEqual([row['line'] for row in rejects], ['4', '5', '6'])
+        self.assertIn('hours_logged', rejects[0]['error'])
+        self.assertIn('job_number: No job card NO-SUCH-JOB.', rejects[0]['error'])
+        self.assertIn('date_logged', rejects[1]['error'])
+        self.assertIn('team_member_email', rejects[1]['error'])
+        self.assertEqual(rejects[2]['hours_logged'], '25')
+
+    def test_emails_match_whatever_their_case(self):
+        Employee.objects.filter(pk=self.member.pk).update(email='John.Doe@Example.com')
+        rejects = io.StringIO()
+        ingest(io.BytesIO(b'date_logged,hours_logged,team_member_email\n2025-01-06,1,john.doe@example.com\n'), rejects)
+        self.assertEqual(Timesheet.objects.get().team_member_id, self.member.pk)
+        self.assertEqual(len(rejects.getvalue().splitlines()), 1)  # the header only
+
+    def test_blank_rate_is_the_rate_on_date_logged(self):
+        old_rate = self.member.hourly_rate
+        payroll.adjust_salaries([(self.member.pk, None, Decimal('10'))], date(2025, 1, 7))
+        new_rate = Employee.objects.get(pk=self.member.pk).hourly_rate
+        rows = 'date_logged,hours_logged,team_member_email\n' + ''.join(
+            f'{day},1,{self.member.email}\n' for day in ['2025-01-06', '2025-01-07']
+        )
+        ingest(io.BytesIO(rows.encode()), io.StringIO())
+        self.assertEqual(
+            list(Timesheet.objects.order_by('date_logged').values_list('hourly_rate', flat=True)), [old_rate, new_rate]
+        )
+        self.assertNotEqual(old_rate, new_rate)
+
+    @override_settings(TIMESHEET_IMPORT_RUNNER='worker')
+    def test_pending_import_and_missing_columns(self):
+        upload = SimpleUploadedFile('hours.csv', b'date_logged,remarks\n2025-01-06,x\n')
+        response = APIClient().post(reverse('timesheet-import-list'), {'file': upload}, format='multipart')
+        job_id = response.json()['id']
+        self.assertEqual(response.json()['status'], 'Pending')
+        self.assertEqual(
+            APIClient().get(reverse('timesheet-import-rejects', args=[job_id])).status_code, 409
+        )
+
+        call_command('import_timesheets', '--pending', stdout=io.StringIO())
+        job = TimesheetImport.objects.get(pk=job_id)
+        self.assertEqual(job.status, TimesheetImport.FAILED)
+        self.assertEqual(job.error, 'Missing columns: hours_logged')
+        self.assertFalse(Timesheet.objects.exists())
+
+    @override_settings(TIMESHEET_IMPORT_RUNNER='inline', TIMESHEET_IMPORT_CHUNK_SIZE=100)
+    def test_error_late_in_the_file_keeps_the_committed_chunks(self):
+        # Past the reader's first 8 KB block, so the first chunk is read and committed before it.
+        content = b'date_logged,hours_logged,hourly_rate\n' + b'2025-01-06,1,10.00\n' * 600 + b'2025-01-07,1,\xff\n'
+        upload = SimpleUploadedFile('hours.csv', content, content_type='text/csv')
+        response = APIClient().post(reverse('timesheet-import-list'), {'file': upload}, format='multipart')
+        job = TimesheetImport.objects.get(pk=response.json()['id'])
+        self.assertEqual(job.status, TimesheetImport.FAILED)
+        self.assertTrue(job.imported_count)
+        self.assertEqual(Timesheet.objects.count(), job.imported_count)
+        self.assertTrue(job.error.startswith(f'Stopped after {job.row_count} rows'))
+
+    @override_settings(TIMESHEET_IMPORT_TIMEOUT=60)
+    def test_worker_recovers_imports_left_running(self):
+        long_ago = timezone.now() - timedelta(minutes=5)
+        untouched, partial = (
+            TimesheetImport.objects.create(
+                file=SimpleUploadedFile('hours.csv', b'date_logged,hours_logged,hourly_rate\n2025-01-06,1,10\n'),
+                status=TimesheetImport.RUNNING, heartbeat_at=long_ago, attempts=1, row_count=row_count,
+            )
+            for row_count in (None, 5000)
+        )
+        call_command('import_timesheets', '--pending', stdout=io.StringIO())
+        untouched.refresh_from_db()
+        partial.refresh_from_db()
+        self.assertEqual((untouched.status, untouched.imported_count, untouched.attempts), (TimesheetImport.DONE, 1, 2))
+        self.assertEqual(partial.status, TimesheetImport.FAILED)
+        self.assertIn('Interrupted', partial.error)
+
+    def test_command_imports_a_file(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path, rejects = os.path.join(directory.name, 'hours.csv'), os.path.join(directory.name, 'rejects.csv')
+        with open(path, 'wb') as fh:
+            fh.write(self.csv_file().read())
+
+        out = io.StringIO()
+        call_command('import_timesheets', path, '--rejects', rejects, stdout=out)
+        self.assertEqual(out.getvalue().strip(), '5 rows: 2 imported, 3 rejected')
+        with open(rejects, newline='') as fh:
+            self.assertEqual(len(list(csv.DictReader(fh))), 3)
+        with self.assertRaises(CommandError):
+            call_command('import_timesheets', os.path.join(directory.name, 'missing.csv'))
@@ -1,7 +1,14 @@
 from django.urls import path
-from .views import TimesheetListCreateView, TimesheetDetailView
+from .views import (
+    TimesheetListCreateView, TimesheetDetailView, TimesheetExportView,
+    TimesheetImportListCreateView, TimesheetImportDetailView, TimesheetImportRejectsView,
+)
 
 urlpatterns = [
     path('timesheets/', TimesheetListCreateView.as_view(), name='timesheet-list-create'),
+    path('timesheets/export/', TimesheetExportView.as_view(), name='timesheet-export'),
+    path('timesheets/imports/', TimesheetImportListCreateView.as_view(), name='timesheet-import-list'),
+    path('timesheets/imports/<int:pk>/', TimesheetImportDetailView.as_view(), name='timesheet-import-detail'),
+    path('timesheets/imports/<int:pk>/rejects/', TimesheetImportRejectsView.as_view(), name='timesheet-import-rejects'),
     path('timesheets/<int:pk>/', TimesheetDetailView.as_view(), name='timesheet-detail'),
 ]
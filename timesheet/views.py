@@ -1,11 +1,61 @@
-from rest_framework import generics
-from .models import Timesheet
-from .serializers import TimesheetSerializer
+from django.http import FileResponse
+from rest_framework import generics, status
+from rest_framework.response import Response
+from BaseApp.conditional import ConditionalGetMixin
+from BaseApp.exports import NDJSONExportMixin
+from . import ingest
+from .models import Timesheet, TimesheetImport
+from .serializers import TimesheetSerializer, TimesheetImportSerializer
 
-class TimesheetListCreateView(generics.ListCreateAPIView):
+class TimesheetListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Timesheet.objects.all()
     serializer_class = TimesheetSerializer
 
-class TimesheetDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TimesheetDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Timesheet.objects.all()
     serializer_class = TimesheetSerializer
+
+class TimesheetExportView(NDJSONExportMixin, generics.GenericAPIView):
+    queryset = Timesheet.objects.all()
+    serializer_class = TimesheetSerializer
+
+    def get(self, request):
+        return self.export_response(request)
+
+class TimesheetImportListCreateView(generics.ListCreateAPIView):
+    """
+    CSV timesheet imports (timesheet.ingest). POST a multipart `file`: the
+    import is queued as a background job and answers 202; poll the job
+    until its status is Done, then fetch `rejects/` for the rows that were
+    not imported, if any.
+    """
+    queryset = TimesheetImport.objects.all()
+    serializer_class = TimesheetImportSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save()
+        ingest.enqueue(job)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+class TimesheetImportDetailView(generics.RetrieveAPIView):
+    queryset = TimesheetImport.objects.all()
+    serializer_class = TimesheetImportSerializer
+
+class TimesheetImportRejectsView(generics.GenericAPIView):
+    queryset = TimesheetImport.objects.all()
+    serializer_class = TimesheetImportSerializer
+
+    def get(self, request, pk):
+        job = self.get_object()
+        if job.status != TimesheetImport.DONE:
+            return Response(
+                {"detail": f"Import is {job.status.lower()}"}, status=status.HTTP_409_CONFLICT
+            )
+        if not job.rejects:
+            return Response({"detail": "No rows were rejected"}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            job.rejects.open('rb'), as_attachment=True,
+            filename=f'timesheet-import-{job.pk}-rejects.csv', content_type='text/csv',
+        )